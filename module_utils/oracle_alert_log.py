@@ -0,0 +1,153 @@
+#
+#Copyright (c) 2020, Oracle and/or its affiliates.
+#The Universal Permissive License (UPL), Version 1.0
+#
+# Alert log scanner of the oracle_* modules: alert_<sid>.log (and ADR log.xml) is
+# memory-mapped and all patterns are found in one pass, timestamps are looked up
+# only for matching lines and a byte-offset checkpoint lets later runs scan only
+# the content appended since.
+#
+
+from datetime import datetime
+import os, re, json, mmap
+
+# 12.2+ writes ISO timestamps, 11g and 12.1 write 'Mon Jun 03 10:00:00 2019'
+re_alert_log_timestamp = re.compile(
+    br'^(?P<ISO>\d{4}-\d\d-\d\dT\d\d:\d\d:\d\d(?:\.\d+)?(?:[+-]\d\d:\d\d|Z)?)\s*$'
+    br'|^(?P<CTIME>[A-Z][a-z]{2} [A-Z][a-z]{2} [ \d]\d \d\d:\d\d:\d\d \d{4})\s*$', re.MULTILINE)
+
+re_alert_log_incident_file = re.compile(br'Incident details in: (?P<INCIDENT_FILE>\S+)')
+
+re_log_xml_time = re.compile(br"time='(?P<TIME>[^']+)'")
+
+# timestamps and incident files are searched this far before and after a matching line,
+# the incident file search stops at the next timestamp or the next matching line as well
+ALERT_LOG_TIMESTAMP_WINDOW = 64 * 1024
+ALERT_LOG_INCIDENT_WINDOW = 1024
+
+def alert_log_patterns_re(alert_log_patterns):
+
+    return re.compile(b'|'.join([b'(?P<P'+str(pattern_no).encode('ascii')+b'>'+re.escape(pattern.encode('utf-8'))+b')' for pattern_no, pattern in enumerate(alert_log_patterns)]), re.IGNORECASE)
+
+def alert_log_timestamp(m):
+
+    if m.group('ISO') is not None:
+        return m.group('ISO').decode('ascii')
+    try:
+        return datetime.strptime(m.group('CTIME').decode('ascii'), '%a %b %d %H:%M:%S %Y').isoformat()
+    except ValueError:
+        return m.group('CTIME').decode('ascii')
+
+def read_alert_log_checkpoint(checkpoint_file):
+
+    if checkpoint_file is None or not os.path.exists(checkpoint_file):
+        return {}
+    try:
+        with open(checkpoint_file, 'r') as f:
+            return json.load(f)
+    except ValueError:
+        return {}
+
+def write_alert_log_checkpoint(checkpoint_file, checkpoint):
+
+    with open(checkpoint_file+'.tmp', 'w') as f:
+        json.dump(checkpoint, f, indent=2)
+    os.rename(checkpoint_file+'.tmp', checkpoint_file)
+
+def alert_log_start_offset(checkpoint, path, stat):
+
+    # a rotated (new inode) or truncated log is scanned from the beginning
+    entry = checkpoint.get(path)
+    if entry is None or entry.get('inode') != stat.st_ino or entry.get('offset', 0) > stat.st_size:
+        return 0
+    return entry['offset']
+
+def scan_alert_log_file(alert_log_file, alert_log_patterns, checkpoint=None, log_xml=False):
+
+    stat = os.stat(alert_log_file)
+    start_offset = alert_log_start_offset(checkpoint or {}, alert_log_file, stat)
+    incidents = []
+
+    # an empty pattern list would compile to a regex matching everywhere
+    if not alert_log_patterns or stat.st_size == 0 or start_offset >= stat.st_size:
+        return [incidents, dict(inode=stat.st_ino, offset=start_offset), 0]
+
+    with open(alert_log_file, 'rb') as f:
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            # only complete lines are scanned, a line being written is scanned next time
+            end_offset = mm.rfind(b'\n', start_offset) + 1
+            if end_offset <= start_offset:
+                return [incidents, dict(inode=stat.st_ino, offset=start_offset), 0]
+
+            patterns_re = alert_log_patterns_re(alert_log_patterns)
+            last_line_start = None
+            for m in patterns_re.finditer(mm, start_offset, end_offset):
+                line_start = mm.rfind(b'\n', 0, m.start()) + 1
+                # several patterns on one line give one incident
+                if line_start == last_line_start:
+                    continue
+                last_line_start = line_start
+                line_end = mm.find(b'\n', m.end(), end_offset)
+                line_patterns = []
+                for line_m in patterns_re.finditer(mm, m.start(), line_end):
+                    pattern = alert_log_patterns[int(line_m.lastgroup[1:])]
+                    if pattern not in line_patterns:
+                        line_patterns.append(pattern)
+                incident = dict(
+                    file=alert_log_file,
+                    pattern=line_patterns[0],
+                    patterns=line_patterns,
+                    offset=line_start,
+                    message=mm[line_start:line_end].decode('utf-8', 'replace').strip(),
+                    timestamp=None,
+                    incident_file=None,
+                )
+                if log_xml:
+                    msg_start = mm.rfind(b'<msg ', max(0, line_start - ALERT_LOG_TIMESTAMP_WINDOW), line_start)
+                    if msg_start >= 0:
+                        time_m = re_log_xml_time.search(mm, msg_start, line_start)
+                        if time_m is not None:
+                            incident['timestamp'] = time_m.group('TIME').decode('ascii')
+                else:
+                    timestamp_m = None
+                    for timestamp_m in re_alert_log_timestamp.finditer(mm, max(0, line_start - ALERT_LOG_TIMESTAMP_WINDOW), line_start):
+                        pass
+                    if timestamp_m is not None:
+                        incident['timestamp'] = alert_log_timestamp(timestamp_m)
+                incident_end = min(line_end + ALERT_LOG_INCIDENT_WINDOW, end_offset)
+                next_m = patterns_re.search(mm, line_end, incident_end)
+                if next_m is not None:
+                    incident_end = mm.rfind(b'\n', 0, next_m.start()) + 1
+                if not log_xml:
+                    next_timestamp_m = re_alert_log_timestamp.search(mm, line_end, incident_end)
+                    if next_timestamp_m is not None:
+                        incident_end = next_timestamp_m.start()
+                incident_file_m = re_alert_log_incident_file.search(mm, line_start, incident_end)
+                if incident_file_m is not None:
+                    incident['incident_file'] = incident_file_m.group('INCIDENT_FILE').decode('utf-8', 'replace')
+                incidents.append(incident)
+        finally:
+            mm.close()
+
+    return [incidents, dict(inode=stat.st_ino, offset=end_offset), end_offset - start_offset]
+
+def scan_alert_logs(alert_log_files, alert_log_patterns, checkpoint_file=None, log_xml_file=None, update_checkpoint=True):
+
+    checkpoint = read_alert_log_checkpoint(checkpoint_file)
+
+    files = [(alert_log_file, False) for alert_log_file in alert_log_files]
+    if log_xml_file is not None:
+        files.append((log_xml_file, True))
+
+    incidents = []
+    scanned_bytes = 0
+    for path, log_xml in files:
+        file_incidents, checkpoint[path], file_scanned_bytes = scan_alert_log_file(path, alert_log_patterns, checkpoint, log_xml)
+        incidents.extend(file_incidents)
+        scanned_bytes += file_scanned_bytes
+
+    if checkpoint_file is not None and update_checkpoint:
+        write_alert_log_checkpoint(checkpoint_file, checkpoint)
+
+    return [incidents, checkpoint, scanned_bytes]
@@ -0,0 +1,210 @@
+#
+#Copyright (c) 2020, Oracle and/or its affiliates.
+#The Universal Permissive License (UPL), Version 1.0
+#
+# Data Pump job monitor of oracle_expdp_module and oracle_impdp_module: one sqlplus
+# session samples DBA_DATAPUMP_JOBS (CDB_DATAPUMP_JOBS of the PDB behind pdb_service)
+# and GV$SESSION_LONGOPS for the job while the client streams its log. The sampling
+# loop and the JSON status file are shared with RMAN in oracle_progress_monitor.
+# Temporary database links for NETWORK_LINK imports are created and dropped here too.
+#
+
+from ansible.module_utils.oracle_exec import run_oracle_command, classify_oracle_errors
+from ansible.module_utils.oracle_progress_monitor import query_progress_monitor, start_progress_monitor, finish_progress_monitor
+from datetime import datetime
+import os, re, time, uuid
+
+re_datapump_job_name = re.compile(r'^[A-Za-z][A-Za-z0-9_$#]{0,127}$')
+re_datapump_db_link = re.compile(r'^[A-Za-z][A-Za-z0-9_$#]*(\.[A-Za-z0-9_$#]+)*$')
+re_datapump_tns_alias = re.compile(r'^[A-Za-z0-9_.\-]+$')
+re_datapump_service_name = re.compile(r'^[A-Za-z0-9_.$#\-]+$')
+
+re_datapump_output = re.compile(
+    r'^\. \. (?P<ACTION>exported|imported) (?P<OBJECT>\S+)\s+(?P<SIZE>[\d.]+) (?P<UNIT>[KMGT]?B)\s+(?P<ROWS>\d+) rows'
+    r'|^Processing object type (?P<OBJECT_TYPE>\S+)')
+
+DATAPUMP_SIZE_UNITS = dict(B=1, KB=1024, MB=1024**2, GB=1024**3, TB=1024**4)
+
+def new_datapump_job_name(operation):
+
+    # unique also for jobs started in the same second, and within the 30 characters of 11g/12.1 identifiers
+    return 'ADMT_'+operation.upper()+'_'+datetime.now().strftime('%y%m%d%H%M%S')+'_'+uuid.uuid4().hex[:6].upper()
+
+def valid_datapump_job_name(job_name):
+
+    return re_datapump_job_name.match(job_name) is not None
+
+def valid_datapump_db_link(db_link, db_link_username, db_link_password, tns_alias):
+
+    return (re_datapump_db_link.match(db_link) is not None
+        and re_datapump_job_name.match(db_link_username) is not None
+        and '"' not in db_link_password
+        and re_datapump_tns_alias.match(tns_alias) is not None)
+
+def run_datapump_db_link_sql(oracle_home, my_env, connect, sql):
+
+    # credentials go through stdin, not the command line
+    sqlplus_script = 'SET HEADING OFF\nSET FEEDBACK OFF\nCONNECT '+connect+'\nWHENEVER SQLERROR EXIT FAILURE\n'+sql+'EXIT\n'
+    sqlplus_result = run_oracle_command([os.path.join(oracle_home, 'bin', 'sqlplus'), '-S', '/nolog'], my_env, sqlplus_script)
+    return classify_oracle_errors(sqlplus_result.errors, ('ORA',))
+
+def create_datapump_db_link(oracle_home, my_env, connect, db_link, db_link_username, db_link_password, tns_alias):
+
+    # the link is verified with a remote query, so a wrong alias or password fails before the import starts
+    return run_datapump_db_link_sql(oracle_home, my_env, connect,
+        "CREATE DATABASE LINK "+db_link+" CONNECT TO "+db_link_username+" IDENTIFIED BY \""+db_link_password+"\" USING '"+tns_alias+"';\n"
+        "SELECT 'ADMT_DB_LINK' FROM dual@"+db_link+";\n")
+
+def drop_datapump_db_link(oracle_home, my_env, connect, db_link):
+
+    return run_datapump_db_link_sql(oracle_home, my_env, connect, "DROP DATABASE LINK "+db_link+";\n")
+
+def new_datapump_output_state():
+
+    return dict(
+        objects_processed=0,
+        rows_processed=0,
+        bytes_processed=0,
+        object_type=None,
+    )
+
+def parse_datapump_output_line(datapump_output_state, line):
+
+    m = re_datapump_output.search(line.strip())
+    if m is None:
+        return
+    if m.group('OBJECT_TYPE') is not None:
+        datapump_output_state['object_type'] = m.group('OBJECT_TYPE')
+    else:
+        datapump_output_state['objects_processed'] += 1
+        datapump_output_state['rows_processed'] += int(m.group('ROWS'))
+        datapump_output_state['bytes_processed'] += int(float(m.group('SIZE')) * DATAPUMP_SIZE_UNITS[m.group('UNIT')])
+
+def datapump_dumpfile_template(dumpfile, parallel, filesize):
+
+    # without a substitution variable every worker and every FILESIZE piece would wait for the one file,
+    # oracle_impdp_module applies the same rule, so both read and write the same set
+    if (parallel is None or parallel <= 1) and filesize is None:
+        return dumpfile
+
+    dumpfiles = []
+    for name in dumpfile.split(','):
+        if '%' not in name:
+            root, ext = os.path.splitext(name)
+            name = root+'_%U'+ext
+        dumpfiles.append(name)
+    return ','.join(dumpfiles)
+
+def datapump_service_name(pdb_service):
+
+    # pdb_service is a connect identifier: EZConnect [//]host[:port]/service[:server][/instance] or TNS alias
+    connect = pdb_service.strip()
+    if connect.startswith('//'):
+        connect = connect[2:]
+    if '/' in connect:
+        connect = re.split(r'[:/]', connect.split('/', 1)[1])[0]
+    if re_datapump_service_name.match(connect) is None:
+        return None
+    return connect
+
+def query_datapump_con_id(sqlplus_process, pdb_service):
+
+    # the monitor is connected to the root container, jobs of the PDB are visible in CDB_DATAPUMP_JOBS only
+    service_name = datapump_service_name(pdb_service)
+    if service_name is None:
+        return None
+
+    lines = query_progress_monitor(sqlplus_process,
+        " select 'CON_ID|'||min(con_id) from v$services where lower(name) = lower('"+service_name+"') or lower(network_name) = lower('"+service_name+"');\n",
+        'ADMT_DATAPUMP_CON_ID_')
+
+    con_id = None
+    for line in lines or []:
+        fields = line.split('|')
+        if fields[0] == 'CON_ID' and len(fields) > 1 and fields[1].isdigit():
+            con_id = int(fields[1])
+    return con_id
+
+def query_datapump_progress(sqlplus_process, job_name, con_id=None):
+
+    if con_id is not None:
+        datapump_jobs = "cdb_datapump_jobs where con_id = "+str(con_id)+" and"
+    else:
+        datapump_jobs = "dba_datapump_jobs where"
+
+    lines = query_progress_monitor(sqlplus_process,
+        " select 'JOB|'||owner_name||'|'||operation||'|'||job_mode||'|'||state||'|'||degree||'|'||attached_sessions||'|'||datapump_sessions from "+datapump_jobs+" job_name = upper('"+job_name+"');\n"
+        " select 'LONGOPS|'||inst_id||'|'||sofar||'|'||totalwork||'|'||elapsed_seconds||'|'||time_remaining||'|'||units from (select * from gv$session_longops where opname = upper('"+job_name+"') order by start_time desc) where rownum = 1;\n",
+        'ADMT_DATAPUMP_PROGRESS_')
+    if lines is None:
+        return None
+
+    sample = dict(job=None, longops=None)
+    for line in lines:
+        fields = line.split('|')
+        try:
+            if fields[0] == 'JOB':
+                sample['job'] = dict(owner_name=fields[1], operation=fields[2], job_mode=fields[3], state=fields[4], degree=int(fields[5] or 0), attached_sessions=int(fields[6] or 0), datapump_sessions=int(fields[7] or 0))
+            elif fields[0] == 'LONGOPS':
+                sample['longops'] = dict(inst_id=int(fields[1]), sofar=int(fields[2]), totalwork=int(fields[3]), elapsed_seconds=int(fields[4]), time_remaining=int(fields[5] or 0), units=fields[6])
+        except (IndexError, ValueError):
+            continue
+    return sample
+
+def build_datapump_progress_status(datapump_monitor, sample):
+
+    status = dict(
+        state='RUNNING',
+        job_name=datapump_monitor['job_name'],
+        updated=datetime.now().isoformat(),
+        elapsed_seconds=int(time.time() - datapump_monitor['started']),
+        samples=datapump_monitor['status'].get('samples', 0) + 1,
+        objects_processed=datapump_monitor['output_state']['objects_processed'],
+        rows_processed=datapump_monitor['output_state']['rows_processed'],
+        bytes_processed=datapump_monitor['output_state']['bytes_processed'],
+        object_type=datapump_monitor['output_state']['object_type'],
+        percent_done=None,
+        bytes_done=None,
+        bytes_total=None,
+        bytes_per_sec=None,
+        eta_seconds=None,
+        job=sample['job'],
+    )
+
+    longops = sample['longops']
+    if longops is not None:
+        # Data Pump reports its estimate in MB under the job name
+        unit_bytes = DATAPUMP_SIZE_UNITS.get(longops['units'], 1)
+        status['bytes_done'] = longops['sofar'] * unit_bytes
+        status['bytes_total'] = longops['totalwork'] * unit_bytes
+        if longops['totalwork'] > 0:
+            status['percent_done'] = round(100.0 * longops['sofar'] / longops['totalwork'], 2)
+        if longops['elapsed_seconds'] > 0:
+            status['bytes_per_sec'] = status['bytes_done'] // longops['elapsed_seconds']
+        status['eta_seconds'] = longops['time_remaining']
+
+    return status
+
+def prepare_datapump_monitor(datapump_monitor, sqlplus_process):
+
+    if datapump_monitor['pdb_service'] is not None:
+        datapump_monitor['con_id'] = query_datapump_con_id(sqlplus_process, datapump_monitor['pdb_service'])
+
+def sample_datapump_progress(datapump_monitor, sqlplus_process):
+
+    sample = query_datapump_progress(sqlplus_process, datapump_monitor['job_name'], datapump_monitor['con_id'])
+    if sample is None:
+        return None
+    return build_datapump_progress_status(datapump_monitor, sample)
+
+def start_datapump_monitor(oracle_home, my_env, job_name, progress_file, progress_interval, datapump_output_state, pdb_service=None):
+
+    return start_progress_monitor(oracle_home, my_env, progress_file, progress_interval, sample_datapump_progress, prepare_datapump_monitor,
+        initial_status=dict(job_name=job_name), job_name=job_name, output_state=datapump_output_state, pdb_service=pdb_service, con_id=None)
+
+def finish_datapump_monitor(datapump_monitor, state):
+
+    finish_progress_monitor(datapump_monitor, state, dict(
+        objects_processed=datapump_monitor['output_state']['objects_processed'],
+        rows_processed=datapump_monitor['output_state']['rows_processed'],
+        bytes_processed=datapump_monitor['output_state']['bytes_processed']))
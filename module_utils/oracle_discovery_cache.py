@@ -0,0 +1,97 @@
+#
+#Copyright (c) 2020, Oracle and/or its affiliates.
+#The Universal Permissive License (UPL), Version 1.0
+#
+# Discovery snapshots of the oracle_*_discovery modules, keyed by host and
+# module parameters and stamped with the mtimes of oratab, inventory.xml and sqlnet.ora.
+# CRS/srvctl configuration has no file to stamp, so snapshots also expire after max_age.
+#
+
+from datetime import datetime
+import os, json, hashlib, socket, time
+
+DISCOVERY_CACHE_VERSION = 2
+DISCOVERY_CACHE_MAX_AGE = 3600
+
+def find_discovery_inventory_xml():
+
+    try:
+        with open('/etc/oraInst.loc', 'r') as f:
+            for line in f:
+                line = line.strip()
+                if line.startswith('inventory_loc='):
+                    return os.path.join(line.split('=', 1)[1], 'ContentsXML', 'inventory.xml')
+    except (IOError, OSError):
+        pass
+    return None
+
+def discovery_cache_paths(oratab_location, oracle_homes, extra_paths=[]):
+
+    paths = [oratab_location or '/etc/oratab', '/etc/oraInst.loc']
+    inventory_xml = find_discovery_inventory_xml()
+    if inventory_xml:
+        paths.append(inventory_xml)
+    for oracle_home in oracle_homes:
+        if oracle_home:
+            paths.append(os.path.join(oracle_home, 'network', 'admin', 'sqlnet.ora'))
+    return paths + [path for path in extra_paths if path]
+
+def discovery_cache_fingerprints(paths):
+
+    fingerprints = {}
+    for path in paths:
+        try:
+            fingerprints[path] = os.stat(path).st_mtime
+        except OSError:
+            fingerprints[path] = None
+    return fingerprints
+
+def discovery_cache_file(cache_dir, module_name, cache_key):
+
+    key_hash = hashlib.sha1(json.dumps(cache_key, sort_keys=True).encode('utf-8')).hexdigest()[:16]
+    return os.path.join(cache_dir, module_name+'_'+socket.gethostname()+'_'+key_hash+'.json')
+
+def read_discovery_cache(cache_file, cache_key, max_age=DISCOVERY_CACHE_MAX_AGE):
+
+    try:
+        with open(cache_file, 'r') as f:
+            snapshot = json.load(f)
+    except (IOError, OSError, ValueError):
+        return None
+
+    if snapshot.get('version') != DISCOVERY_CACHE_VERSION or snapshot.get('host') != socket.gethostname() or snapshot.get('key') != cache_key:
+        return None
+
+    if time.time() - snapshot.get('created_epoch', 0) > max_age:
+        return None
+
+    fingerprints = snapshot.get('fingerprints', {})
+    if discovery_cache_fingerprints(list(fingerprints.keys())) != fingerprints:
+        return None
+
+    return snapshot.get('result')
+
+def write_discovery_cache(cache_file, module_name, cache_key, fingerprint_paths, results):
+
+    snapshot = dict(
+        version=DISCOVERY_CACHE_VERSION,
+        module=module_name,
+        host=socket.gethostname(),
+        key=cache_key,
+        created=datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        created_epoch=time.time(),
+        fingerprints=discovery_cache_fingerprints(fingerprint_paths),
+        result=results,
+    )
+
+    try:
+        cache_dir = os.path.dirname(cache_file)
+        if not os.path.isdir(cache_dir):
+            os.makedirs(cache_dir, 0o700)
+        tmp_file = cache_file+'.'+str(os.getpid())+'.tmp'
+        with open(tmp_file, 'w') as f:
+            json.dump(snapshot, f)
+        os.rename(tmp_file, cache_file)
+    except (IOError, OSError):
+        return False
+    return True
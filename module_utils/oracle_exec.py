@@ -0,0 +1,260 @@
+#
+#Copyright (c) 2020, Oracle and/or its affiliates.
+#The Universal Permissive License (UPL), Version 1.0
+#
+# Shared execution core of the oracle_* modules: oratab/home resolution,
+# environment construction, streaming subprocess execution and error scanning.
+#
+
+from subprocess import Popen, PIPE, STDOUT
+from collections import deque
+import os, re, pty, signal, termios, threading, time
+
+DEFAULT_MAX_OUTPUT = 32 * 1024 * 1024
+
+ORACLE_ERROR_FACILITIES = ('ORA', 'RMAN', 'LRM', 'PRKO', 'PRCD', 'PRCT', 'DCS')
+
+re_oracle_error = re.compile(r'\b(?P<FACILITY>'+'|'.join(ORACLE_ERROR_FACILITIES)+r')-(?P<CODE>\d+)(?:\s*:\s*(?P<MESSAGE>.*))?')
+
+oratab_entries = {}
+
+def read_oratab(oratab_location=None):
+
+    if oratab_location is None:
+        oratab_location = '/etc/oratab'
+
+    mtime = os.stat(oratab_location).st_mtime
+    if oratab_location in oratab_entries and oratab_entries[oratab_location][0] == mtime:
+        return oratab_entries[oratab_location][1]
+
+    entries = []
+    with open(oratab_location, 'r') as f:
+        for line in f:
+            line = line.strip()
+            if line == '' or line.startswith('#'):
+                continue
+            fields = line.split(':')
+            if len(fields) >= 2:
+                entries.append((fields[0], fields[1], fields[2] if len(fields) > 2 else ''))
+    oratab_entries[oratab_location] = (mtime, entries)
+    return entries
+
+def find_oracle_home(oracle_sid, oratab_location=None):
+
+    for sid, home, autostart in read_oratab(oratab_location):
+        if sid == oracle_sid:
+            return home
+
+def find_oracle_sid(oracle_home, oratab_location=None):
+
+    for sid, home, autostart in read_oratab(oratab_location):
+        if home == oracle_home and not sid.startswith('+'):
+            return sid
+
+def find_oracle_gi_home(oratab_location=None):
+
+    for sid, home, autostart in read_oratab(oratab_location):
+        if re.match(r'^\+ASM[1-9]$', sid):
+            return home
+
+def oracle_env(oracle_home=None, oracle_sid=None, **variables):
+
+    my_env = os.environ.copy()
+    if oracle_home is not None:
+        my_env["PATH"] = my_env.get("PATH", '')+os.pathsep+os.path.join(oracle_home, 'bin')
+        my_env["ORACLE_HOME"] = oracle_home
+    if oracle_sid is not None:
+        my_env["ORACLE_SID"] = oracle_sid
+    for name, value in variables.items():
+        if value is not None:
+            my_env[name] = value
+    return my_env
+
+def scan_oracle_errors(lines, facilities=None, first_line_no=1):
+
+    errors = []
+    for line_no, line in enumerate(lines, first_line_no):
+        if '-' in line:
+            errors.extend(scan_oracle_error_line(line, line_no, facilities))
+    return errors
+
+def scan_oracle_error_line(line, line_no, facilities=None):
+
+    errors = []
+    for m in re_oracle_error.finditer(line):
+        if facilities is None or m.group('FACILITY') in facilities:
+            errors.append((m.group('FACILITY'), m.group('CODE'), (m.group('MESSAGE') or '').strip(), line_no))
+    return errors
+
+def oracle_error_codes(errors, facilities):
+
+    return [code for facility, code, message, line_no in errors if facility in facilities]
+
+def oracle_error_key(error_code):
+
+    # 'ORA-01109' and 'ORA-1109' give ('ORA', 1109), a bare facility like 'PRKO' gives ('PRKO', None)
+    facility, sep, code = error_code.strip().upper().partition('-')
+    if sep == '' or code == '':
+        return (facility, None)
+    try:
+        return (facility, int(code))
+    except ValueError:
+        return (facility, code)
+
+def classify_oracle_errors(errors, facilities, ignore_error_codes=None):
+
+    ignored = set(oracle_error_key(error_code) for error_code in ignore_error_codes or [])
+
+    classified = []
+    for facility, code, message, line_no in errors:
+        if facility not in facilities:
+            continue
+        if (facility, None) in ignored or (facility, int(code)) in ignored:
+            continue
+        classified.append(dict(facility=facility, code=code, message=message, line_no=line_no))
+    return classified
+
+class BoundedOutput(object):
+
+    def __init__(self, max_output):
+        self.max_output = max_output
+        self.head = []
+        self.head_size = 0
+        self.tail = deque()
+        self.tail_size = 0
+        self.truncated_size = 0
+
+    def append(self, line):
+        if self.max_output is None or self.head_size + len(line) <= self.max_output // 2:
+            self.head.append(line)
+            self.head_size += len(line)
+            return
+        self.tail.append(line)
+        self.tail_size += len(line)
+        while self.tail and self.tail_size > self.max_output - self.head_size:
+            dropped = self.tail.popleft()
+            self.tail_size -= len(dropped)
+            self.truncated_size += len(dropped)
+
+    def text(self):
+        if self.truncated_size == 0:
+            return ''.join(self.head)+''.join(self.tail)
+        return ''.join(self.head)+'\n... '+str(self.truncated_size)+' characters of output truncated ...\n'+''.join(self.tail)
+
+class OracleCommandResult(object):
+
+    def __init__(self, args):
+        self.args = args
+        self.stdout = ''
+        self.stderr = ''
+        self.stdout_errors = []
+        self.stderr_errors = []
+        self.returncode = None
+        self.timed_out = False
+        self.truncated = False
+        self.line_handler_errors = []
+        self.elapsed = 0.0
+
+    @property
+    def errors(self):
+        return self.stdout_errors + self.stderr_errors
+
+def read_oracle_command_stream(stream, output, errors, line_handler, line_handler_errors=None):
+
+    try:
+        for line_no, line in enumerate(iter(stream.readline, ''), 1):
+            if output is not None:
+                output.append(line)
+            if '-' in line:
+                errors.extend(scan_oracle_error_line(line, line_no))
+            if line_handler is not None:
+                # the pipe is drained even when the handler fails, otherwise the command blocks on a full pipe
+                try:
+                    line_handler(line)
+                except Exception as e:
+                    if line_handler_errors is not None and not line_handler_errors:
+                        line_handler_errors.append('line '+str(line_no)+': '+str(e))
+    except (IOError, OSError):
+        # pseudo terminal of stdout_tty reports EIO instead of EOF once the command has ended
+        pass
+    stream.close()
+
+def open_oracle_command_tty():
+
+    master_fd, slave_fd = pty.openpty()
+    # lines keep their '\n', the terminal would translate it to '\r\n'
+    attributes = termios.tcgetattr(slave_fd)
+    attributes[1] &= ~termios.ONLCR
+    termios.tcsetattr(slave_fd, termios.TCSANOW, attributes)
+    return master_fd, slave_fd
+
+def write_oracle_command_input(stream, input_data):
+
+    try:
+        stream.write(input_data)
+    except (IOError, OSError):
+        pass
+    finally:
+        try:
+            stream.close()
+        except (IOError, OSError):
+            pass
+
+def run_oracle_command(args, env=None, input_data=None, timeout=None, max_output=DEFAULT_MAX_OUTPUT, stderr_to_stdout=False, line_handler=None, capture_stdout=True, stdout_tty=False):
+
+    result = OracleCommandResult(args)
+    started = time.time()
+
+    # with a timeout the command gets its own process group, so children holding the pipes are killed with it
+    if stdout_tty:
+        # stdout and stderr share one pseudo terminal: tools that block buffer a piped stdout
+        # (asmcmd) flush every line, so stdout and stderr lines arrive in the order written
+        stderr_to_stdout = True
+        master_fd, slave_fd = open_oracle_command_tty()
+        try:
+            p = Popen(args, stdout=slave_fd, stderr=slave_fd, env=env, stdin=PIPE, universal_newlines=True, preexec_fn=os.setsid if timeout is not None else None)
+        except OSError:
+            os.close(master_fd)
+            raise
+        finally:
+            os.close(slave_fd)
+        stdout_stream = os.fdopen(master_fd, 'r')
+    else:
+        p = Popen(args, stdout=PIPE, stderr=STDOUT if stderr_to_stdout else PIPE, env=env, stdin=PIPE, universal_newlines=True, preexec_fn=os.setsid if timeout is not None else None)
+        stdout_stream = p.stdout
+
+    stdout_output = BoundedOutput(max_output) if capture_stdout else None
+    stderr_output = BoundedOutput(max_output)
+
+    threads = [threading.Thread(target=read_oracle_command_stream, args=(stdout_stream, stdout_output, result.stdout_errors, line_handler, result.line_handler_errors))]
+    if not stderr_to_stdout:
+        threads.append(threading.Thread(target=read_oracle_command_stream, args=(p.stderr, stderr_output, result.stderr_errors, None)))
+    threads.append(threading.Thread(target=write_oracle_command_input, args=(p.stdin, input_data or '')))
+    for thread in threads:
+        thread.daemon = True
+        thread.start()
+
+    for thread in threads:
+        if timeout is None:
+            thread.join()
+        else:
+            thread.join(max(0.0, started + timeout - time.time()))
+        if thread.is_alive():
+            result.timed_out = True
+            try:
+                os.killpg(p.pid, signal.SIGKILL)
+            except OSError:
+                p.kill()
+            break
+
+    result.returncode = p.wait()
+    for thread in threads:
+        thread.join(5)
+
+    if stdout_output is not None:
+        result.stdout = stdout_output.text()
+        result.truncated = stdout_output.truncated_size > 0
+    result.stderr = stderr_output.text()
+    result.truncated = result.truncated or stderr_output.truncated_size > 0
+    result.elapsed = time.time() - started
+    return result
@@ -0,0 +1,111 @@
+#
+#Copyright (c) 2020, Oracle and/or its affiliates.
+#The Universal Permissive License (UPL), Version 1.0
+#
+# Progress monitor of the long running oracle_* modules (RMAN, Data Pump): one
+# sqlplus session is sampled every progress_interval seconds while the tool runs
+# and the status is written as JSON after every sample. Queries and status are
+# supplied by the module through the sample function.
+#
+
+from subprocess import Popen, PIPE, STDOUT
+from datetime import datetime
+import os, json, signal, threading, time, uuid
+
+PROGRESS_MONITOR_JOIN_TIMEOUT = 30
+
+def query_progress_monitor(sqlplus_process, sql, sentinel_prefix):
+
+    sentinel = sentinel_prefix+uuid.uuid4().hex
+    sqlplus_process.stdin.write(sql+" PROMPT "+sentinel+"\n")
+    sqlplus_process.stdin.flush()
+
+    lines = []
+    while True:
+        line = sqlplus_process.stdout.readline()
+        if line == '':
+            return None
+        line = line.strip()
+        if line == sentinel:
+            return lines
+        lines.append(line)
+
+def write_progress_file(progress_file, status):
+
+    with open(progress_file+'.tmp', 'w') as f:
+        json.dump(status, f, indent=2)
+    os.rename(progress_file+'.tmp', progress_file)
+
+def run_progress_monitor(progress_monitor, oracle_home, my_env, progress_interval, sample, prepare):
+
+    try:
+        # own process group, so a hung sqlplus is killed together with its children
+        sqlplus_process = Popen([os.path.join(oracle_home, 'bin', 'sqlplus'), '-S', '/', 'as sysdba'], stdout=PIPE, stderr=STDOUT, env=my_env, stdin=PIPE, universal_newlines=True, bufsize=1, preexec_fn=os.setsid)
+    except OSError as e:
+        progress_monitor['status']['monitor_error'] = str(e)
+        return
+    progress_monitor['sqlplus_process'] = sqlplus_process
+
+    try:
+        sqlplus_process.stdin.write(' SET HEADING OFF\n SET FEEDBACK OFF\n SET PAGES 0\n SET LINESIZE 1000\n SET TAB OFF\n')
+        if prepare is not None:
+            prepare(progress_monitor, sqlplus_process)
+        while not progress_monitor['stop'].is_set():
+            status = sample(progress_monitor, sqlplus_process)
+            if status is None:
+                progress_monitor['status']['monitor_error'] = 'sqlplus session used for progress sampling has ended.'
+                break
+            progress_monitor['status'] = status
+            write_progress_file(progress_monitor['progress_file'], status)
+            progress_monitor['stop'].wait(progress_interval)
+    except (IOError, OSError) as e:
+        progress_monitor['status']['monitor_error'] = str(e)
+    finally:
+        try:
+            sqlplus_process.stdin.write(' EXIT\n')
+            sqlplus_process.stdin.close()
+        except (IOError, OSError):
+            pass
+        sqlplus_process.wait()
+
+def start_progress_monitor(oracle_home, my_env, progress_file, progress_interval, sample, prepare=None, initial_status=None, **monitor_state):
+
+    progress_monitor = dict(
+        progress_file=progress_file,
+        started=time.time(),
+        stop=threading.Event(),
+        sqlplus_process=None,
+        status=dict(state='STARTING', updated=datetime.now().isoformat()),
+    )
+    progress_monitor['status'].update(initial_status or {})
+    progress_monitor.update(monitor_state)
+    write_progress_file(progress_file, progress_monitor['status'])
+
+    progress_monitor['thread'] = threading.Thread(target=run_progress_monitor, args=(progress_monitor, oracle_home, my_env, progress_interval, sample, prepare))
+    progress_monitor['thread'].daemon = True
+    progress_monitor['thread'].start()
+    return progress_monitor
+
+def finish_progress_monitor(progress_monitor, state, final_status=None):
+
+    progress_monitor['stop'].set()
+    progress_monitor['thread'].join(PROGRESS_MONITOR_JOIN_TIMEOUT)
+    if progress_monitor['thread'].is_alive():
+        # sqlplus of the monitor hangs (instance blocked, listener down), the module result must not wait for it
+        if progress_monitor['sqlplus_process'] is not None:
+            try:
+                os.killpg(progress_monitor['sqlplus_process'].pid, signal.SIGKILL)
+            except OSError:
+                pass
+        progress_monitor['thread'].join(PROGRESS_MONITOR_JOIN_TIMEOUT)
+        progress_monitor['status']['monitor_error'] = 'sqlplus session used for progress sampling has not answered and has been killed.'
+
+    status = progress_monitor['status']
+    status['state'] = state
+    status['updated'] = datetime.now().isoformat()
+    status['elapsed_seconds'] = int(time.time() - progress_monitor['started'])
+    status.update(final_status or {})
+    if state == 'COMPLETED':
+        status['percent_done'] = 100.0
+        status['eta_seconds'] = 0
+    write_progress_file(progress_monitor['progress_file'], status)
@@ -0,0 +1,165 @@
+#!/usr/bin/python
+#
+#Copyright (c) 2020, Oracle and/or its affiliates.
+#The Universal Permissive License (UPL), Version 1.0
+#
+
+ANSIBLE_METADATA = {
+    'metadata_version': '1.0',
+    'status': ['preview'],
+    'supported_by': 'community'
+}
+
+DOCUMENTATION = '''
+---
+module: oracle_alert_log_module
+
+short_description: This is simple alert log scanner module for remote execution
+
+version_added: "1.0"
+
+description:
+    - "This module will memory-map alert_<oracle_sid>.log and find all alert_log_patterns in one pass"
+    - "Byte offset reached is stored in checkpoint_file, so the next execution scans only content appended since (rotated or truncated log is scanned again from the beginning)"
+    - "Every matching line is returned as an incident with the timestamp of its entry and the ADR incident file, ADR log.xml can be scanned as well"
+
+options:
+    alert_log_file:
+        description:
+            - This is alert log to be scanned (if not declared will be constructed from diag_trace/alert_<oracle_sid>.log)
+        required: false
+    diag_trace:
+        description:
+            - This is 'Diag Trace' directory of V$DIAG_INFO
+        required: false
+    oracle_sid:
+        description:
+            - This is $ORACLE_SID which will be used to construct alert log name
+        required: false
+    alert_log_patterns:
+        description:
+            - Lines containing these patterns (case insensitive) are returned as incidents.
+        required: false
+    checkpoint_file:
+        description:
+            - JSON file with byte offset and inode of every scanned file, not updated in check mode (lack of parameter means whole files are scanned).
+        required: false
+    log_xml:
+        description:
+            - Scan also ADR alert/log.xml (sibling of the trace directory), timestamps are taken from time attribute of msg elements.
+        required: false
+    log_xml_file:
+        description:
+            - This is ADR log.xml to be scanned with log_xml (if not declared will be constructed from alert log location).
+        required: false
+    max_incidents:
+        description:
+            - Only this number of most recent incidents is returned (counts cover all of them).
+        required: false
+
+'''
+
+EXAMPLES = '''
+# Scan new content of FOGGYDB alert log for internal errors since the previous execution
+- name: Scan alert log
+  oracle_alert_log_module:
+    diag_trace: '/u01/app/oracle/diag/rdbms/foggydb_fra1bc/FOGGYDB/trace'
+    oracle_sid: 'FOGGYDB'
+    alert_log_patterns:
+      - 'ORA-00600:'
+      - 'ORA-07445:'
+      - 'ORA-04031:'
+    checkpoint_file: '/tmp/alert_log_checkpoint_FOGGYDB.json'
+    log_xml: True
+
+'''
+
+RETURN = '''
+alert_log_incidents:
+    description: matching lines as records (file, pattern, patterns, offset, message, timestamp, incident_file).
+    type: list
+alert_log_counts:
+    description: number of incidents per pattern.
+    type: dict
+alert_log_scanned_bytes:
+    description: number of bytes scanned by this execution.
+    type: int
+alert_log_checkpoint:
+    description: inode and byte offset reached per scanned file.
+    type: dict
+changed:
+    description: will be used for the future all removed.
+    type: bool
+'''
+
+from ansible.module_utils.basic import AnsibleModule
+from ansible.module_utils.oracle_alert_log import scan_alert_logs
+import os, sys, re
+
+
+def execute_alert_log_scan(alert_log_file, diag_trace, oracle_sid, alert_log_patterns, checkpoint_file, log_xml, log_xml_file, update_checkpoint):
+
+    if alert_log_file is None:
+        alert_log_file = os.path.join(diag_trace, 'alert_'+oracle_sid+'.log')
+
+    # ADR keeps log.xml in alert/ next to trace/
+    if log_xml and log_xml_file is None:
+        log_xml_file = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(alert_log_file))), 'alert', 'log.xml')
+
+    return scan_alert_logs([alert_log_file], alert_log_patterns, checkpoint_file, log_xml_file if log_xml else None, update_checkpoint)
+
+def run_module():
+
+    module_args = dict(
+        alert_log_file=dict(type='str', required=False),
+        diag_trace=dict(type='str', required=False),
+        oracle_sid=dict(type='str', required=False),
+        alert_log_patterns=dict(type='list', required=False, default=['ORA-00600:', 'ORA-07445:']),
+        checkpoint_file=dict(type='str', required=False),
+        log_xml=dict(type='bool', required=False, default=False),
+        log_xml_file=dict(type='str', required=False),
+        max_incidents=dict(type='int', required=False, default=1000)
+    )
+
+    result = dict(
+        changed=False,
+        alert_log_incidents=[],
+        alert_log_counts={},
+        alert_log_scanned_bytes=0,
+        alert_log_checkpoint={}
+    )
+
+    module = AnsibleModule(
+        argument_spec=module_args,
+        supports_check_mode=True
+    )
+
+    if module.params['alert_log_file'] is None and (module.params['diag_trace'] is None or module.params['oracle_sid'] is None):
+        module.fail_json(msg='Alert log module requires alert_log_file or diag_trace with oracle_sid!', **result)
+
+    try:
+        results_of_execute_alert_log_scan = execute_alert_log_scan(
+            module.params['alert_log_file'],
+            module.params['diag_trace'],
+            module.params['oracle_sid'],
+            module.params['alert_log_patterns'],
+            module.params['checkpoint_file'],
+            module.params['log_xml'],
+            module.params['log_xml_file'],
+            not module.check_mode)
+    except (IOError, OSError) as e:
+        module.fail_json(msg='Alert log module has failed! '+str(e), **result)
+
+    incidents = results_of_execute_alert_log_scan[0]
+    result['alert_log_counts'] = dict((pattern, len([incident for incident in incidents if pattern in incident['patterns']])) for pattern in module.params['alert_log_patterns'])
+    result['alert_log_incidents'] = incidents[-module.params['max_incidents']:] if module.params['max_incidents'] > 0 else []
+    result['alert_log_checkpoint'] = results_of_execute_alert_log_scan[1]
+    result['alert_log_scanned_bytes'] = results_of_execute_alert_log_scan[2]
+
+    module.exit_json(**result)
+
+def main():
+    run_module()
+
+if __name__ == '__main__':
+    main()
@@ -32,8 +32,13 @@ options:
         required: false
     asmcmd_script:
         description:
-            - This will be executed within ASMCMD
-        required: true
+            - This will be executed within ASMCMD (asmcmd_script or asmcmd_commands is required)
+        required: false
+    asmcmd_commands:
+        description:
+            - List of ASMCMD commands executed in one ASMCMD session, output of every command is returned separately in asmcmd_results.
+            - Output of lsdg, du, lsof and ls -l is also parsed into records (for example free_mb, usable_file_mb and redundancy of lsdg).
+        required: false
     no_execution:
         description:
             - Show show the command which will be executed.
@@ -46,6 +51,10 @@ options:
         description:
             - When set to True module will ignore ORA-XXXX errors 
         required: false    
+    ignore_error_codes:
+        description:
+            - List of error codes which do not fail the module (for example ORA-01109 or PRCD-1120, a bare facility like PRKO ignores all its codes). Errors are still listed in asmcmd_message.
+        required: false
     
 '''
 
@@ -56,66 +65,151 @@ EXAMPLES = '''
     oracle_home: '/u01/app/12.2.0.1/grid'
     oracle_sid: '+ASM1'
     asmcmd_script: 'cp +DG1/vdb.ctf1 /backups/vdb.ctf1'
-    
+
+# Execute several ASMCMD commands in one session
+- name: check free space of DATA and size of database directory
+  oracle_asmcmd_module:
+    oracle_home: '/u01/app/12.2.0.1/grid'
+    oracle_sid: '+ASM1'
+    asmcmd_commands:
+      - 'lsdg DATA'
+      - 'du +DATA/VDB'
+  register: asmcmdoutput
+# asmcmdoutput.asmcmd_results[0].records[0].usable_file_mb
+
 '''
 
 RETURN = '''
 asmcmd_message:
     description: result of SQL statement.
     type: str
+asmcmd_results:
+    description: command, output lines and parsed records (lsdg, du, lsof, ls -l) of every command from asmcmd_commands.
+    type: list
+asmcmd_errors:
+    description: errors found in the output (facility, code, message, line_no), without the ignored ones.
+    type: list
 changed:
     description: will be used for the future all removed.
     type: bool   
 '''
 
 from ansible.module_utils.basic import AnsibleModule
-from subprocess import Popen, PIPE
+from ansible.module_utils.oracle_exec import oracle_env, run_oracle_command, classify_oracle_errors
 from tempfile import mkstemp, TemporaryFile
 from datetime import datetime, timedelta
-import os, sys, re
+import os, sys, re, uuid
+
+ASMCMD_COLUMN_COMMANDS = ('lsdg', 'du', 'lsof')
+
+def asmcmd_batch_script(asmcmd_commands, delimiter):
+
+    # ASMCMD has no echo, so every command is followed by ls of a non-existing
+    # entry whose error message (stderr, on the same terminal as stdout) ends
+    # the command's output
+    script = ''
+    for command_no, command in enumerate(asmcmd_commands, 1):
+        script += command+'\n'+'ls '+delimiter+str(command_no)+'\n'
+    return script
 
-def execute_asmcmd(oracle_home, oracle_sid, output_as_array, no_execution, ignore_ORA_errors, asmcmd_script):
+def split_asmcmd_batch_output(output, asmcmd_commands, delimiter):
+
+    sections = [[] for command in asmcmd_commands]
+    command_no = 0
+    for line in output.split('\n'):
+        if command_no >= len(sections):
+            break
+        if delimiter+str(command_no+1) in line:
+            command_no += 1
+        elif line.strip() != '':
+            sections[command_no].append(line)
+    return sections
+
+def asmcmd_value(field):
+
+    if re.match(r'^\d+$', field):
+        return int(field)
+    return field
+
+def parse_asmcmd_columns(lines):
+
+    header = None
+    records = []
+    for line in lines:
+        fields = line.split()
+        if header is None:
+            header = [field.lower() for field in fields]
+            continue
+        if len(fields) != len(header):
+            continue
+        records.append(dict(zip(header, [asmcmd_value(field) for field in fields])))
+    return records
+
+def parse_asmcmd_ls_l(lines):
+
+    records = []
+    for line in lines[1:]:
+        fields = line.split()
+        if len(fields) >= 8:
+            records.append(dict(type=fields[0], redund=fields[1], striped=fields[2], time=' '.join(fields[3:6]), sys=fields[6], name=' '.join(fields[7:]), directory=False, alias_of=None))
+        elif len(fields) >= 2 and fields[0] in ('Y', 'N'):
+            # directories and aliases (name => system file name) have no file attributes
+            records.append(dict(type=None, redund=None, striped=None, time=None, sys=fields[0], name=fields[1].rstrip('/'), directory=fields[1].endswith('/'), alias_of=fields[3] if len(fields) == 4 and fields[2] == '=>' else None))
+    return records
+
+def parse_asmcmd_output(command, lines):
+
+    tokens = command.split()
+    if not tokens:
+        return None
+    options = ''.join([token.lstrip('-') for token in tokens[1:] if token.startswith('-') and not token.startswith('--')])
+
+    if tokens[0] in ASMCMD_COLUMN_COMMANDS:
+        records = parse_asmcmd_columns(lines)
+        for record in records:
+            if 'name' in record:
+                record['name'] = str(record['name']).rstrip('/')
+            if tokens[0] == 'lsdg' and 'type' in record:
+                record['redundancy'] = record['type']
+        return records
+    if tokens[0] == 'ls' and 'l' in options and 's' not in options:
+        return parse_asmcmd_ls_l(lines)
+    return None
+
+def execute_asmcmd(oracle_home, oracle_sid, output_as_array, no_execution, ignore_ORA_errors, asmcmd_script, ignore_error_codes, asmcmd_commands):
 
     args = [os.path.join(oracle_home, 'bin', 'asmcmd')]
     
-    my_env = os.environ.copy()
-    my_env["PATH"] = my_env["PATH"] + oracle_home+'/bin'
-    my_env["ORACLE_HOME"] = oracle_home
-    my_env["ORACLE_SID"] = oracle_sid
+    my_env = oracle_env(oracle_home, oracle_sid)
+
+    delimiter = 'ADMT_ASMCMD_'+uuid.uuid4().hex+'_'
+    if asmcmd_commands:
+        asmcmd_script = asmcmd_batch_script(asmcmd_commands, delimiter)
 
     if no_execution is True:
-        return [' '.join(args),'','']
+        return [' '.join(args),'','',[],[]]
     else:    
-        p = Popen(args, stdout=PIPE, stderr=PIPE, env=my_env, stdin=PIPE)  
-        p.stdin.write(asmcmd_script.encode())  
-       
-        asmcmdResult, stderrResult = p.communicate()
-
-        if asmcmdResult.count('ORA-') > 0:
-        
-            if ignore_ORA_errors == False:            
-                oraErrors = re.findall('ORA-(.+?):', asmcmdResult) 
-            if ignore_ORA_errors == True:            
-                oraErrors = ''          
-        
-        if asmcmdResult.count('ORA-') == 0:
-            oraErrors = ''
+        # asmcmd block buffers a piped stdout, the delimiters on stderr would overtake the output
+        asmcmd_result = run_oracle_command(args, my_env, asmcmd_script, stdout_tty=bool(asmcmd_commands))
+        asmcmdResult, stderrResult = asmcmd_result.stdout, asmcmd_result.stderr
+
+        asmcmdResults = []
+        if asmcmd_commands:
+            for command, lines in zip(asmcmd_commands, split_asmcmd_batch_output(asmcmdResult, asmcmd_commands, delimiter)):
+                asmcmdResults.append(dict(command=command, output=lines, records=parse_asmcmd_output(command, lines)))
+            asmcmdResult = '\n'.join([line for line in asmcmdResult.split('\n') if delimiter not in line])
 
-        if stderrResult.count('ORA-') > 0:
-        
-            if ignore_ORA_errors == False:            
-                oraErrors = re.findall('ORA-(.+?):', stderrResult) 
-            if ignore_ORA_errors == True:            
-                oraErrors = ''          
-        
-        if stderrResult.count('ORA-') == 0:
+        errors = [error for error in asmcmd_result.errors if delimiter not in error[2]]
+        asmcmdErrors = classify_oracle_errors(errors, ('ORA',), ignore_error_codes)
+        oraErrors = [error['code'] for error in asmcmdErrors]
+        if ignore_ORA_errors == True or not oraErrors:
             oraErrors = ''
 
         if output_as_array == True:
             asmcmdResult = asmcmdResult.split('\n')
             asmcmdResult[:] = [item for item in asmcmdResult if item != '']
 
-        return [asmcmdResult,oraErrors,stderrResult]
+        return [asmcmdResult,oraErrors,stderrResult,asmcmdErrors,asmcmdResults]
 
 def run_module():
     
@@ -125,8 +219,9 @@ def run_module():
         no_execution=dict(type='bool', required=False, default=False),
         output_as_array=dict(type='bool', required=False, default=True), 
         ignore_ORA_errors=dict(type='bool', required=False, default=False), 
-        asmcmd_script=dict(type='str', required=True)
-        
+        asmcmd_script=dict(type='str', required=False),
+        ignore_error_codes=dict(type='list', required=False, default=[]),
+        asmcmd_commands=dict(type='list', required=False, default=[])
     )
 
     result = dict(
@@ -142,15 +237,22 @@ def run_module():
     if module.check_mode:
         return result
 
+    if module.params['asmcmd_script'] is None and not module.params['asmcmd_commands']:
+        module.fail_json(msg='ASMCMD module needs asmcmd_script or asmcmd_commands!', **result)
+
     results_of_execute_asmcmd = execute_asmcmd(
         module.params['oracle_home'],
         module.params['oracle_sid'],
         module.params['output_as_array'],
         module.params['no_execution'],
         module.params['ignore_ORA_errors'],
-        module.params['asmcmd_script'])
+        module.params['asmcmd_script'],
+        module.params['ignore_error_codes'],
+        module.params['asmcmd_commands'])
 
     result['asmcmd_message'] = results_of_execute_asmcmd
+    result['asmcmd_errors'] = results_of_execute_asmcmd[3]
+    result['asmcmd_results'] = results_of_execute_asmcmd[4]
 
     if results_of_execute_asmcmd[1] != '':
         module.fail_json(msg='ASMCMD module has failed (ORA-XXXX errors listed)!', **result)    
@@ -97,7 +97,7 @@ changed:
 '''
 
 from ansible.module_utils.basic import AnsibleModule
-from subprocess import Popen, PIPE
+from ansible.module_utils.oracle_exec import oracle_env, run_oracle_command
 from tempfile import mkstemp, TemporaryFile
 from datetime import datetime, timedelta
 import os, sys, re
@@ -138,8 +138,8 @@ def setup_cloud_rman_module(opc_install_location, host, opc_id, opc_pass, contai
         args.append('-proxyPass')
         args.append(proxy_pass)
 
-    p = Popen(args, stdout=PIPE, stderr=PIPE, stdin=PIPE)    
-    stdoutResult, stderrResult = p.communicate()
+    odcb_result = run_oracle_command(args, oracle_env())
+    stdoutResult, stderrResult = odcb_result.stdout, odcb_result.stderr
 
     return [stdoutResult.split('\n'),stderrResult,' '.join(args)]
 
@@ -157,7 +157,7 @@ changed:
 '''
 
 from ansible.module_utils.basic import AnsibleModule
-from subprocess import Popen, PIPE
+from ansible.module_utils.oracle_exec import oracle_env, run_oracle_command
 from tempfile import mkstemp, TemporaryFile
 from datetime import datetime, timedelta
 import os, sys, re, json
@@ -302,14 +302,10 @@ def execute_dbcli(dbcli_command,
     if register_database_syspassword is not None:
         args.append('--syspassword')    
 
-    my_env = os.environ.copy()
-    
-    p = Popen(args, stdout=PIPE, stderr=PIPE, env=my_env, stdin=PIPE)    
-    
-    if register_database_syspassword is not None:
-        p.stdin.write(register_database_syspassword.encode())    
+    my_env = oracle_env()
 
-    stdoutResult, stderrResult = p.communicate()    
+    dbcli_result = run_oracle_command(args, my_env, register_database_syspassword)
+    stdoutResult, stderrResult = dbcli_result.stdout, dbcli_result.stderr
     
     return [stdoutResult,stderrResult,' '.join(args)]
 
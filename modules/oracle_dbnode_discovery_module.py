@@ -42,6 +42,22 @@ options:
         description:
             - Accept some data cannot be found. 
         required: false        
+    probe_parallel:
+        description:
+            - Maximum number of lsnrctl/srvctl commands run at the same time (default 4). Each distinct command is run once and its output is shared by all parsers.
+        required: false
+    use_cache:
+        description:
+            - Return the snapshot written by a previous discovery on this host when /etc/oratab, inventory.xml and sqlnet.ora have not changed since (skips the crsctl/srvctl/sqlplus calls).
+        required: false
+    cache_max_age:
+        description:
+            - Snapshot older than this number of seconds is not used (default 3600), CRS and srvctl configuration changes are not seen by the file stamps.
+        required: false
+    cache_dir:
+        description:
+            - Directory of the discovery snapshots (default /tmp/admt_discovery_cache). A snapshot is written after each successful discovery.
+        required: false
 
 
 '''
@@ -92,74 +108,90 @@ scan_listener_port:
 scan_dns_name:
     description: Scan DNS Name
     type: str
+discovery_cache_hit:
+    description: True when the values were returned from the discovery snapshot (use_cache).
+    type: bool
 changed:
     description: will be used for the future all removed.
     type: bool   
 '''
 
 from ansible.module_utils.basic import AnsibleModule
-from subprocess import Popen, PIPE
+from ansible.module_utils.oracle_exec import find_oracle_home, find_oracle_gi_home, oracle_env, run_oracle_command
+from ansible.module_utils.oracle_discovery_cache import discovery_cache_paths, discovery_cache_file, read_discovery_cache, write_discovery_cache
 from tempfile import mkstemp, TemporaryFile
 from datetime import datetime, timedelta
 import os, sys, re
 import json
+from multiprocessing.pool import ThreadPool
 
 
-def demote(user_uid, user_gid):
+probe_outputs = {}
 
-    def set_ids():
-        os.setgid(user_gid)
-        os.setuid(user_uid)
+def srvctl_config_args(oracle_gi_home, srvctl_object):
 
-    return set_ids
+    return (os.path.join(oracle_gi_home, 'bin', 'srvctl'), 'config', srvctl_object)
 
-def find_oracle_home(oracle_sid, oratab_location):
+def lsnrctl_status_args(oracle_home):
 
-    if oratab_location is None:
-        oratab_location = '/etc/oratab'
+    return (os.path.join(oracle_home, 'bin', 'lsnrctl'), 'status')
 
-    re_db_home = re.compile(r'^('+oracle_sid+'):(?P<HOME>(/|\w+|\.)+):(Y|N)')
+def probe_env(args):
 
-    with open(oratab_location, 'r') as f:
-        for line in f:
-            line = line.strip()
-            re_db_home_match = re_db_home.search(line)
-            if re_db_home_match:
-                try:
-                    db_home = re_db_home_match.group('HOME')
-                except Exception: 
-                    db_home = ''
-                return db_home
+    if os.path.basename(args[0]) == 'lsnrctl':
+        return oracle_env(os.path.dirname(os.path.dirname(args[0])))
+    return oracle_env()
 
-def find_oracle_gi_home(oratab_location):
+def execute_probe(args):
 
-    if oratab_location is None:
-        oratab_location = '/etc/oratab'
+    try:
+        probe_result = run_oracle_command(list(args), probe_env(args))
+    except OSError as e:
+        return ('', str(e))
+    return (probe_result.stdout, probe_result.stderr)
 
-    re_gi_home = re.compile(r'(\+ASM[1-9]):(?P<HOME>(/|\w+|\.)+):(Y|N)')
+def run_probes(probes, probe_parallel):
 
-    with open(oratab_location, 'r') as f:
-        for line in f:
-            line = line.strip()
-            re_gi_home_match = re_gi_home.search(line)
-            if re_gi_home_match:
-                try:
-                    gi_home = re_gi_home_match.group('HOME')
-                except Exception: 
-                    gi_home = ''
-                return gi_home
+    pending = []
+    for args in probes:
+        if args not in probe_outputs and args not in pending:
+            pending.append(args)
 
-def find_listener_name(oracle_gi_home):
+    if len(pending) == 1 or probe_parallel <= 1:
+        for args in pending:
+            probe_outputs[args] = execute_probe(args)
+    elif pending:
+        pool = ThreadPool(min(probe_parallel, len(pending)))
+        try:
+            for args, output in zip(pending, pool.map(execute_probe, pending)):
+                probe_outputs[args] = output
+        finally:
+            pool.close()
+            pool.join()
 
-    my_env = os.environ.copy()
-    args = [os.path.join(oracle_gi_home, 'bin', 'srvctl')]
-    args.append('config')
-    args.append('listener')
-    
-    p = Popen(args, stdout=PIPE, stderr=PIPE, env=my_env, stdin=PIPE)    
-    stdoutResult, stderrResult = p.communicate()
+def probe_output(args):
+
+    if args not in probe_outputs:
+        probe_outputs[args] = execute_probe(args)
 
+    stdoutResult, stderrResult = probe_outputs[args]
     if stderrResult != '':
+        return None
+    return stdoutResult
+
+def demote(user_uid, user_gid):
+
+    def set_ids():
+        os.setgid(user_gid)
+        os.setuid(user_uid)
+
+    return set_ids
+
+def find_listener_name(oracle_gi_home):
+
+    stdoutResult = probe_output(srvctl_config_args(oracle_gi_home, 'listener'))
+
+    if stdoutResult is None:
         return ''
     else: 
         re_listener_name = re.compile(r'^Name: (?P<LISTENER_NAME>(/|\w+|\.)+)')
@@ -171,15 +203,9 @@ def find_listener_name(oracle_gi_home):
         return local_listener_name
 
 def find_listener_port(oracle_gi_home):
-    my_env = os.environ.copy()
-    args = [os.path.join(oracle_gi_home, 'bin', 'srvctl')]
-    args.append('config')
-    args.append('listener')
-    
-    p = Popen(args, stdout=PIPE, stderr=PIPE, env=my_env, stdin=PIPE)    
-    stdoutResult, stderrResult = p.communicate()
+    stdoutResult = probe_output(srvctl_config_args(oracle_gi_home, 'listener'))
 
-    if stderrResult != '':
+    if stdoutResult is None:
         return ''
     else: 
         re_listener_port = re.compile(r'End points: TCP:(?P<LISTENER_PORT>(/|\w+|\.)+)')
@@ -191,17 +217,9 @@ def find_listener_port(oracle_gi_home):
         return local_listener_port
 
 def find_listener_config_file(oracle_home):
-    my_env = os.environ.copy()
-    my_env["PATH"] = my_env["PATH"] + oracle_home+'/bin'
-    my_env["ORACLE_HOME"] = oracle_home
-    
-    args = [os.path.join(oracle_home, 'bin', 'lsnrctl')]
-    args.append('status')
-    
-    p = Popen(args, stdout=PIPE, stderr=PIPE, env=my_env, stdin=PIPE)    
-    stdoutResult, stderrResult = p.communicate()
+    stdoutResult = probe_output(lsnrctl_status_args(oracle_home))
 
-    if stderrResult != '':
+    if stdoutResult is None:
         return ''
     else: 
         re_listener_config_file = re.compile(r'Listener Parameter File   (?P<LISTENER_CONFIG_FILE>(/|\w+|\.)+)')
@@ -214,15 +232,9 @@ def find_listener_config_file(oracle_home):
 
 
 def find_scan_listeners(oracle_gi_home):
-    my_env = os.environ.copy()
-    args = [os.path.join(oracle_gi_home, 'bin', 'srvctl')]
-    args.append('config')
-    args.append('scan_listener')
-    
-    p = Popen(args, stdout=PIPE, stderr=PIPE, env=my_env, stdin=PIPE)    
-    stdoutResult, stderrResult = p.communicate()
+    stdoutResult = probe_output(srvctl_config_args(oracle_gi_home, 'scan_listener'))
 
-    if stderrResult != '':
+    if stdoutResult is None:
         return ''
     else: 
         scan_listeners = []
@@ -238,15 +250,9 @@ def find_scan_listeners(oracle_gi_home):
         return scan_listeners
 
 def find_scan_listener_port(oracle_gi_home):
-    my_env = os.environ.copy()
-    args = [os.path.join(oracle_gi_home, 'bin', 'srvctl')]
-    args.append('config')
-    args.append('scan_listener')
-    
-    p = Popen(args, stdout=PIPE, stderr=PIPE, env=my_env, stdin=PIPE)    
-    stdoutResult, stderrResult = p.communicate()
+    stdoutResult = probe_output(srvctl_config_args(oracle_gi_home, 'scan_listener'))
 
-    if stderrResult != '':
+    if stdoutResult is None:
         return ''
     else: 
         if oracle_gi_home == '/u01/app/19.0.0.0/grid':
@@ -262,15 +268,9 @@ def find_scan_listener_port(oracle_gi_home):
         return scan_listener_port        
 
 def find_scan_dns_name(oracle_gi_home):
-    my_env = os.environ.copy()
-    args = [os.path.join(oracle_gi_home, 'bin', 'srvctl')]
-    args.append('config')
-    args.append('scan')
-    
-    p = Popen(args, stdout=PIPE, stderr=PIPE, env=my_env, stdin=PIPE)    
-    stdoutResult, stderrResult = p.communicate()
+    stdoutResult = probe_output(srvctl_config_args(oracle_gi_home, 'scan'))
 
-    if stderrResult != '':
+    if stdoutResult is None:
         return ''
     else: 
         re_scan_dns_name = re.compile(r'SCAN name: (?P<SCAN_DNS_NAME>(/|\w+|\.|\d|\-)+)')
@@ -282,15 +282,9 @@ def find_scan_dns_name(oracle_gi_home):
         return scan_dns_name       
 
 def find_dns_domain(oracle_gi_home):
-    my_env = os.environ.copy()
-    args = [os.path.join(oracle_gi_home, 'bin', 'srvctl')]
-    args.append('config')
-    args.append('scan')
-    
-    p = Popen(args, stdout=PIPE, stderr=PIPE, env=my_env, stdin=PIPE)    
-    stdoutResult, stderrResult = p.communicate()
+    stdoutResult = probe_output(srvctl_config_args(oracle_gi_home, 'scan'))
 
-    if stderrResult != '':
+    if stdoutResult is None:
         return ''
     else: 
         re_dns_domain = re.compile(r'SCAN name: (/|\w+|\d|\-)+[.](?P<DNS_DOMIAN>(/|\w+|\.|\d|\-)+)')
@@ -301,7 +295,7 @@ def find_dns_domain(oracle_gi_home):
             dns_domain = ''
         return dns_domain                  
 
-def execute_main(oracle_home, oracle_gi_home, oracle_sid, oratab_location, accept_data_not_found):
+def execute_main(oracle_home, oracle_gi_home, oracle_sid, oratab_location, accept_data_not_found, probe_parallel):
 
 
     listener_config_file = ''
@@ -309,9 +303,25 @@ def execute_main(oracle_home, oracle_gi_home, oracle_sid, oratab_location, accep
     if oracle_sid is None and accept_data_not_found is False:
         return ['ERROR: No ORACLE_SID defined when accept_data_not_found = False.', '','','','','','','','','','']
 
-    if oracle_home is None and oracle_sid is not None: 
-       oracle_home = find_oracle_home(oracle_sid, oratab_location)
+    oracle_home_derived = oracle_home is None and oracle_sid is not None
+
+    if oracle_home_derived:
+        oracle_home = find_oracle_home(oracle_sid, oratab_location)
+
+    if oracle_gi_home is None: 
+        oracle_gi_home = find_oracle_gi_home(oratab_location)
 
+    # lsnrctl status and each srvctl config output is needed by several parsers, run them once and concurrently
+    probes = []
+    if oracle_home_derived and oracle_home is not None:
+        probes.append(lsnrctl_status_args(oracle_home))
+    if oracle_gi_home is not None:
+        probes.append(srvctl_config_args(oracle_gi_home, 'listener'))
+        probes.append(srvctl_config_args(oracle_gi_home, 'scan_listener'))
+        probes.append(srvctl_config_args(oracle_gi_home, 'scan'))
+    run_probes(probes, probe_parallel)
+
+    if oracle_home_derived: 
        if oracle_home is None:
             if accept_data_not_found is False:
                 return ['ERROR: File oratab not found or no ORACLE_SID within oratab file.', oracle_home,'','','','','','','','','']
@@ -321,9 +331,6 @@ def execute_main(oracle_home, oracle_gi_home, oracle_sid, oratab_location, accep
                 if accept_data_not_found is False:    
                     return ['ERROR: Error on executing lsnrctl status for listener config file.',oracle_home,'','','','','','','','',''] 
     
-    if oracle_gi_home is None: 
-        oracle_gi_home = find_oracle_gi_home(oratab_location)
-    
     if oracle_gi_home is None and accept_data_not_found is False:
         return ['ERROR: File oratab not found or no ASM instance within oratab file.', oracle_home,'','','','','','','','','']
 
@@ -373,6 +380,10 @@ def run_module():
         oracle_sid=dict(type='str', required=False),
         oratab_location=dict(type='str', required=False),  
         accept_data_not_found=dict(type='bool', required=False, default=True),                 
+        probe_parallel=dict(type='int', required=False, default=4),
+        use_cache=dict(type='bool', required=False, default=False),
+        cache_dir=dict(type='str', required=False, default='/tmp/admt_discovery_cache'),
+        cache_max_age=dict(type='int', required=False, default=3600),
     )
 
     result = dict(
@@ -388,7 +399,7 @@ def run_module():
         scan_listener_port='',
         scan_dns_name='',
         dns_domain='',
-
+        discovery_cache_hit=False,
     )
 
     module = AnsibleModule(
@@ -399,7 +410,19 @@ def run_module():
     if module.check_mode:
         return result
 
-    results_of_execute_main = execute_main(module.params['oracle_home'],module.params['oracle_gi_home'],module.params['oracle_sid'],module.params['oratab_location'],module.params['accept_data_not_found'])
+    cache_key = dict(oracle_home=module.params['oracle_home'], oracle_gi_home=module.params['oracle_gi_home'], oracle_sid=module.params['oracle_sid'], oratab_location=module.params['oratab_location'], accept_data_not_found=module.params['accept_data_not_found'])
+    cache_file = discovery_cache_file(module.params['cache_dir'], 'oracle_dbnode_discovery_module', cache_key)
+
+    results_of_execute_main = None
+    if module.params['use_cache']:
+        results_of_execute_main = read_discovery_cache(cache_file, cache_key, module.params['cache_max_age'])
+        result['discovery_cache_hit'] = results_of_execute_main is not None
+
+    if results_of_execute_main is None:
+        results_of_execute_main = execute_main(module.params['oracle_home'],module.params['oracle_gi_home'],module.params['oracle_sid'],module.params['oratab_location'],module.params['accept_data_not_found'],module.params['probe_parallel'])
+        if results_of_execute_main[0] == '':
+            listener_ora = [os.path.join(results_of_execute_main[2], 'network', 'admin', 'listener.ora')] if results_of_execute_main[2] else []
+            write_discovery_cache(cache_file, 'oracle_dbnode_discovery_module', cache_key, discovery_cache_paths(module.params['oratab_location'], [results_of_execute_main[1], results_of_execute_main[2]], listener_ora), results_of_execute_main)
     
     result['oracle_home'] = results_of_execute_main[1]
     result['oracle_gi_home'] = results_of_execute_main[2]
@@ -50,14 +50,19 @@ options:
         description:
             - When set to True module will ignore ORA-XXXX errors 
         required: false    
+    ignore_error_codes:
+        description:
+            - List of error codes which do not fail the module (for example ORA-01109 or PRCD-1120, a bare facility like PRKO ignores all its codes). Errors are still listed in expdp_errors.
+        required: false
     directory:
         description:
-            - the name of DIRECTORY object
-        required: true
+            - the name of DIRECTORY object (not needed with attach)
+        required: false
     dumpfile:
         description:
-            - the path and file of dumpfile.
-        required: true                    
+            - the path and file of dumpfile. With parallel above 1 or filesize and no substitution variable in the name, _%U is added before the extension (scott.dmp becomes scott_%U.dmp, returned as expdp_dumpfile).
+              Not needed with attach.
+        required: false                    
     no_execution:
         description:
             - Show show the command which will be executed.
@@ -97,6 +102,48 @@ options:
         description:
             - SCHEMAS parameter of EXPDP
         required: false    
+    parallel:
+        description:
+            - PARALLEL parameter of EXPDP (number of Data Pump worker processes).
+        required: false
+    filesize:
+        description:
+            - FILESIZE parameter of EXPDP (for example 10G), dump file set is split into files of this size.
+        required: false
+    compression:
+        description:
+            - COMPRESSION parameter of EXPDP (ALL, DATA_ONLY, METADATA_ONLY or NONE).
+        required: false
+    exclude:
+        description:
+            - List of EXCLUDE parameters of EXPDP (for example STATISTICS or TABLE:"IN ('EMP')"), one EXCLUDE= per element.
+        required: false
+    include:
+        description:
+            - List of INCLUDE parameters of EXPDP, one INCLUDE= per element.
+        required: false
+    cluster:
+        description:
+            - CLUSTER parameter of EXPDP, when set to True workers are started on all RAC instances (DIRECTORY must point to storage shared by the nodes).
+        required: false
+    job_name:
+        description:
+            - JOB_NAME parameter of EXPDP. When progress_file is given without job_name, ADMT_EXPDP_<timestamp>_<random> is used, so the job can be attached to later.
+        required: false
+    attach:
+        description:
+            - Name of a running or stopped EXPDP job to attach to (ATTACH parameter). The client continues the job (CONTINUE_CLIENT) and streams its log until the job ends,
+              other job parameters are taken from the job itself.
+        required: false
+    progress_file:
+        description:
+            - While the job runs, DBA_DATAPUMP_JOBS (CDB_DATAPUMP_JOBS of the PDB behind pdb_service) and GV$SESSION_LONGOPS are sampled through one sqlplus session and job state, objects and rows processed,
+              bytes done, bytes/sec and ETA are written to this JSON file (for example to be read while the task runs with async).
+        required: false
+    progress_interval:
+        description:
+            - Number of seconds between progress samples.
+        required: false
 
 
 
@@ -111,39 +158,92 @@ EXAMPLES = '''
     directory: 'dmpdir'
     dumpfile: 'scott.dmp'
 
+# Export schema with 8 workers spread across RAC instances into 10G compressed files (scott_01.dmp, scott_02.dmp, ...)
+- name: Export schema via EXPDP
+  oracle_expdp_module:
+    oracle_sid: '<SID>1'
+    directory: 'dmpdir'
+    dumpfile: 'scott.dmp'
+    schemas: 'SCOTT'
+    parallel: 8
+    filesize: '10G'
+    compression: 'ALL'
+    cluster: True
+    exclude:
+      - 'STATISTICS'
+
+# Export schema as a named job and report progress every 30 seconds into JSON file
+- name: Export schema via EXPDP
+  oracle_expdp_module:
+    oracle_sid: '<SID>'
+    directory: 'dmpdir'
+    dumpfile: 'scott.dmp'
+    schemas: 'SCOTT'
+    job_name: 'SCOTT_EXPORT'
+    progress_file: '/tmp/scott_export_progress.json'
+    progress_interval: 30
+  async: 86400
+  poll: 30
+
+# Attach to the job again after the connection was lost and wait for it to finish
+- name: Attach to EXPDP job
+  oracle_expdp_module:
+    oracle_sid: '<SID>'
+    attach: 'SCOTT_EXPORT'
+    progress_file: '/tmp/scott_export_progress.json'
+
 '''
 
 RETURN = '''
 expdp_message:
     description: result of expdp execution.
     type: str
+expdp_dumpfiles:
+    description: dump files written by EXPDP (path and bytes, bytes is null when the file is not visible on this host, for example in ASM).
+    type: list
+expdp_job_name:
+    description: JOB_NAME of the Data Pump job (to be used with attach).
+    type: str
+expdp_dumpfile:
+    description: DUMPFILE given to EXPDP (with _%U added for parallel or filesize), to be used as dumpfile of oracle_impdp_module.
+    type: str
+expdp_errors:
+    description: errors found in the output (facility, code, message, line_no), without the ignored ones.
+    type: list
 changed:
     description: will be used for the future all removed.
     type: bool   
 '''
 
 from ansible.module_utils.basic import AnsibleModule
-from subprocess import Popen, PIPE
+from ansible.module_utils.oracle_exec import find_oracle_home, oracle_env, run_oracle_command, classify_oracle_errors
+from ansible.module_utils.oracle_datapump import new_datapump_job_name, valid_datapump_job_name, datapump_dumpfile_template, new_datapump_output_state, parse_datapump_output_line, start_datapump_monitor, finish_datapump_monitor
 from tempfile import mkstemp, TemporaryFile
 from datetime import datetime, timedelta
 import os, sys, re
 
-
-def find_oracle_home(oracle_sid):
-
-    re_db_home = re.compile(r'^('+oracle_sid+'):(?P<HOME>(/|\w+|\.)+):(Y|N)')
-
-    with open('/etc/oratab', 'r') as f:
-        for line in f:
-            line = line.strip()
-            re_db_home_match = re_db_home.search(line)
-            if re_db_home_match:
-                db_home = re_db_home_match.group('HOME')
-                #print(db_home)
-
-                return db_home
-
-def execute_expdp(oracle_home, oracle_sid, directory, dumpfile, output_as_array, ignore_ORA_errors, username, password, as_sysdba, pdb_service, no_execution, no_log_file, transportable, version, full, encryption_password, transport_full_check, transport_tablespaces, schemas):
+re_dumpfile_set = re.compile(r'^Dump file set for \S+ is:')
+
+def find_expdp_dumpfiles(lines):
+
+    dumpfiles = []
+    in_dumpfile_set = False
+    for line in lines:
+        if re_dumpfile_set.match(line.strip()):
+            in_dumpfile_set = True
+            continue
+        if in_dumpfile_set:
+            path = line.strip()
+            if path == '' or path.startswith('Job ') or ' ' in path:
+                in_dumpfile_set = False
+                continue
+            if os.path.isfile(path):
+                dumpfiles.append(dict(path=path, bytes=os.path.getsize(path)))
+            else:
+                dumpfiles.append(dict(path=path, bytes=None))
+    return dumpfiles
+
+def execute_expdp(oracle_home, oracle_sid, directory, dumpfile, output_as_array, ignore_ORA_errors, username, password, as_sysdba, pdb_service, no_execution, no_log_file, transportable, version, full, encryption_password, transport_full_check, transport_tablespaces, schemas, ignore_error_codes, parallel, filesize, compression, exclude, include, cluster, job_name, attach, progress_file, progress_interval):
 
     if oracle_home is None:
        oracle_home = find_oracle_home(oracle_sid)
@@ -159,8 +259,41 @@ def execute_expdp(oracle_home, oracle_sid, directory, dumpfile, output_as_array,
     if as_sysdba is True:    
         args.append('\"/ as sysdba\"')
 
-    args.append('directory='+directory)  
-    args.append('dumpfile='+dumpfile)
+    connect_args = len(args)
+
+    if job_name is None and progress_file is not None and attach is None:
+        job_name = new_datapump_job_name('expdp')
+
+    if job_name is not None:
+        args.append('job_name='+job_name)
+
+    if directory is not None:
+        args.append('directory='+directory)  
+
+    if dumpfile is not None:
+        dumpfile = datapump_dumpfile_template(dumpfile, parallel, filesize)
+        args.append('dumpfile='+dumpfile)
+
+    if parallel is not None:
+        args.append('parallel='+str(parallel))
+
+    if filesize is not None:
+        args.append('filesize='+filesize)
+
+    if compression is not None:
+        args.append('compression='+compression)
+
+    if cluster is not None:
+        if cluster is True:
+            args.append('cluster=y')
+        else:
+            args.append('cluster=n')
+
+    for exclude_filter in exclude or []:
+        args.append('exclude='+exclude_filter)
+
+    for include_filter in include or []:
+        args.append('include='+include_filter)
 
     if transportable is not None:
         args.append('transportable='+transportable)
@@ -195,72 +328,61 @@ def execute_expdp(oracle_home, oracle_sid, directory, dumpfile, output_as_array,
         else:
             args.append('nologfile=n')
     
-    my_env = os.environ.copy()
-    my_env["PATH"] = my_env["PATH"] + oracle_home+'/bin'
-    my_env["ORACLE_HOME"] = oracle_home
-    my_env["ORACLE_SID"] = oracle_sid
+    # an attached client takes only the job name, the job keeps the parameters it was started with
+    if attach is not None:
+        job_name = attach
+        args = args[:connect_args]+['attach='+attach]
+        input_data = 'CONTINUE_CLIENT\n'
+    else:
+        input_data = None
+
+    my_env = oracle_env(oracle_home, oracle_sid)
 
     if no_execution is True:
-        return [' '.join(args),'','']
+        return [' '.join(args),'','',[],[],job_name,dumpfile]
     else:    
-        p = Popen(args, stdout=PIPE, stderr=PIPE, env=my_env, stdin=PIPE)    
-       
-        expdpResult, stderrResult = p.communicate()
+        expdp_output_state = new_datapump_output_state()
 
-        if expdpResult.count('ORA-') > 0:
-        
-            if ignore_ORA_errors == False:            
-                oraErrors = re.findall('ORA-(.+?):', expdpResult) 
-            if ignore_ORA_errors == True:            
-                oraErrors = ''          
-        
-        if expdpResult.count('ORA-') == 0:
-            oraErrors = ''
+        if progress_file is not None:
+            datapump_monitor = start_datapump_monitor(oracle_home, my_env, job_name, progress_file, progress_interval, expdp_output_state, pdb_service)
+        else:
+            datapump_monitor = None
 
-        if expdpResult.count('LRM-') > 0:
-        
-            if ignore_ORA_errors == False:            
-                oraErrors = re.findall('LRM-(.+?):', expdpResult) 
-            if ignore_ORA_errors == True:            
-                oraErrors = ''          
-        
-        if expdpResult.count('LRM-') == 0:
-            oraErrors = ''    
+        try:
+            expdp_result = run_oracle_command(args, my_env, input_data, line_handler=lambda line: parse_datapump_output_line(expdp_output_state, line))
+        except Exception:
+            if datapump_monitor is not None:
+                finish_datapump_monitor(datapump_monitor, 'FAILED')
+            raise
+        expdpResult, stderrResult = expdp_result.stdout, expdp_result.stderr
 
-        if stderrResult.count('ORA-') > 0:
-        
-            if ignore_ORA_errors == False:            
-                oraErrors = re.findall('ORA-(.+?):', stderrResult) 
-            if ignore_ORA_errors == True:            
-                oraErrors = ''          
-        
-        if stderrResult.count('ORA-') == 0:
+        expdpDumpfiles = find_expdp_dumpfiles(expdpResult.split('\n')+stderrResult.split('\n'))
+
+        expdpErrors = classify_oracle_errors(expdp_result.errors, ('ORA', 'LRM'), ignore_error_codes)
+        oraErrors = [error['facility']+'-'+error['code'] for error in expdpErrors]
+        if ignore_ORA_errors == True or not oraErrors:
             oraErrors = ''
 
-        if stderrResult.count('LRM-') > 0:
-        
-            if ignore_ORA_errors == False:            
-                oraErrors = re.findall('LRM-(.+?):', stderrResult) 
-            if ignore_ORA_errors == True:            
-                oraErrors = ''          
-        
-        if stderrResult.count('LRM-') == 0:
-            oraErrors = ''        
+        if datapump_monitor is not None:
+            if oraErrors != '' or expdp_result.returncode != 0:
+                finish_datapump_monitor(datapump_monitor, 'FAILED')
+            else:
+                finish_datapump_monitor(datapump_monitor, 'COMPLETED')
     
         if output_as_array == True:
             expdpResult = expdpResult.split('\n')
             stderrResult = stderrResult.split('\n')
             expdpResult[:] = [item for item in expdpResult if item != '']
 
-        return [expdpResult,oraErrors,stderrResult]
+        return [expdpResult,oraErrors,stderrResult,expdpErrors,expdpDumpfiles,job_name,dumpfile]
 
 def run_module():
     
     module_args = dict(
         oracle_home=dict(type='str', required=False), 
         oracle_sid=dict(type='str', required=True), 
-        directory=dict(type='str', required=True), 
-        dumpfile=dict(type='str', required=True), 
+        directory=dict(type='str', required=False), 
+        dumpfile=dict(type='str', required=False), 
         output_as_array=dict(type='bool', required=False, default=True), 
         ignore_ORA_errors=dict(type='bool', required=False, default=False), 
         username=dict(type='str', required=False),    
@@ -275,7 +397,18 @@ def run_module():
         encryption_password=dict(type='str', required=False),
         transport_full_check=dict(type='bool', required=False),
         transport_tablespaces=dict(type='str', required=False),
-        schemas=dict(type='str', required=False)   
+        schemas=dict(type='str', required=False),
+        ignore_error_codes=dict(type='list', required=False, default=[]),
+        parallel=dict(type='int', required=False),
+        filesize=dict(type='str', required=False),
+        compression=dict(type='str', required=False, choices=['ALL', 'DATA_ONLY', 'METADATA_ONLY', 'NONE']),
+        exclude=dict(type='list', required=False),
+        include=dict(type='list', required=False),
+        cluster=dict(type='bool', required=False),
+        job_name=dict(type='str', required=False),
+        attach=dict(type='str', required=False),
+        progress_file=dict(type='str', required=False),
+        progress_interval=dict(type='int', required=False, default=60)
     )
 
     result = dict(
@@ -291,6 +424,13 @@ def run_module():
     if module.check_mode:
         return result
 
+    if module.params['attach'] is None and (module.params['directory'] is None or module.params['dumpfile'] is None):
+        module.fail_json(msg='directory and dumpfile are required unless attach is given!', **result)
+
+    for job_name in (module.params['job_name'], module.params['attach']):
+        if job_name is not None and not valid_datapump_job_name(job_name):
+            module.fail_json(msg='Data Pump job name '+job_name+' is not valid!', **result)
+
     results_of_execute_expdp = execute_expdp(
         module.params['oracle_home'],
         module.params['oracle_sid'],
@@ -310,10 +450,25 @@ def run_module():
         module.params['encryption_password'],
         module.params['transport_full_check'],
         module.params['transport_tablespaces'],
-        module.params['schemas']
+        module.params['schemas'],
+        module.params['ignore_error_codes'],
+        module.params['parallel'],
+        module.params['filesize'],
+        module.params['compression'],
+        module.params['exclude'],
+        module.params['include'],
+        module.params['cluster'],
+        module.params['job_name'],
+        module.params['attach'],
+        module.params['progress_file'],
+        module.params['progress_interval']
         )
     
     result['expdp_message'] = results_of_execute_expdp
+    result['expdp_errors'] = results_of_execute_expdp[3]
+    result['expdp_dumpfiles'] = results_of_execute_expdp[4]
+    result['expdp_job_name'] = results_of_execute_expdp[5]
+    result['expdp_dumpfile'] = results_of_execute_expdp[6]
 
     if results_of_execute_expdp[1] != '':
         module.fail_json(msg='DataPump EXPDP module has failed (ORA/LRM-XXXX errors listed)!', **result)    
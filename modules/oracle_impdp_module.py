@@ -50,14 +50,75 @@ options:
         description:
             - When set to True module will ignore ORA-XXXX errors 
         required: false    
+    ignore_error_codes:
+        description:
+            - List of error codes which do not fail the module (for example ORA-01109 or PRCD-1120, a bare facility like PRKO ignores all its codes). Errors are still listed in impdp_errors.
+        required: false
     directory:
         description:
-            - the name of DIRECTORY object
-        required: true
+            - the name of DIRECTORY object (not needed with attach)
+        required: false
     dumpfile:
         description:
-            - the path and file of dumpfile.
-        required: true                    
+            - the path and file of dumpfile (%U template for a dump file set written with parallel or filesize, for example scott_%U.dmp).
+              With parallel above 1 and no substitution variable in the name, _%U is added before the extension like in oracle_expdp_module.
+              For a set written with filesize only use expdp_dumpfile of oracle_expdp_module. Not needed with attach or network_link.
+        required: false                    
+    parallel:
+        description:
+            - PARALLEL parameter of IMPDP (number of Data Pump worker processes).
+        required: false
+    exclude:
+        description:
+            - List of EXCLUDE parameters of IMPDP (for example STATISTICS or TABLE:"IN ('EMP')"), one EXCLUDE= per element.
+        required: false
+    include:
+        description:
+            - List of INCLUDE parameters of IMPDP, one INCLUDE= per element.
+        required: false
+    remap_tablespace:
+        description:
+            - List of REMAP_TABLESPACE parameters of IMPDP (source:target, for example APP_DATA:USERS), one REMAP_TABLESPACE= per element.
+        required: false
+    cluster:
+        description:
+            - CLUSTER parameter of IMPDP, when set to True workers are started on all RAC instances (DIRECTORY must point to storage shared by the nodes).
+        required: false
+    job_name:
+        description:
+            - JOB_NAME parameter of IMPDP. When progress_file is given without job_name, ADMT_IMPDP_<timestamp>_<random> is used, so the job can be attached to later.
+        required: false
+    attach:
+        description:
+            - Name of a running or stopped IMPDP job to attach to (ATTACH parameter). The client continues the job (CONTINUE_CLIENT) and streams its log until the job ends,
+              other job parameters are taken from the job itself.
+        required: false
+    progress_file:
+        description:
+            - While the job runs, DBA_DATAPUMP_JOBS (CDB_DATAPUMP_JOBS of the PDB behind pdb_service) and GV$SESSION_LONGOPS are sampled through one sqlplus session and job state, objects and rows processed,
+              bytes done, bytes/sec and ETA are written to this JSON file (for example to be read while the task runs with async).
+        required: false
+    progress_interval:
+        description:
+            - Number of seconds between progress samples.
+        required: false
+    network_link:
+        description:
+            - NETWORK_LINK parameter of IMPDP, data is pulled from the source database over this database link with no dump file written or read (dumpfile is not used).
+        required: false
+    network_link_tns_alias:
+        description:
+            - TNS alias of the source database (for example an entry rendered from templates/sqlnet/tnsnames.ora.j2). A temporary database link ADMT_LINK_<timestamp>_<random>
+              is created with network_link_username/network_link_password for the user running the import and dropped when the import ends.
+        required: false
+    network_link_username:
+        description:
+            - source database user of the temporary database link.
+        required: false
+    network_link_password:
+        description:
+            - password of network_link_username.
+        required: false
     no_execution:
         description:
             - Show show the command which will be executed.
@@ -103,39 +164,72 @@ EXAMPLES = '''
     directory: 'dmpdir'
     dumpfile: 'scott.dmp'
 
+# Import dump file set written by EXPDP with parallel/filesize using 8 workers
+- name: Import schema via IMPDP
+  oracle_impdp_module:
+    oracle_sid: '<SID>'
+    directory: 'dmpdir'
+    dumpfile: 'scott_%U.dmp'
+    schemas: 'SCOTT'
+    parallel: 8
+
+# Import schema as a named job, report progress into JSON file
+- name: Import schema via IMPDP
+  oracle_impdp_module:
+    oracle_sid: '<SID>'
+    directory: 'dmpdir'
+    dumpfile: 'scott_%U.dmp'
+    job_name: 'SCOTT_IMPORT'
+    progress_file: '/tmp/scott_import_progress.json'
+  async: 86400
+  poll: 30
+
+# Attach to the job again after the connection was lost and wait for it to finish
+- name: Attach to IMPDP job
+  oracle_impdp_module:
+    oracle_sid: '<SID>'
+    attach: 'SCOTT_IMPORT'
+
+# Import schema straight from the source database over a temporary database link, no dump file staging
+- name: Import schema via IMPDP over NETWORK_LINK
+  oracle_impdp_module:
+    oracle_sid: '<SID>'
+    directory: 'dmpdir'
+    schemas: 'SCOTT'
+    parallel: 8
+    network_link_tns_alias: '<SOURCE_DB_UNIQUE_NAME>'
+    network_link_username: 'system'
+    network_link_password: '<password>'
+
 '''
 
 RETURN = '''
 impdp_message:
     description: result of impdp execution.
     type: str
+impdp_job_name:
+    description: JOB_NAME of the Data Pump job (to be used with attach).
+    type: str
+impdp_network_link:
+    description: database link used by NETWORK_LINK import (temporary one is already dropped).
+    type: str
+impdp_errors:
+    description: errors found in the output (facility, code, message, line_no), without the ignored ones.
+    type: list
 changed:
     description: will be used for the future all removed.
     type: bool   
 '''
 
 from ansible.module_utils.basic import AnsibleModule
-from subprocess import Popen, PIPE
+from ansible.module_utils.oracle_exec import find_oracle_home, oracle_env, run_oracle_command, classify_oracle_errors
+from ansible.module_utils.oracle_datapump import new_datapump_job_name, valid_datapump_job_name, valid_datapump_db_link, datapump_dumpfile_template, create_datapump_db_link, drop_datapump_db_link, new_datapump_output_state, parse_datapump_output_line, start_datapump_monitor, finish_datapump_monitor
 from tempfile import mkstemp, TemporaryFile
 from datetime import datetime, timedelta
 import os, sys, re
 
 
-def find_oracle_home(oracle_sid):
-
-    re_db_home = re.compile(r'^('+oracle_sid+'):(?P<HOME>(/|\w+|\.)+):(Y|N)')
-
-    with open('/etc/oratab', 'r') as f:
-        for line in f:
-            line = line.strip()
-            re_db_home_match = re_db_home.search(line)
-            if re_db_home_match:
-                db_home = re_db_home_match.group('HOME')
-                #print(db_home)
-
-                return db_home
-
-def execute_impdp(oracle_home, oracle_sid, directory, dumpfile, output_as_array, ignore_ORA_errors, username, password, as_sysdba, pdb_service, no_execution, no_log_file, transport_datafiles, full, encryption_password, logfile, schemas):
+def execute_impdp(oracle_home, oracle_sid, directory, dumpfile, output_as_array, ignore_ORA_errors, username, password, as_sysdba, pdb_service, no_execution, no_log_file, transport_datafiles, full, encryption_password, logfile, schemas, ignore_error_codes, parallel, exclude, include, cluster, job_name, attach, progress_file, progress_interval, network_link, network_link_tns_alias, network_link_username, network_link_password, remap_tablespace):
 
     if oracle_home is None:
        oracle_home = find_oracle_home(oracle_sid)
@@ -156,8 +250,54 @@ def execute_impdp(oracle_home, oracle_sid, directory, dumpfile, output_as_array,
     else:        
         args.append('\'/ as sysdba\'')
 
-    args.append('directory='+directory)  
-    args.append('dumpfile='+dumpfile)
+    connect_args = len(args)
+
+    # the temporary database link belongs to the user running the import
+    if username is not None and password is not None:
+        sqlplus_connect = username+"/"+password
+        if pdb_service is not None:
+            sqlplus_connect += "@"+pdb_service
+        if as_sysdba is True:
+            sqlplus_connect += ' as sysdba'
+    else:
+        sqlplus_connect = '/ as sysdba'
+
+    temporary_db_link = network_link_tns_alias is not None and attach is None
+    if temporary_db_link:
+        network_link = new_datapump_job_name('link')
+
+    if network_link is not None:
+        args.append('network_link='+network_link)
+
+    if job_name is None and progress_file is not None and attach is None:
+        job_name = new_datapump_job_name('impdp')
+
+    if job_name is not None:
+        args.append('job_name='+job_name)
+
+    if directory is not None:
+        args.append('directory='+directory)  
+
+    if dumpfile is not None and network_link is None:
+        args.append('dumpfile='+datapump_dumpfile_template(dumpfile, parallel, None))
+
+    if parallel is not None:
+        args.append('parallel='+str(parallel))
+
+    if cluster is not None:
+        if cluster is True:
+            args.append('cluster=y')
+        else:
+            args.append('cluster=n')
+
+    for exclude_filter in exclude or []:
+        args.append('exclude='+exclude_filter)
+
+    for include_filter in include or []:
+        args.append('include='+include_filter)
+
+    for remap in remap_tablespace or []:
+        args.append('remap_tablespace='+remap)
 
     if transport_datafiles is not None:
         args.append('transport_datafiles='+transport_datafiles)
@@ -183,56 +323,53 @@ def execute_impdp(oracle_home, oracle_sid, directory, dumpfile, output_as_array,
     if logfile is not None:
         args.append('logfile='+logfile)     
 
-    my_env = os.environ.copy()
-    my_env["PATH"] = my_env["PATH"] + oracle_home+'/bin'
-    my_env["ORACLE_HOME"] = oracle_home
-    my_env["ORACLE_SID"] = oracle_sid
+    # an attached client takes only the job name, the job keeps the parameters it was started with
+    if attach is not None:
+        job_name = attach
+        args = args[:connect_args]+['attach='+attach]
+        input_data = 'CONTINUE_CLIENT\n'
+    else:
+        input_data = None
+
+    my_env = oracle_env(oracle_home, oracle_sid)
 
     if no_execution is True:
-        return [' '.join(args),'','']
+        return [' '.join(args),'','',' '.join(args),[],job_name,network_link]
     else:    
-        p = Popen(args, stdout=PIPE, stderr=PIPE, env=my_env, stdin=PIPE)    
-       
-        impdpResult, stderrResult = p.communicate()
-
-        #if impdpResult.count('ORA-') > 0:
-        #
-        #    if ignore_ORA_errors == False:            
-        #        oraErrors = re.findall('ORA-(.+?):', impdpResult) 
-        #    if ignore_ORA_errors == True:            
-        #        oraErrors = ''          
-        
-        #if impdpResult.count('ORA-') == 0:
-        #    oraErrors = ''
-
-        #if impdpResult.count('LRM-') > 0:
-        #
-        #    if ignore_ORA_errors == False:            
-        #        oraErrors = re.findall('LRM-(.+?):', impdpResult) 
-        #    if ignore_ORA_errors == True:            
-        #        oraErrors = ''          
-        
-        #if impdpResult.count('LRM-') == 0:
-        #    oraErrors = ''    
-
-        if stderrResult.count('ORA-') > 0:
-            if ignore_ORA_errors == False:            
-                oraErrors = re.findall('ORA-(.+?):', stderrResult) 
-            if ignore_ORA_errors == True:            
-                oraErrors = ''          
-        if stderrResult.count('ORA-') == 0:
-            #oraErrors = 'ORA-99999'
+        if temporary_db_link:
+            dbLinkErrors = create_datapump_db_link(oracle_home, my_env, sqlplus_connect, network_link, network_link_username, network_link_password, network_link_tns_alias)
+            if dbLinkErrors:
+                drop_datapump_db_link(oracle_home, my_env, sqlplus_connect, network_link)
+                return ['',[error['facility']+'-'+error['code'] for error in dbLinkErrors],'',' '.join(args),dbLinkErrors,job_name,network_link]
+
+        impdp_output_state = new_datapump_output_state()
+
+        if progress_file is not None:
+            datapump_monitor = start_datapump_monitor(oracle_home, my_env, job_name, progress_file, progress_interval, impdp_output_state, pdb_service)
+        else:
+            datapump_monitor = None
+
+        try:
+            impdp_result = run_oracle_command(args, my_env, input_data, line_handler=lambda line: parse_datapump_output_line(impdp_output_state, line))
+        except Exception:
+            if datapump_monitor is not None:
+                finish_datapump_monitor(datapump_monitor, 'FAILED')
+            raise
+        finally:
+            if temporary_db_link:
+                drop_datapump_db_link(oracle_home, my_env, sqlplus_connect, network_link)
+        impdpResult, stderrResult = impdp_result.stdout, impdp_result.stderr
+
+        impdpErrors = classify_oracle_errors(impdp_result.errors, ('ORA', 'LRM'), ignore_error_codes)
+        oraErrors = [error['facility']+'-'+error['code'] for error in impdpErrors]
+        if ignore_ORA_errors == True or not oraErrors:
             oraErrors = ''
 
-        if stderrResult.count('LRM-') > 0:
-        
-            if ignore_ORA_errors == False:            
-                oraErrors = re.findall('LRM-(.+?):', stderrResult) 
-            if ignore_ORA_errors == True:            
-                oraErrors = ''          
-        
-        if stderrResult.count('LRM-') == 0:
-            oraErrors = ''        
+        if datapump_monitor is not None:
+            if oraErrors != '' or impdp_result.returncode != 0:
+                finish_datapump_monitor(datapump_monitor, 'FAILED')
+            else:
+                finish_datapump_monitor(datapump_monitor, 'COMPLETED')
     
         if output_as_array == True:
             impdpResult = impdpResult.split('\n')
@@ -240,15 +377,15 @@ def execute_impdp(oracle_home, oracle_sid, directory, dumpfile, output_as_array,
             impdpResult[:] = [item for item in impdpResult if item != '']
 
 
-        return [impdpResult,oraErrors,stderrResult,' '.join(args)]
+        return [impdpResult,oraErrors,stderrResult,' '.join(args),impdpErrors,job_name,network_link]
 
 def run_module():
     
     module_args = dict(
         oracle_home=dict(type='str', required=False), 
         oracle_sid=dict(type='str', required=True), 
-        directory=dict(type='str', required=True), 
-        dumpfile=dict(type='str', required=True), 
+        directory=dict(type='str', required=False), 
+        dumpfile=dict(type='str', required=False), 
         output_as_array=dict(type='bool', required=False, default=True), 
         ignore_ORA_errors=dict(type='bool', required=False, default=False), 
         username=dict(type='str', required=False),    
@@ -261,7 +398,21 @@ def run_module():
         full=dict(type='bool', required=False),
         encryption_password=dict(type='str', required=False),
         logfile=dict(type='str', required=False),
-        schemas=dict(type='str', required=False)
+        schemas=dict(type='str', required=False),
+        ignore_error_codes=dict(type='list', required=False, default=[]),
+        parallel=dict(type='int', required=False),
+        exclude=dict(type='list', required=False),
+        include=dict(type='list', required=False),
+        cluster=dict(type='bool', required=False),
+        job_name=dict(type='str', required=False),
+        attach=dict(type='str', required=False),
+        progress_file=dict(type='str', required=False),
+        progress_interval=dict(type='int', required=False, default=60),
+        network_link=dict(type='str', required=False),
+        network_link_tns_alias=dict(type='str', required=False),
+        network_link_username=dict(type='str', required=False),
+        network_link_password=dict(type='str', required=False, no_log=True),
+        remap_tablespace=dict(type='list', required=False)
     )
 
     result = dict(
@@ -278,6 +429,25 @@ def run_module():
     if module.check_mode:
         return result
 
+    if module.params['attach'] is None and module.params['directory'] is None:
+        module.fail_json(msg='directory is required unless attach is given!', **result)
+
+    network_import = module.params['network_link'] is not None or module.params['network_link_tns_alias'] is not None
+    if module.params['attach'] is None and module.params['dumpfile'] is None and not network_import:
+        module.fail_json(msg='dumpfile is required unless attach, network_link or network_link_tns_alias is given!', **result)
+
+    if module.params['network_link_tns_alias'] is not None:
+        if module.params['network_link'] is not None:
+            module.fail_json(msg='network_link and network_link_tns_alias are mutually exclusive!', **result)
+        if module.params['network_link_username'] is None or module.params['network_link_password'] is None:
+            module.fail_json(msg='network_link_username and network_link_password are required with network_link_tns_alias!', **result)
+        if not valid_datapump_db_link('ADMT_LINK', module.params['network_link_username'], module.params['network_link_password'], module.params['network_link_tns_alias']):
+            module.fail_json(msg='network_link_username, network_link_password or network_link_tns_alias is not valid!', **result)
+
+    for job_name in (module.params['job_name'], module.params['attach']):
+        if job_name is not None and not valid_datapump_job_name(job_name):
+            module.fail_json(msg='Data Pump job name '+job_name+' is not valid!', **result)
+
     results_of_execute_impdp = execute_impdp(
         module.params['oracle_home'],
         module.params['oracle_sid'],
@@ -295,13 +465,30 @@ def run_module():
         module.params['full'],
         module.params['encryption_password'],
         module.params['logfile'],
-        module.params['schemas']
+        module.params['schemas'],
+        module.params['ignore_error_codes'],
+        module.params['parallel'],
+        module.params['exclude'],
+        module.params['include'],
+        module.params['cluster'],
+        module.params['job_name'],
+        module.params['attach'],
+        module.params['progress_file'],
+        module.params['progress_interval'],
+        module.params['network_link'],
+        module.params['network_link_tns_alias'],
+        module.params['network_link_username'],
+        module.params['network_link_password'],
+        module.params['remap_tablespace']
         )
     
     result['impdp_output'] = results_of_execute_impdp
     result['impdp_command'] = results_of_execute_impdp[3]
+    result['impdp_errors'] = results_of_execute_impdp[4]
+    result['impdp_job_name'] = results_of_execute_impdp[5]
+    result['impdp_network_link'] = results_of_execute_impdp[6]
 
-    if results_of_execute_impdp[2] != '':
+    if results_of_execute_impdp[1] != '':
         module.fail_json(msg='DataPump IMPDP module has failed (ORA/LRM-XXXX errors listed)!', **result)    
 
     module.exit_json(**result)
@@ -0,0 +1,319 @@
+#!/usr/bin/python
+#
+#Copyright (c) 2020, Oracle and/or its affiliates.
+#The Universal Permissive License (UPL), Version 1.0
+#
+
+ANSIBLE_METADATA = {
+    'metadata_version': '1.0',
+    'status': ['preview'],
+    'supported_by': 'community'
+}
+
+DOCUMENTATION = '''
+---
+module: oracle_migration_estimator_module
+
+short_description: This is simple pre-flight capacity and duration estimator module for remote execution
+
+version_added: "1.0"
+
+description:
+    - "This module will read datafile, tempfile and online redo sizes (V$DATAFILE, V$TEMPFILE, V$LOG) and archivelog generation (V$ARCHIVED_LOG) of the source database"
+    - "Backup, restore and recover durations are estimated from measured Object Storage throughput and capacity of target disk groups is checked (nothing is executed with RMAN)"
+
+options:
+    oracle_home:
+        description:
+            - This is $ORACLE_HOME directory where sqlplus binary resides (lack of parameter means it will be derived from /etc/oratab).
+        required: false
+    oracle_sid:
+        description:
+            - This is $ORACLE_SID which will be used to access proper database (database must be at least in MOUNT state)
+        required: true
+    archivelog_days:
+        description:
+            - Archivelog generation is averaged over last archivelog_days days (the peak day is used for capacity).
+        required: false
+    upload_mb_per_sec:
+        description:
+            - Measured upload throughput to Object Storage (MB/s) used for the backup estimate.
+        required: false
+    download_mb_per_sec:
+        description:
+            - Measured download throughput from Object Storage (MB/s) used for the restore estimate.
+        required: false
+    recover_mb_per_sec:
+        description:
+            - Expected archivelog apply rate (MB/s) during recover.
+        required: false
+    data_dg_usable_mb:
+        description:
+            - Usable_file_MB of the target DATA disk group (asmcmd lsdg).
+        required: false
+    reco_dg_usable_mb:
+        description:
+            - Usable_file_MB of the target RECO disk group (asmcmd lsdg).
+        required: false
+    db_recovery_file_dest_size:
+        description:
+            - db_recovery_file_dest_size which will be set on the target (for example 5000G).
+        required: false
+    estimate_report_file:
+        description:
+            - Report with estimated durations and capacity shortfalls will be written to this file.
+        required: false
+
+'''
+
+EXAMPLES = '''
+# Estimate migration of FOGGYDB
+- name: Estimate migration
+  oracle_migration_estimator_module:
+    oracle_home: '/u01/app/oracle/product/12.1.0.2/dbhome_1'
+    oracle_sid: 'FOGGYDB'
+    upload_mb_per_sec: 180.5
+    download_mb_per_sec: 240.1
+    data_dg_usable_mb: 2097152
+    reco_dg_usable_mb: 1048576
+    db_recovery_file_dest_size: '5000G'
+    estimate_report_file: '/tmp/migration_estimate_FOGGYDB.txt'
+
+'''
+
+RETURN = '''
+migration_estimate:
+    description: source sizes, archivelog rate, required capacity and estimated backup, restore and recover seconds.
+    type: dict
+migration_shortfalls:
+    description: capacity problems found on the target (empty list means the target is big enough).
+    type: list
+migration_estimate_report:
+    description: estimate as text lines.
+    type: list
+changed:
+    description: will be used for the future all removed.
+    type: bool
+'''
+
+from ansible.module_utils.basic import AnsibleModule
+from ansible.module_utils.oracle_exec import find_oracle_home, oracle_env, run_oracle_command, classify_oracle_errors
+import os, sys, re
+
+MB = 1024 * 1024
+GB = 1024 * MB
+
+SIZE_UNITS = dict(K=1024, M=MB, G=GB, T=1024 * GB)
+
+def query_source_sizes(oracle_home, oracle_sid, archivelog_days):
+
+    if oracle_home is None:
+        oracle_home = find_oracle_home(oracle_sid)
+
+    my_env = oracle_env(oracle_home, oracle_sid)
+
+    args = [os.path.join(oracle_home, 'bin', 'sqlplus'), '-S', '/', 'as sysdba']
+    # archivelogs copied to several destinations are counted once (thread#, sequence#)
+    sql_script = (
+        " SET HEADING OFF\n SET FEEDBACK OFF\n SET PAGES 0\n SET LINESIZE 1000\n SET TAB OFF\n"
+        " select 'DATAFILE|'||count(*)||'|'||nvl(sum(bytes),0) from v$datafile;\n"
+        " select 'TEMPFILE|'||count(*)||'|'||nvl(sum(bytes),0) from v$tempfile;\n"
+        " select 'REDO|'||count(*)||'|'||nvl(sum(bytes*members),0) from v$log;\n"
+        " select 'ARCHIVELOG|'||count(*)||'|'||nvl(sum(bytes),0)||'|'||nvl(max(bytes),0) from"
+        " (select trunc(completion_time) day, sum(bytes) bytes from"
+        " (select thread#, sequence#, max(blocks*block_size) bytes, max(completion_time) completion_time from v$archived_log"
+        " where completion_time > sysdate - "+str(archivelog_days)+" group by thread#, sequence#)"
+        " group by trunc(completion_time));\n"
+        " select 'VERSION|'||version from v$instance;\n"
+        " EXIT\n")
+
+    sqlplus_result = run_oracle_command(args, my_env, sql_script, stderr_to_stdout=True)
+
+    source_sizes = dict(datafiles_number=0, datafile_bytes=0, tempfile_bytes=0, redo_logs_number=0, redo_bytes=0, archivelog_days=0, archivelog_bytes=0, archivelog_peak_day_bytes=0, version='')
+    ora_errors = classify_oracle_errors(sqlplus_result.errors, ('ORA',))
+    for line in sqlplus_result.stdout.split('\n'):
+        line = line.strip()
+        fields = line.split('|')
+        if fields[0] == 'DATAFILE' and len(fields) == 3:
+            source_sizes['datafiles_number'] = int(fields[1])
+            source_sizes['datafile_bytes'] = int(fields[2])
+        elif fields[0] == 'TEMPFILE' and len(fields) == 3:
+            source_sizes['tempfile_bytes'] = int(fields[2])
+        elif fields[0] == 'REDO' and len(fields) == 3:
+            source_sizes['redo_logs_number'] = int(fields[1])
+            source_sizes['redo_bytes'] = int(fields[2])
+        elif fields[0] == 'ARCHIVELOG' and len(fields) == 4:
+            source_sizes['archivelog_days'] = int(fields[1])
+            source_sizes['archivelog_bytes'] = int(fields[2])
+            source_sizes['archivelog_peak_day_bytes'] = int(fields[3])
+        elif fields[0] == 'VERSION' and len(fields) == 2:
+            source_sizes['version'] = fields[1]
+
+    return [source_sizes, ora_errors, ' '.join(args)]
+
+def parse_size(value):
+
+    m = re.match(r'^(?P<NUMBER>\d+)(?P<UNIT>[KMGT]?)$', value.strip().upper())
+    if m is None:
+        return None
+    return int(m.group('NUMBER')) * SIZE_UNITS.get(m.group('UNIT'), 1)
+
+def format_bytes(value):
+
+    if value >= GB:
+        return '%.1fG' % (float(value) / GB)
+    return '%.1fM' % (float(value) / MB)
+
+def format_seconds(value):
+
+    if value is None:
+        return 'unknown'
+    return '~%dh %02dm' % (value // 3600, value % 3600 // 60)
+
+def transfer_seconds(bytes, mb_per_sec):
+
+    if not mb_per_sec:
+        return None
+    return int(bytes / (mb_per_sec * MB))
+
+def estimate_migration(source_sizes, upload_mb_per_sec, download_mb_per_sec, recover_mb_per_sec, data_dg_usable_mb, reco_dg_usable_mb, db_recovery_file_dest_size):
+
+    # archivelogs are averaged over the days which have some, the peak day is used for capacity
+    archivelog_days_found = max(source_sizes['archivelog_days'], 1)
+    archivelog_bytes_per_day = source_sizes['archivelog_bytes'] // archivelog_days_found
+    archivelog_peak_day_bytes = max(source_sizes['archivelog_peak_day_bytes'], archivelog_bytes_per_day)
+
+    # RMAN backs up used blocks only, so datafile bytes give the upper bound
+    backup_seconds = transfer_seconds(source_sizes['datafile_bytes'], upload_mb_per_sec)
+    restore_seconds = transfer_seconds(source_sizes['datafile_bytes'], download_mb_per_sec)
+
+    # archivelogs generated while level 0 is backed up and restored are recovered afterwards
+    window_seconds = (backup_seconds or 0) + (restore_seconds or 0)
+    recover_bytes = archivelog_bytes_per_day * window_seconds // 86400
+    recover_peak_bytes = archivelog_peak_day_bytes * max(window_seconds, 86400) // 86400
+    recover_seconds = None
+    if download_mb_per_sec and recover_mb_per_sec:
+        recover_seconds = transfer_seconds(recover_bytes, download_mb_per_sec) + transfer_seconds(recover_bytes, recover_mb_per_sec)
+
+    required_data_bytes = source_sizes['datafile_bytes'] + source_sizes['tempfile_bytes']
+    required_reco_bytes = source_sizes['redo_bytes'] + recover_peak_bytes
+
+    shortfalls = []
+    if data_dg_usable_mb is not None and data_dg_usable_mb * MB < required_data_bytes:
+        shortfalls.append('DATA disk group has %s usable, datafiles and tempfiles need %s' % (format_bytes(data_dg_usable_mb * MB), format_bytes(required_data_bytes)))
+    if reco_dg_usable_mb is not None and reco_dg_usable_mb * MB < required_reco_bytes:
+        shortfalls.append('RECO disk group has %s usable, online redo and archivelogs of the migration window need %s' % (format_bytes(reco_dg_usable_mb * MB), format_bytes(required_reco_bytes)))
+
+    db_recovery_file_dest_bytes = None
+    if db_recovery_file_dest_size is not None:
+        db_recovery_file_dest_bytes = parse_size(db_recovery_file_dest_size)
+        if db_recovery_file_dest_bytes is None:
+            shortfalls.append('db_recovery_file_dest_size '+db_recovery_file_dest_size+' is not a valid size')
+        else:
+            if db_recovery_file_dest_bytes < required_reco_bytes:
+                shortfalls.append('db_recovery_file_dest_size %s is smaller than %s needed for online redo and archivelogs of the migration window' % (db_recovery_file_dest_size, format_bytes(required_reco_bytes)))
+            if reco_dg_usable_mb is not None and db_recovery_file_dest_bytes > reco_dg_usable_mb * MB:
+                shortfalls.append('db_recovery_file_dest_size %s is bigger than %s usable in RECO disk group' % (db_recovery_file_dest_size, format_bytes(reco_dg_usable_mb * MB)))
+
+    estimate = dict(
+        source_sizes,
+        archivelog_bytes_per_day=archivelog_bytes_per_day,
+        archivelog_peak_day_bytes=archivelog_peak_day_bytes,
+        upload_mb_per_sec=upload_mb_per_sec,
+        download_mb_per_sec=download_mb_per_sec,
+        recover_mb_per_sec=recover_mb_per_sec,
+        backup_seconds=backup_seconds,
+        restore_seconds=restore_seconds,
+        recover_bytes=recover_bytes,
+        recover_seconds=recover_seconds,
+        total_seconds=window_seconds + (recover_seconds or 0),
+        required_data_bytes=required_data_bytes,
+        required_reco_bytes=required_reco_bytes,
+        data_dg_usable_mb=data_dg_usable_mb,
+        reco_dg_usable_mb=reco_dg_usable_mb,
+        db_recovery_file_dest_bytes=db_recovery_file_dest_bytes,
+    )
+
+    return [estimate, shortfalls]
+
+def format_migration_estimate_report(estimate, shortfalls):
+
+    report = []
+    report.append('Datafiles: %d, total %s, tempfiles %s, online redo %s (%d logs), version %s' % (estimate['datafiles_number'], format_bytes(estimate['datafile_bytes']), format_bytes(estimate['tempfile_bytes']), format_bytes(estimate['redo_bytes']), estimate['redo_logs_number'], estimate['version']))
+    report.append('Archivelogs: %s per day on average over %d days, peak day %s' % (format_bytes(estimate['archivelog_bytes_per_day']), estimate['archivelog_days'], format_bytes(estimate['archivelog_peak_day_bytes'])))
+    report.append('Throughput: upload %s MB/s, download %s MB/s, archivelog apply %s MB/s' % (estimate['upload_mb_per_sec'], estimate['download_mb_per_sec'], estimate['recover_mb_per_sec']))
+    report.append('Backup level 0: %s' % format_seconds(estimate['backup_seconds']))
+    report.append('Restore level 0: %s' % format_seconds(estimate['restore_seconds']))
+    report.append('Recover (%s of archivelogs): %s' % (format_bytes(estimate['recover_bytes']), format_seconds(estimate['recover_seconds'])))
+    report.append('Total: %s' % format_seconds(estimate['total_seconds']))
+    report.append('Required DATA: %s, usable: %s' % (format_bytes(estimate['required_data_bytes']), 'unknown' if estimate['data_dg_usable_mb'] is None else format_bytes(estimate['data_dg_usable_mb'] * MB)))
+    report.append('Required RECO: %s, usable: %s' % (format_bytes(estimate['required_reco_bytes']), 'unknown' if estimate['reco_dg_usable_mb'] is None else format_bytes(estimate['reco_dg_usable_mb'] * MB)))
+    if shortfalls:
+        for shortfall in shortfalls:
+            report.append('SHORTFALL: '+shortfall)
+    else:
+        report.append('No capacity shortfalls found.')
+
+    return report
+
+def run_module():
+
+    module_args = dict(
+        oracle_home=dict(type='str', required=False),
+        oracle_sid=dict(type='str', required=True),
+        archivelog_days=dict(type='int', required=False, default=7),
+        upload_mb_per_sec=dict(type='float', required=False),
+        download_mb_per_sec=dict(type='float', required=False),
+        recover_mb_per_sec=dict(type='float', required=False, default=100),
+        data_dg_usable_mb=dict(type='int', required=False),
+        reco_dg_usable_mb=dict(type='int', required=False),
+        db_recovery_file_dest_size=dict(type='str', required=False),
+        estimate_report_file=dict(type='str', required=False)
+    )
+
+    result = dict(
+        changed=False,
+        migration_estimate={},
+        migration_shortfalls=[],
+        migration_estimate_report=[]
+    )
+
+    module = AnsibleModule(
+        argument_spec=module_args,
+        supports_check_mode=True
+    )
+
+    results_of_query_source_sizes = query_source_sizes(
+        module.params['oracle_home'],
+        module.params['oracle_sid'],
+        module.params['archivelog_days'])
+
+    result['sqlplus_command'] = results_of_query_source_sizes[2]
+
+    if results_of_query_source_sizes[1] != [] or results_of_query_source_sizes[0]['datafiles_number'] == 0:
+        module.fail_json(msg='Migration estimator module has failed to read V$DATAFILE!', ora_errors=results_of_query_source_sizes[1], **result)
+
+    estimate, shortfalls = estimate_migration(
+        results_of_query_source_sizes[0],
+        module.params['upload_mb_per_sec'],
+        module.params['download_mb_per_sec'],
+        module.params['recover_mb_per_sec'],
+        module.params['data_dg_usable_mb'],
+        module.params['reco_dg_usable_mb'],
+        module.params['db_recovery_file_dest_size'])
+
+    result['migration_estimate'] = estimate
+    result['migration_shortfalls'] = shortfalls
+    result['migration_estimate_report'] = format_migration_estimate_report(estimate, shortfalls)
+
+    if module.params['estimate_report_file'] is not None and not module.check_mode:
+        with open(module.params['estimate_report_file'], 'w') as f:
+            f.write('\n'.join(result['migration_estimate_report'])+'\n')
+
+    module.exit_json(**result)
+
+def main():
+    run_module()
+
+if __name__ == '__main__':
+    main()
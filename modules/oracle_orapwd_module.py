@@ -62,26 +62,12 @@ changed:
 '''
 
 from ansible.module_utils.basic import AnsibleModule
-from subprocess import Popen, PIPE
+from ansible.module_utils.oracle_exec import find_oracle_home, oracle_env, run_oracle_command
 from tempfile import mkstemp, TemporaryFile
 from datetime import datetime, timedelta
 import os, sys, re
 
 
-def find_oracle_home(oracle_sid):
-
-    re_db_home = re.compile(r'^('+oracle_sid+'):(?P<HOME>(/|\w+|\.)+):(Y|N)')
-
-    with open('/etc/oratab', 'r') as f:
-        for line in f:
-            line = line.strip()
-            re_db_home_match = re_db_home.search(line)
-            if re_db_home_match:
-                db_home = re_db_home_match.group('HOME')
-                #print(db_home)
-
-                return db_home
-
 def execute_orapwd(oracle_home, oracle_sid, file, password):
 
     if oracle_home is None:
@@ -94,14 +80,10 @@ def execute_orapwd(oracle_home, oracle_sid, file, password):
     args.append("password="+password)  
     args.append("file="+file)    
      
-    my_env = os.environ.copy()
-    my_env["PATH"] = my_env["PATH"] + oracle_home+'/bin'
-    my_env["ORACLE_HOME"] = oracle_home
-    my_env["ORACLE_SID"] = oracle_sid
-
-    p = Popen(args, stdout=PIPE, stderr=PIPE, env=my_env, stdin=PIPE)   
+    my_env = oracle_env(oracle_home, oracle_sid)
 
-    stdoutResult, stderrResult = p.communicate()
+    orapwd_result = run_oracle_command(args, my_env)
+    stdoutResult, stderrResult = orapwd_result.stdout, orapwd_result.stderr
 
     stdoutResult = stdoutResult.split('\n')
     stdoutResult[:] = [item for item in stdoutResult if item != '']
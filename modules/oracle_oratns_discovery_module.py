@@ -34,6 +34,18 @@ options:
         description:
             - Location of the oratab file (if not provided /etc/oratab will be used.
         required: false
+    use_cache:
+        description:
+            - Return the snapshot written by a previous discovery on this host when /etc/oratab, inventory.xml and sqlnet.ora have not changed since (skips the crsctl/srvctl/sqlplus calls).
+        required: false
+    cache_max_age:
+        description:
+            - Snapshot older than this number of seconds is not used (default 3600), CRS and srvctl configuration changes are not seen by the file stamps.
+        required: false
+    cache_dir:
+        description:
+            - Directory of the discovery snapshots (default /tmp/admt_discovery_cache). A snapshot is written after each successful discovery.
+        required: false
 
 
 '''
@@ -63,34 +75,21 @@ sqlnet_ora_encryption_wallet:
     description: 
     type: str
 
+discovery_cache_hit:
+    description: True when the values were returned from the discovery snapshot (use_cache).
+    type: bool
+
 '''
 
 from ansible.module_utils.basic import AnsibleModule
-from subprocess import Popen, PIPE
+from ansible.module_utils.oracle_exec import find_oracle_home
+from ansible.module_utils.oracle_discovery_cache import discovery_cache_paths, discovery_cache_file, read_discovery_cache, write_discovery_cache
 from tempfile import mkstemp, TemporaryFile
 from datetime import datetime, timedelta
 import os, sys, re
 import json
 
 
-def find_oracle_home(oracle_sid, oratab_location):
-
-    if oratab_location is None:
-        oratab_location = '/etc/oratab'
-
-    re_db_home = re.compile(r'^('+oracle_sid+'):(?P<HOME>(/|\w+|\.)+):(Y|N)')
-
-    with open(oratab_location, 'r') as f:
-        for line in f:
-            line = line.strip()
-            re_db_home_match = re_db_home.search(line)
-            if re_db_home_match:
-                try:
-                    db_home = re_db_home_match.group('HOME')
-                except Exception: 
-                    db_home = ''
-                return db_home
-
 def find_sqlnet_ora_encryption_wallet(oracle_home):
 
     re_wallet_path = re.compile(r'DIRECTORY=(?P<WALLET_PATH_FILE>(/|\w+|\/)+)\)')
@@ -122,13 +121,16 @@ def run_module():
         oracle_home=dict(type='str', required=False),
         oracle_sid=dict(type='str', required=False),
         oratab_location=dict(type='str', required=False),                  
+        use_cache=dict(type='bool', required=False, default=False),
+        cache_dir=dict(type='str', required=False, default='/tmp/admt_discovery_cache'),
+        cache_max_age=dict(type='int', required=False, default=3600),
     )
 
     result = dict(
         changed=False,
         oracle_home='',
         sqlnet_ora_encryption_wallet='',
-
+        discovery_cache_hit=False,
     )
 
     module = AnsibleModule(
@@ -139,10 +141,21 @@ def run_module():
     if module.check_mode:
         return result
 
-    results_of_execute_main = execute_main(
-        module.params['oracle_home'],
-        module.params['oracle_sid'],
-        module.params['oratab_location'])
+    cache_key = dict(oracle_home=module.params['oracle_home'], oracle_sid=module.params['oracle_sid'], oratab_location=module.params['oratab_location'])
+    cache_file = discovery_cache_file(module.params['cache_dir'], 'oracle_oratns_discovery_module', cache_key)
+
+    results_of_execute_main = None
+    if module.params['use_cache']:
+        results_of_execute_main = read_discovery_cache(cache_file, cache_key, module.params['cache_max_age'])
+        result['discovery_cache_hit'] = results_of_execute_main is not None
+
+    if results_of_execute_main is None:
+        results_of_execute_main = execute_main(
+            module.params['oracle_home'],
+            module.params['oracle_sid'],
+            module.params['oratab_location'])
+        if results_of_execute_main[0] == '':
+            write_discovery_cache(cache_file, 'oracle_oratns_discovery_module', cache_key, discovery_cache_paths(module.params['oratab_location'], [results_of_execute_main[1]]), results_of_execute_main)
     
     result['oracle_home'] = results_of_execute_main[1]
     result['sqlnet_ora_encryption_wallet'] = results_of_execute_main[2]
@@ -0,0 +1,472 @@
+#!/usr/bin/python
+#
+#Copyright (c) 2020, Oracle and/or its affiliates.
+#The Universal Permissive License (UPL), Version 1.0
+#
+
+ANSIBLE_METADATA = {
+    'metadata_version': '1.0',
+    'status': ['preview'],
+    'supported_by': 'community'
+}
+
+DOCUMENTATION = '''
+---
+module: oracle_oss_transfer_module
+
+short_description: This is simple Object Storage (Swift API) transfer module for remote execution
+
+version_added: "1.0"
+
+description:
+    - "This module will upload or download file to/from Object Storage Service with Swift API"
+    - "Big files are uploaded in segments (SLO or DLO manifest) and downloaded with ranged GETs, segments are transferred in parallel and retried with backoff"
+    - "MD5 and SHA-256 checksums are computed while the file is read and verified against segment ETags and object metadata"
+
+options:
+    mode:
+        description:
+            - upload (src to Object Storage), download (Object Storage to dest) or delete (object_name with its SLO or DLO segments). Upload replaces object_name together with its old segments.
+        required: true
+    swift_url:
+        description:
+            - This is Swift API URL of Object Storage (for example https://swiftobjectstorage.<region>.oraclecloud.com/v1/<tenancy>)
+        required: true
+    container:
+        description:
+            - This is container (bucket) name
+        required: true
+    object_name:
+        description:
+            - This is object name (if not set it will be derived from file name of src or dest)
+        required: false
+    user:
+        description:
+            - This is Object Storage user
+        required: true
+    password:
+        description:
+            - This is Object Storage password (auth token)
+        required: true
+    src:
+        description:
+            - This is local file which will be uploaded
+        required: false
+    dest:
+        description:
+            - This is local file where object will be downloaded
+        required: false
+    segment_size_mb:
+        description:
+            - Files bigger than segment_size_mb are transferred in segments of this size.
+        required: false
+    segment_mode:
+        description:
+            - slo (Static Large Object manifest) or dlo (Dynamic Large Object manifest, X-Object-Manifest header)
+        required: false
+    parallel:
+        description:
+            - Number of segments transferred at the same time.
+        required: false
+    retries:
+        description:
+            - Number of retries of one segment (request) before the transfer fails.
+        required: false
+    retry_delay:
+        description:
+            - Seconds to wait before first retry, doubled with every next retry.
+        required: false
+    timeout:
+        description:
+            - Socket timeout in seconds.
+        required: false
+    expected_sha256:
+        description:
+            - Download will fail when SHA-256 of the downloaded file is different.
+        required: false
+
+'''
+
+EXAMPLES = '''
+# Upload TDE wallet archive to OSS
+- name: Upload TDE file to OSS
+  oracle_oss_transfer_module:
+    mode: upload
+    swift_url: 'https://swiftobjectstorage.us-ashburn-1.oraclecloud.com/v1/<tenancy>'
+    container: '<container>'
+    user: '<user>'
+    password: '<auth_token>'
+    src: '/u01/app/oracle/admin/FOGGYDB/tde_wallet/FOGGYDB_tde.tgz'
+
+# Download TDE wallet archive from OSS with 8 parallel ranged GETs
+- name: Download TDE file from OSS
+  oracle_oss_transfer_module:
+    mode: download
+    swift_url: 'https://swiftobjectstorage.us-ashburn-1.oraclecloud.com/v1/<tenancy>'
+    container: '<container>'
+    object_name: 'FOGGYDB_tde.tgz'
+    user: '<user>'
+    password: '<auth_token>'
+    dest: '/opt/oracle/dcs/commonstore/wallets/tde/FOGGYDB_tde.tgz'
+    parallel: 8
+
+# Delete throughput probe object (and its segments) from OSS
+- name: Delete probe object from OSS
+  oracle_oss_transfer_module:
+    mode: delete
+    swift_url: 'https://swiftobjectstorage.us-ashburn-1.oraclecloud.com/v1/<tenancy>'
+    container: '<container>'
+    object_name: 'FOGGYDB_preflight_probe'
+    user: '<user>'
+    password: '<auth_token>'
+
+'''
+
+RETURN = '''
+object_name:
+    description: name of transferred object.
+    type: str
+size:
+    description: size of transferred file in bytes.
+    type: int
+segments:
+    description: number of segments (1 means object was transferred with single request).
+    type: int
+md5:
+    description: MD5 of the file.
+    type: str
+sha256:
+    description: SHA-256 of the file.
+    type: str
+retries:
+    description: number of retried requests.
+    type: int
+elapsed_seconds:
+    description: duration of the transfer.
+    type: float
+mb_per_sec:
+    description: throughput of the transfer.
+    type: float
+changed:
+    description: will be used for the future all removed.
+    type: bool
+'''
+
+from ansible.module_utils.basic import AnsibleModule
+from multiprocessing.pool import ThreadPool
+import os, sys, re
+import base64, hashlib, json, socket, threading, time
+
+try:
+    from http.client import HTTPConnection, HTTPSConnection, HTTPException
+    from urllib.parse import urlsplit, quote, unquote
+except ImportError:
+    from httplib import HTTPConnection, HTTPSConnection, HTTPException
+    from urlparse import urlsplit
+    from urllib import quote, unquote
+
+MB = 1024 * 1024
+
+
+class OssTransferError(Exception):
+    pass
+
+
+def new_oss_transfer(swift_url, container, user, password, retries, retry_delay, timeout):
+
+    swift_url_parts = urlsplit(swift_url)
+    credentials = base64.b64encode((user+':'+password).encode('utf-8')).decode('ascii')
+
+    return dict(
+        scheme=swift_url_parts.scheme,
+        netloc=swift_url_parts.netloc,
+        path=swift_url_parts.path.rstrip('/')+'/'+quote(container),
+        container=container,
+        authorization='Basic '+credentials,
+        retries=retries,
+        retry_delay=retry_delay,
+        timeout=timeout,
+        retried=0,
+        lock=threading.Lock(),
+    )
+
+def oss_request(oss_transfer, method, object_name, body=None, headers=None, query=None, missing_ok=False):
+
+    path = oss_transfer['path']+'/'+quote(object_name)
+    if query is not None:
+        path = path+'?'+query
+
+    request_headers = {'Authorization': oss_transfer['authorization']}
+    if headers is not None:
+        request_headers.update(headers)
+    if body is not None:
+        request_headers['Content-Length'] = str(len(body))
+
+    attempt = 0
+    while True:
+        if oss_transfer['scheme'] == 'https':
+            connection = HTTPSConnection(oss_transfer['netloc'], timeout=oss_transfer['timeout'])
+        else:
+            connection = HTTPConnection(oss_transfer['netloc'], timeout=oss_transfer['timeout'])
+        try:
+            try:
+                connection.request(method, path, body, request_headers)
+                response = connection.getresponse()
+                response_body = response.read()
+                response_headers = dict((name.lower(), value) for name, value in response.getheaders())
+            finally:
+                connection.close()
+            if response.status < 300 or (response.status == 404 and missing_ok):
+                return [response.status, response_headers, response_body]
+            error = '%s %s returned HTTP %d %s' % (method, object_name, response.status, response.reason)
+            # Client errors (except timeout and throttling) will not go away with retry
+            if response.status < 500 and response.status not in (408, 429):
+                raise OssTransferError(error)
+        except (socket.error, HTTPException) as e:
+            error = '%s %s has failed: %s' % (method, object_name, e)
+
+        if attempt >= oss_transfer['retries']:
+            raise OssTransferError(error+' (after %d retries)' % attempt)
+        time.sleep(oss_transfer['retry_delay'] * (2 ** attempt))
+        attempt += 1
+        with oss_transfer['lock']:
+            oss_transfer['retried'] += 1
+
+def upload_oss_segment(args):
+
+    oss_transfer, segment_name, data = args
+
+    md5 = hashlib.md5(data).hexdigest()
+    status, headers, body = oss_request(oss_transfer, 'PUT', segment_name, data, {'ETag': md5})
+    if headers.get('etag', md5).strip('"') != md5:
+        raise OssTransferError('ETag of segment '+segment_name+' is different than its MD5 '+md5)
+
+    return dict(path='/'+oss_transfer['container']+'/'+segment_name, etag=md5, size_bytes=len(data))
+
+def upload_oss_object(oss_transfer, src, object_name, segment_size, segment_mode, parallel):
+
+    # segments are written under a new prefix, the ones of the replaced object would be orphaned
+    delete_oss_object(oss_transfer, object_name, missing_ok=True)
+
+    size = os.path.getsize(src)
+    md5 = hashlib.md5()
+    sha256 = hashlib.sha256()
+
+    if size <= segment_size:
+        with open(src, 'rb') as f:
+            data = f.read()
+        md5.update(data)
+        sha256.update(data)
+        oss_request(oss_transfer, 'PUT', object_name, data, {'ETag': md5.hexdigest(), 'X-Object-Meta-Sha256': sha256.hexdigest()})
+        return [size, 1, md5.hexdigest(), sha256.hexdigest()]
+
+    segment_prefix = object_name+'_segments/'+str(int(time.time()))+'/'
+    pool = ThreadPool(parallel)
+    pending = []
+    segments = []
+    try:
+        with open(src, 'rb') as f:
+            segment_number = 0
+            while True:
+                data = f.read(segment_size)
+                if not data:
+                    break
+                # Checksums of the whole file are computed while the file is read once, segment by segment
+                md5.update(data)
+                sha256.update(data)
+                pending.append(pool.apply_async(upload_oss_segment, [(oss_transfer, segment_prefix+'%08d' % segment_number, data)]))
+                segment_number += 1
+                # Only parallel segments are kept in memory
+                while len(pending) >= parallel:
+                    segments.append(pending.pop(0).get())
+        while pending:
+            segments.append(pending.pop(0).get())
+    finally:
+        pool.terminate()
+
+    headers = {'X-Object-Meta-Sha256': sha256.hexdigest()}
+    if segment_mode == 'dlo':
+        headers['X-Object-Manifest'] = oss_transfer['container']+'/'+segment_prefix
+        oss_request(oss_transfer, 'PUT', object_name, b'', headers)
+    else:
+        headers['Content-Type'] = 'application/json'
+        oss_request(oss_transfer, 'PUT', object_name, json.dumps(segments).encode('utf-8'), headers, 'multipart-manifest=put')
+
+    return [size, len(segments), md5.hexdigest(), sha256.hexdigest()]
+
+def download_oss_range(args):
+
+    oss_transfer, object_name, dest, start, end = args
+
+    status, headers, body = oss_request(oss_transfer, 'GET', object_name, None, {'Range': 'bytes=%d-%d' % (start, end)})
+    if status != 206 and not (start == 0 and len(body) == end + 1):
+        raise OssTransferError('GET '+object_name+' has ignored Range header')
+    if len(body) != end - start + 1:
+        raise OssTransferError('GET '+object_name+' has returned %d bytes instead of %d' % (len(body), end - start + 1))
+
+    with open(dest, 'r+b') as f:
+        f.seek(start)
+        f.write(body)
+
+    return len(body)
+
+def download_oss_object(oss_transfer, object_name, dest, segment_size, parallel):
+
+    status, headers, body = oss_request(oss_transfer, 'HEAD', object_name)
+    size = int(headers.get('content-length', 0))
+    object_sha256 = headers.get('x-object-meta-sha256')
+
+    with open(dest+'.part', 'wb') as f:
+        f.truncate(size)
+
+    ranges = [(oss_transfer, object_name, dest+'.part', start, min(start + segment_size, size) - 1) for start in range(0, size, segment_size)]
+    if len(ranges) > 1:
+        pool = ThreadPool(parallel)
+        try:
+            pool.map(download_oss_range, ranges)
+        finally:
+            pool.terminate()
+    elif ranges:
+        download_oss_range(ranges[0])
+
+    md5 = hashlib.md5()
+    sha256 = hashlib.sha256()
+    with open(dest+'.part', 'rb') as f:
+        for data in iter(lambda: f.read(MB), b''):
+            md5.update(data)
+            sha256.update(data)
+
+    if object_sha256 is not None and object_sha256 != sha256.hexdigest():
+        raise OssTransferError('SHA-256 of downloaded '+object_name+' is different than X-Object-Meta-Sha256 '+object_sha256)
+    # ETag of not segmented object is its MD5
+    object_etag = headers.get('etag', '').strip('"')
+    if len(ranges) <= 1 and re.match(r'^[0-9a-f]{32}$', object_etag) and object_etag != md5.hexdigest():
+        raise OssTransferError('MD5 of downloaded '+object_name+' is different than ETag '+object_etag)
+
+    os.rename(dest+'.part', dest)
+
+    return [size, len(ranges), md5.hexdigest(), sha256.hexdigest()]
+
+def delete_oss_object(oss_transfer, object_name, missing_ok=False):
+
+    status, headers, body = oss_request(oss_transfer, 'HEAD', object_name, missing_ok=missing_ok)
+    if status == 404:
+        return
+
+    # DLO segments are listed by the prefix of the manifest and deleted one by one
+    dlo_manifest = headers.get('x-object-manifest')
+    if dlo_manifest is not None:
+        segment_container, segment_prefix = unquote(dlo_manifest).split('/', 1)
+        if segment_container == oss_transfer['container']:
+            # container listing is returned in pages, the next one starts after the last name
+            marker = ''
+            while True:
+                status, headers, body = oss_request(oss_transfer, 'GET', '', None, None, 'format=json&prefix='+quote(segment_prefix)+'&marker='+quote(marker))
+                segments = json.loads(body.decode('utf-8')) if body else []
+                if not segments:
+                    break
+                for segment in segments:
+                    oss_request(oss_transfer, 'DELETE', segment['name'], missing_ok=True)
+                marker = segments[-1]['name']
+
+    # SLO segments are deleted together with the manifest, other objects are deleted as they are
+    oss_request(oss_transfer, 'DELETE', object_name, None, None, 'multipart-manifest=delete', missing_ok=missing_ok)
+
+def execute_oss_transfer(mode, swift_url, container, object_name, user, password, src, dest, segment_size_mb, segment_mode, parallel, retries, retry_delay, timeout, expected_sha256):
+
+    if object_name is None:
+        object_name = os.path.basename(src if mode == 'upload' else dest)
+
+    oss_transfer = new_oss_transfer(swift_url, container, user, password, retries, retry_delay, timeout)
+
+    started = time.time()
+    if mode == 'delete':
+        delete_oss_object(oss_transfer, object_name)
+        return [object_name, 0, 0, '', '', oss_transfer['retried'], round(time.time() - started, 3), 0.0]
+    if mode == 'upload':
+        size, segments, md5, sha256 = upload_oss_object(oss_transfer, src, object_name, segment_size_mb * MB, segment_mode, parallel)
+    else:
+        size, segments, md5, sha256 = download_oss_object(oss_transfer, object_name, dest, segment_size_mb * MB, parallel)
+    elapsed_seconds = max(time.time() - started, 0.001)
+
+    if expected_sha256 is not None and expected_sha256 != sha256:
+        raise OssTransferError('SHA-256 of '+object_name+' is '+sha256+' instead of '+expected_sha256)
+
+    return [object_name, size, segments, md5, sha256, oss_transfer['retried'], round(elapsed_seconds, 3), round(float(size) / MB / elapsed_seconds, 2)]
+
+def run_module():
+
+    module_args = dict(
+        mode=dict(type='str', required=True, choices=['upload', 'download', 'delete']),
+        swift_url=dict(type='str', required=True),
+        container=dict(type='str', required=True),
+        object_name=dict(type='str', required=False),
+        user=dict(type='str', required=True),
+        password=dict(type='str', required=True, no_log=True),
+        src=dict(type='str', required=False),
+        dest=dict(type='str', required=False),
+        segment_size_mb=dict(type='int', required=False, default=64),
+        segment_mode=dict(type='str', required=False, default='slo', choices=['slo', 'dlo']),
+        parallel=dict(type='int', required=False, default=4),
+        retries=dict(type='int', required=False, default=5),
+        retry_delay=dict(type='float', required=False, default=1.0),
+        timeout=dict(type='int', required=False, default=300),
+        expected_sha256=dict(type='str', required=False)
+    )
+
+    result = dict(
+        changed=False,
+        object_name='',
+        size=0,
+        segments=0,
+        md5='',
+        sha256='',
+        retries=0
+    )
+
+    module = AnsibleModule(
+        argument_spec=module_args,
+        required_if=[('mode', 'upload', ['src']), ('mode', 'download', ['dest']), ('mode', 'delete', ['object_name'])],
+        supports_check_mode=True
+    )
+
+    if module.check_mode:
+        return result
+
+    try:
+        results_of_execute_oss_transfer = execute_oss_transfer(
+            module.params['mode'],
+            module.params['swift_url'],
+            module.params['container'],
+            module.params['object_name'],
+            module.params['user'],
+            module.params['password'],
+            module.params['src'],
+            module.params['dest'],
+            module.params['segment_size_mb'],
+            module.params['segment_mode'],
+            module.params['parallel'],
+            module.params['retries'],
+            module.params['retry_delay'],
+            module.params['timeout'],
+            module.params['expected_sha256'])
+    except (OssTransferError, IOError, OSError) as e:
+        module.fail_json(msg='OSS transfer module has failed! '+str(e), **result)
+
+    result['changed'] = True
+    result['object_name'] = results_of_execute_oss_transfer[0]
+    result['size'] = results_of_execute_oss_transfer[1]
+    result['segments'] = results_of_execute_oss_transfer[2]
+    result['md5'] = results_of_execute_oss_transfer[3]
+    result['sha256'] = results_of_execute_oss_transfer[4]
+    result['retries'] = results_of_execute_oss_transfer[5]
+    result['elapsed_seconds'] = results_of_execute_oss_transfer[6]
+    result['mb_per_sec'] = results_of_execute_oss_transfer[7]
+
+    module.exit_json(**result)
+
+def main():
+    run_module()
+
+if __name__ == '__main__':
+    main()
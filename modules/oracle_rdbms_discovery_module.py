@@ -22,6 +22,22 @@ description:
     - "This module discover oracle RDBMS database"
 
 options:
+    crsctl_all_resources:
+        description:
+            - Snapshot all database resources of the cluster with one crsctl call (crsctl stat res -f -w "TYPE = ora.database.type") instead of one call per resource.
+        required: false
+    use_cache:
+        description:
+            - Return the snapshot written by a previous discovery on this host when /etc/oratab, inventory.xml and sqlnet.ora have not changed since (skips the crsctl/srvctl/sqlplus calls).
+        required: false
+    cache_max_age:
+        description:
+            - Snapshot older than this number of seconds is not used (default 3600), CRS and srvctl configuration changes are not seen by the file stamps.
+        required: false
+    cache_dir:
+        description:
+            - Directory of the discovery snapshots (default /tmp/admt_discovery_cache). A snapshot is written after each successful discovery.
+        required: false
 
 '''
 
@@ -42,12 +58,23 @@ oracle_gi_home:
 crs_enabled:
     description: Check if Grid Infrastructure is enabled in this configuration.
     type: Bool 
+oracle_cluster_databases:
+    description: DB_UNIQUE_NAMEs of all database resources in the cluster (only with crsctl_all_resources).
+    type: list
+oracle_inventory_homes:
+    description: All not removed Oracle homes registered in oraInventory (name, loc, type, idx, crs, removed).
+    type: list
+discovery_cache_hit:
+    description: True when the values were returned from the discovery snapshot (use_cache).
+    type: bool
 '''
 
 from ansible.module_utils.basic import AnsibleModule
-from subprocess import Popen, PIPE
+from ansible.module_utils.oracle_exec import find_oracle_home, find_oracle_sid, oracle_env, run_oracle_command
+from ansible.module_utils.oracle_discovery_cache import discovery_cache_paths, discovery_cache_file, read_discovery_cache, write_discovery_cache
 from tempfile import mkstemp, TemporaryFile
 from datetime import datetime, timedelta
+from xml.etree import ElementTree
 import os, sys, re
 import json
 
@@ -75,104 +102,205 @@ def find_ora_inv_loc():
                     ora_inventory = ''
                 return ora_inventory
 
-def find_ora_inv_oradb_home(inventory_loc):
+ora_inv_indexes = {}
+
+def load_ora_inv_index(inventory_loc):
 
     if inventory_loc is None:
         inventory_loc = '/u01/app/oraInventory/'
 
-    re_oradb_home = re.compile(r'^<HOME NAME=\"OraD(?P<OHOME_NAME>(/|\w+|\.)+)\" LOC=\"(?P<OHOME_LOC>(/|\w+|\.)+)\" TYPE=\"O\" IDX=\"(?P<OHOME_IDX>(/|\w+|\.)+)\"')
+    inventory_xml = os.path.join(inventory_loc, 'ContentsXML', 'inventory.xml')
+    if inventory_xml in ora_inv_indexes:
+        return ora_inv_indexes[inventory_xml]
+
+    homes = []
+    for event, element in ElementTree.iterparse(inventory_xml, events=('start',)):
+        if element.tag != 'HOME':
+            continue
+        homes.append(dict(
+            name=element.get('NAME', ''),
+            loc=element.get('LOC', ''),
+            type=element.get('TYPE', ''),
+            idx=element.get('IDX', ''),
+            crs=element.get('CRS'),
+            removed=(element.get('REMOVED', 'F') == 'T'),
+        ))
+
+    ora_inv_index = dict(
+        homes=homes,
+        by_name=dict((home['name'], home) for home in homes),
+        by_loc=dict((home['loc'], home) for home in homes),
+    )
+    ora_inv_indexes[inventory_xml] = ora_inv_index
+    return ora_inv_index
+
+def find_ora_inv_homes(inventory_loc, name_prefix=None, crs_home=None, include_removed=False):
+
+    homes = []
+    for home in load_ora_inv_index(inventory_loc)['homes']:
+        if home['type'] != 'O':
+            continue
+        if home['removed'] and not include_removed:
+            continue
+        if name_prefix is not None and not home['name'].startswith(name_prefix):
+            continue
+        if crs_home is not None and (home['crs'] is not None) != crs_home:
+            continue
+        homes.append(home)
+    return homes
 
-    with open(inventory_loc+'/ContentsXML/inventory.xml', 'r') as f:
-        for line in f:
-            line = line.strip()
-            re_oradb_home_match = re_oradb_home.search(line)
-            if re_oradb_home_match:
-                try:
-                    oradb_home = re_oradb_home_match.group('OHOME_LOC')
-                except Exception: 
-                    oradb_home = ''
-                return oradb_home
+def find_ora_inv_oradb_home(inventory_loc):
+
+    homes = find_ora_inv_homes(inventory_loc, name_prefix='OraD')
+    if homes:
+        return homes[0]['loc']
 
 def find_ora_inv_oradb_home_no_grid(inventory_loc):
 
-    if inventory_loc is None:
-        inventory_loc = '/u01/app/oraInventory/'
+    homes = find_ora_inv_homes(inventory_loc, crs_home=False)
+    if homes:
+        return homes[0]['loc']
 
-    re_oradb_home = re.compile(r'^<HOME NAME=\"(?P<OHOME_NAME>(/|\w+|\.)+)\" LOC=\"(?P<OHOME_LOC>(/|\w+|\.)+)\" TYPE=\"O\" IDX=\"(?P<OHOME_IDX>(/|\w+|\.)+)\"/>')
+def find_ora_inv_grid_home(inventory_loc):
 
-    with open(inventory_loc+'/ContentsXML/inventory.xml', 'r') as f:
-        for line in f:
-            line = line.strip()
-            re_oradb_home_match = re_oradb_home.search(line)
-            if re_oradb_home_match:
-                try:
-                    oradb_home = re_oradb_home_match.group('OHOME_LOC')
-                except Exception: 
-                    oradb_home = ''
-                return oradb_home                
+    homes = find_ora_inv_homes(inventory_loc, name_prefix='OraG', crs_home=True)
+    if homes:
+        return homes[0]['loc']
 
-def find_ora_inv_grid_home(inventory_loc):
+def find_ora_inv_grid_crs(inventory_loc):
 
-    if inventory_loc is None:
-        inventory_loc = '/u01/app/oraInventory/'
+    homes = find_ora_inv_homes(inventory_loc, name_prefix='OraG', crs_home=True)
+    if homes:
+        return homes[0]['crs'].capitalize()
+
+crsctl_snapshots = {}
+
+def parse_crsctl_attributes(crsctl_output):
+
+    re_server_attribute = re.compile(r'^(?P<ATTRIBUTE>\w+)@SERVERNAME\((?P<HOSTNAME>(/|\w+|\.|\d|\-)+)\)$')
+
+    resources = {}
+    resource = None
+    for line in crsctl_output.splitlines():
+        line = line.strip()
+        if '=' not in line:
+            continue
+        attribute, value = line.split('=', 1)
+        if attribute == 'NAME':
+            resource = resources.setdefault(value, {'attributes': {}, 'server_attributes': {}})
+            continue
+        if resource is None:
+            continue
+        re_server_attribute_match = re_server_attribute.search(attribute)
+        if re_server_attribute_match:
+            server_values = resource['server_attributes'].setdefault(re_server_attribute_match.group('ATTRIBUTE'), [])
+            server_values.append((re_server_attribute_match.group('HOSTNAME'), value))
+        else:
+            resource['attributes'][attribute] = value
+    return resources
 
-    re_grid_home = re.compile(r'^<HOME NAME=\"OraG(?P<OHOME_NAME>(/|\w+|\.)+)\" LOC=\"(?P<OHOME_LOC>(/|\w+|\.)+)\" TYPE=\"O\" IDX=\"(?P<OHOME_IDX>(/|\w+|\.)+)\" CRS=\"(?P<CRS>(/|\w+|\.)+)\"')
+def execute_crsctl_stat_res(oracle_gi_home, stat_res_args):
 
-    with open(inventory_loc+'/ContentsXML/inventory.xml', 'r') as f:
-        for line in f:
-            line = line.strip()
-            re_grid_home_match = re_grid_home.search(line)
-            if re_grid_home_match:
-                try:
-                    grid_home = re_grid_home_match.group('OHOME_LOC')
-                except Exception: 
-                    grid_home = ''
-                return grid_home
+    args = [os.path.join(oracle_gi_home, 'bin', 'crsctl')]
+    args.append('stat')
+    args.append('res')
+    args.extend(stat_res_args)
 
-def find_ora_inv_grid_crs(inventory_loc):
+    crsctl_result = run_oracle_command(args, oracle_env())
 
-    if inventory_loc is None:
-        inventory_loc = '/u01/app/oraInventory/'
+    if crsctl_result.stderr != '':
+        return None
+    return parse_crsctl_attributes(crsctl_result.stdout)
 
-    re_crs = re.compile(r'^<HOME NAME=\"OraG(?P<OHOME_NAME>(/|\w+|\.)+)\" LOC=\"(?P<OHOME_LOC>(/|\w+|\.)+)\" TYPE=\"O\" IDX=\"(?P<OHOME_IDX>(/|\w+|\.)+)\" CRS=\"(?P<CRS>(/|\w+|\.)+)\"')
+def crsctl_resource_snapshot(oracle_dbname, oracle_gi_home):
 
-    with open(inventory_loc+'/ContentsXML/inventory.xml', 'r') as f:
-        for line in f:
-            line = line.strip()
-            re_crs_match = re_crs.search(line)
-            if re_crs_match:
-                try:
-                    crs = re_crs_match.group('CRS')
-                except Exception: 
-                    crs = 'false'
-                return crs.capitalize()   
+    resource_name = 'ora.'+oracle_dbname.lower()+'.db'
+    if (oracle_gi_home, resource_name) in crsctl_snapshots:
+        return crsctl_snapshots[(oracle_gi_home, resource_name)]
 
-def find_oracle_dbname_in_oratab(oracle_home):
+    snapshot = {'attributes': {}, 'server_attributes': {}}
+    for stat_res_flag in ['-p', '-f']:
+        resources = execute_crsctl_stat_res(oracle_gi_home, [resource_name, stat_res_flag])
+        if resources is None:
+            snapshot = None
+            break
+        if resource_name in resources:
+            snapshot['attributes'].update(resources[resource_name]['attributes'])
+            snapshot['server_attributes'].update(resources[resource_name]['server_attributes'])
 
+    crsctl_snapshots[(oracle_gi_home, resource_name)] = snapshot
+    return snapshot
 
-    re_db_dbname = re.compile(r'^(?P<ORA_DBNAME>(/|\w+|\d)+):('+oracle_home+'):(Y|N)')
+def crsctl_cluster_snapshot(oracle_gi_home):
 
-    with open('/etc/oratab', 'r') as f:
-        for line in f:
-            line = line.strip()
-            re_db_dbname_match = re_db_dbname.search(line)
-            if re_db_dbname_match:
-                try:
-                    db_dbname = re_db_dbname_match.group('ORA_DBNAME')
-                except Exception: 
-                    db_dbname = ""
-                return db_dbname                             
+    if (oracle_gi_home, None) in crsctl_snapshots:
+        return crsctl_snapshots[(oracle_gi_home, None)]
+
+    resources = execute_crsctl_stat_res(oracle_gi_home, ['-f', '-w', 'TYPE = ora.database.type'])
+    if resources is None:
+        return []
+
+    cluster_databases = []
+    for resource_name in sorted(resources):
+        crsctl_snapshots[(oracle_gi_home, resource_name)] = resources[resource_name]
+        cluster_databases.append(resource_name[len('ora.'):-len('.db')])
+    crsctl_snapshots[(oracle_gi_home, None)] = cluster_databases
+    return cluster_databases
+
+def find_crsctl_attribute(oracle_dbname, oracle_gi_home, attribute):
+
+    snapshot = crsctl_resource_snapshot(oracle_dbname, oracle_gi_home)
+    if snapshot is None:
+        return ''
+    return snapshot['attributes'].get(attribute, '')
+
+def find_crsctl_server_attribute(oracle_dbname, oracle_gi_home, attribute):
+
+    snapshot = crsctl_resource_snapshot(oracle_dbname, oracle_gi_home)
+    if snapshot is None:
+        return None
+    return snapshot['server_attributes'].get(attribute, [])
+
+def crsctl_database_names(oracle_dbname, oracle_gi_home):
+
+    names = [oracle_dbname, find_dbname_in_crsctl(oracle_dbname, oracle_gi_home), find_crsctl_attribute(oracle_dbname, oracle_gi_home, 'USR_ORA_INST_NAME')]
+    instances = find_db_instances_in_crsctl(oracle_dbname, oracle_gi_home)
+    if instances:
+        names.extend(instances)
+    return [name.lower() for name in names if name]
+
+def select_cluster_database(cluster_databases, oracle_gi_home, oracle_home, oracle_sid):
+
+    # the database of the requested ORACLE_HOME and SID, not the first one of the cluster
+    if oracle_home is not None:
+        home_databases = [cluster_database for cluster_database in cluster_databases
+            if os.path.normpath(find_oracle_home_in_crsctl(cluster_database, oracle_gi_home) or '/') == os.path.normpath(oracle_home)]
+    else:
+        home_databases = cluster_databases
+
+    if oracle_sid is not None:
+        sid_databases = [cluster_database for cluster_database in home_databases
+            if oracle_sid.lower() in crsctl_database_names(cluster_database, oracle_gi_home)]
+        if len(sid_databases) == 1:
+            return sid_databases[0]
+
+    if len(home_databases) == 1:
+        return home_databases[0]
+    return ''
+
+def find_oracle_db_unique_name_in_crsctl(oracle_gi_home, crsctl_all_resources=False, oracle_home=None, oracle_sid=None):
+
+    if crsctl_all_resources:
+        cluster_databases = crsctl_cluster_snapshot(oracle_gi_home)
+        return select_cluster_database(cluster_databases, oracle_gi_home, oracle_home, oracle_sid)
 
-def find_oracle_db_unique_name_in_crsctl(oracle_gi_home):
-    
-    my_env = os.environ.copy()
     args = [os.path.join(oracle_gi_home, 'bin', 'crsctl')]
     args.append('stat')
     args.append('res')
     args.append('-t')    
     
-    p = Popen(args, stdout=PIPE, stderr=PIPE, env=my_env, stdin=PIPE)    
-    stdoutResult, stderrResult = p.communicate()
+    crsctl_result = run_oracle_command(args, oracle_env())
+    stdoutResult, stderrResult = crsctl_result.stdout, crsctl_result.stderr
 
     if stderrResult != '':
         return ''
@@ -186,160 +314,42 @@ def find_oracle_db_unique_name_in_crsctl(oracle_gi_home):
         return crsctl_db_unique_name  
 
 def find_oracle_home_in_crsctl(oracle_dbname, oracle_gi_home):
-    
-    my_env = os.environ.copy()
-    args = [os.path.join(oracle_gi_home, 'bin', 'crsctl')]
-    args.append('stat')
-    args.append('res')
-    args.append('ora.'+oracle_dbname.lower()+'.db')
-    args.append('-f')     
-    
-    p = Popen(args, stdout=PIPE, stderr=PIPE, env=my_env, stdin=PIPE)    
-    stdoutResult, stderrResult = p.communicate()
 
-    if stderrResult != '':
-        return ''
-    else: 
-        re_ohome = re.compile(r'ORACLE_HOME=(?P<OHOME>(/|\w+|\.|\d|\-)+)')
-        re_ohome_match = re_ohome.search(stdoutResult)
-        try:
-            ohome = re_ohome_match.group('OHOME')
-        except Exception: 
-            ohome = ''
-        return ohome
+    return find_crsctl_attribute(oracle_dbname, oracle_gi_home, 'ORACLE_HOME')
 
 def find_database_type_in_crsctl(oracle_dbname, oracle_gi_home):
-    
-    my_env = os.environ.copy()
-    args = [os.path.join(oracle_gi_home, 'bin', 'crsctl')]
-    args.append('stat')
-    args.append('res')
-    args.append('ora.'+oracle_dbname.lower()+'.db')
-    args.append('-p')    
-    
-    p = Popen(args, stdout=PIPE, stderr=PIPE, env=my_env, stdin=PIPE)    
-    stdoutResult, stderrResult = p.communicate()
 
-    if stderrResult != '':
-        return ''
-    else: 
-        re_database_type = re.compile(r'DATABASE_TYPE=(?P<DATABASE_TYPE>(/|\w+|\.|\d|\-)+)')
-        re_database_type_match = re_database_type.search(stdoutResult)
-        try:
-            database_type = re_database_type_match.group('DATABASE_TYPE')
-        except Exception: 
-            database_type = ''
-        return database_type
+    return find_crsctl_attribute(oracle_dbname, oracle_gi_home, 'DATABASE_TYPE')
 
 def find_database_cardinality_in_crsctl(oracle_dbname, oracle_gi_home):
-    
-    my_env = os.environ.copy()
-    args = [os.path.join(oracle_gi_home, 'bin', 'crsctl')]
-    args.append('stat')
-    args.append('res')
-    args.append('ora.'+oracle_dbname.lower()+'.db')
-    args.append('-p')    
-    
-    p = Popen(args, stdout=PIPE, stderr=PIPE, env=my_env, stdin=PIPE)    
-    stdoutResult, stderrResult = p.communicate()
 
-    if stderrResult != '':
-        return ''
-    else: 
-        re_database_cardinality = re.compile(r'CARDINALITY=(?P<DATABASE_CARDINALITY>(/|\w+|\.|\d|\-)+)')
-        re_database_cardinality_match = re_database_cardinality.search(stdoutResult)
-        try:
-            database_cardinality = re_database_cardinality_match.group('DATABASE_CARDINALITY')
-        except Exception: 
-            database_cardinality = ''
-        return database_cardinality
+    return find_crsctl_attribute(oracle_dbname, oracle_gi_home, 'CARDINALITY')
 
 def find_dbname_in_crsctl(oracle_dbname, oracle_gi_home):
-    
-    my_env = os.environ.copy()
-    args = [os.path.join(oracle_gi_home, 'bin', 'crsctl')]
-    args.append('stat')
-    args.append('res')
-    args.append('ora.'+oracle_dbname.lower()+'.db')
-    args.append('-p')    
-    
-    p = Popen(args, stdout=PIPE, stderr=PIPE, env=my_env, stdin=PIPE)    
-    stdoutResult, stderrResult = p.communicate()
 
-    if stderrResult != '':
-        return ''
-    else: 
-        re_database_name = re.compile(r'USR_ORA_DB_NAME=(?P<DATABASE_NAME>(/|\w+|\.|\d|\-)+)')
-        re_database_name_match = re_database_name.search(stdoutResult)
-        try:
-            database_name = re_database_name_match.group('DATABASE_NAME')
-        except Exception: 
-            database_name = ''
-        return database_name
+    return find_crsctl_attribute(oracle_dbname, oracle_gi_home, 'USR_ORA_DB_NAME')
 
 def find_db_servers_in_crsctl(oracle_dbname, oracle_gi_home):
-    
-    my_env = os.environ.copy()
-    args = [os.path.join(oracle_gi_home, 'bin', 'crsctl')]
-    args.append('stat')
-    args.append('res')
-    args.append('ora.'+oracle_dbname.lower()+'.db')
-    args.append('-p')    
-    
-    p = Popen(args, stdout=PIPE, stderr=PIPE, env=my_env, stdin=PIPE)    
-    stdoutResult, stderrResult = p.communicate()
 
-    if stderrResult != '':
+    server_instances = find_crsctl_server_attribute(oracle_dbname, oracle_gi_home, 'GEN_USR_ORA_INST_NAME')
+    if server_instances is None:
         return ''
-    else: 
-        re_db_servers = re.compile(r'GEN_USR_ORA_INST_NAME@SERVERNAME\((?P<HOSTNAME>(/|\w+|\.|\d|\-)+)\)');
-        re_db_servers_match = re_db_servers.search(stdoutResult)
-        count = 1
-        outputtext = stdoutResult
-        db_servers = []
-        while re_db_servers_match:
-            #print 'match %d: %s' % (count,re_db_servers_match.group('HOSTNAME'))
-            db_servers.append(re_db_servers_match.group('HOSTNAME'))
-            count = count + 1
-            outputtext = outputtext[re_db_servers_match.end(1) + 1:]
-            re_db_servers_match = re_db_servers.search(outputtext) 
-        return db_servers
+    return [hostname for hostname, instance in server_instances]
 
 def find_db_instances_in_crsctl(oracle_dbname, oracle_gi_home):
-    
-    my_env = os.environ.copy()
-    args = [os.path.join(oracle_gi_home, 'bin', 'crsctl')]
-    args.append('stat')
-    args.append('res')
-    args.append('ora.'+oracle_dbname.lower()+'.db')
-    args.append('-f')    
-    
-    p = Popen(args, stdout=PIPE, stderr=PIPE, env=my_env, stdin=PIPE)    
-    stdoutResult, stderrResult = p.communicate()
 
-    if stderrResult != '':
+    server_instances = find_crsctl_server_attribute(oracle_dbname, oracle_gi_home, 'GEN_USR_ORA_INST_NAME')
+    if server_instances is None:
         return ''
-    else: 
-        re_db_instances = re.compile(r'GEN_USR_ORA_INST_NAME@SERVERNAME\((?P<HOSTNAME>(/|\w+|\.|\d|\-)+)\)=(?P<INSTANCE>(/|\w+|\.|\d|\-)+)');
-        re_db_instances_match = re_db_instances.search(stdoutResult)
-        count = 1
-        outputtext = stdoutResult
-        db_instances = []
-        while re_db_instances_match:
-            #print 'match %d: %s' % (count,re_db_instances_match.group('INSTANCE'))
-            db_instances.append(re_db_instances_match.group('INSTANCE'))
-            count = count + 1
-            outputtext = outputtext[re_db_instances_match.end(1) + 1:]
-            re_db_instances_match = re_db_instances.search(outputtext) 
-
-        return db_instances
-
-def execute_main(ora_inventory_location, etc_oratab_usage, oracle_dbname):
+    return [instance for hostname, instance in server_instances]
+
+def execute_main(ora_inventory_location, etc_oratab_usage, oracle_dbname, crsctl_all_resources):
 
     database_type = None
     database_cardinality = None
     instances = None
     servers = None
+    cluster_databases = []
 
     if oracle_dbname == '':
         oracle_dbname = None
@@ -360,6 +370,10 @@ def execute_main(ora_inventory_location, etc_oratab_usage, oracle_dbname):
             instances = find_db_instances_in_crsctl(oracle_dbname, grid_home)
             servers = find_db_servers_in_crsctl(oracle_dbname, grid_home)
             oracle_dbname = find_dbname_in_crsctl(oracle_db_unique_name, grid_home)
+        elif etc_oratab_usage:
+            oracle_home = find_oracle_home(oracle_dbname)
+            if oracle_home not in load_ora_inv_index(ora_inventory_location)['by_loc']:
+                oracle_home = None
         else:
             oracle_home = None
     else:
@@ -374,11 +388,11 @@ def execute_main(ora_inventory_location, etc_oratab_usage, oracle_dbname):
     if etc_oratab_usage:
         if oracle_dbname is None:
             if oracle_home is not None:
-                oracle_dbname = find_oracle_dbname_in_oratab(oracle_home)
+                oracle_dbname = find_oracle_sid(oracle_home)
     
    # if oracle_dbname is None: 
     if crs_enabled == 'True':
-            oracle_db_unique_name = find_oracle_db_unique_name_in_crsctl(grid_home)
+            oracle_db_unique_name = find_oracle_db_unique_name_in_crsctl(grid_home, crsctl_all_resources, oracle_home, oracle_dbname)
             database_type = find_database_type_in_crsctl(oracle_db_unique_name, grid_home)
             database_cardinality = find_database_cardinality_in_crsctl(oracle_db_unique_name, grid_home)
             instances = find_db_instances_in_crsctl(oracle_db_unique_name, grid_home)
@@ -391,7 +405,12 @@ def execute_main(ora_inventory_location, etc_oratab_usage, oracle_dbname):
     if crs_enabled is None:
         crs_enabled = 'False'
 
-    return ['',oracle_home, oracle_dbname, oracle_db_unique_name, grid_home, crs_enabled, ora_inventory_location, database_type, database_cardinality, instances, servers]
+    if crs_enabled == 'True' and crsctl_all_resources:
+        cluster_databases = crsctl_cluster_snapshot(grid_home)
+
+    inventory_homes = find_ora_inv_homes(ora_inventory_location)
+
+    return ['',oracle_home, oracle_dbname, oracle_db_unique_name, grid_home, crs_enabled, ora_inventory_location, database_type, database_cardinality, instances, servers, cluster_databases, inventory_homes]
 
 def run_module():
     
@@ -399,6 +418,10 @@ def run_module():
         ora_inventory_location=dict(type='str', required=False), 
         etc_oratab_usage=dict(type='bool', required=False, default=True),   
         oracle_dbname=dict(type='str', required=False),            
+        crsctl_all_resources=dict(type='bool', required=False, default=False),
+        use_cache=dict(type='bool', required=False, default=False),
+        cache_dir=dict(type='str', required=False, default='/tmp/admt_discovery_cache'),
+        cache_max_age=dict(type='int', required=False, default=3600),
     )
 
     result = dict(
@@ -412,6 +435,9 @@ def run_module():
         oracle_database_cardinality='',
         oracle_database_instances='',
         oracle_database_servers='',
+        oracle_cluster_databases='',
+        oracle_inventory_homes='',
+        discovery_cache_hit=False,
     )
 
     module = AnsibleModule(
@@ -422,7 +448,19 @@ def run_module():
     if module.check_mode:
         return result
 
-    results_of_execute_main = execute_main(module.params['ora_inventory_location'], module.params['etc_oratab_usage'], module.params['oracle_dbname'])  
+    cache_key = dict(ora_inventory_location=module.params['ora_inventory_location'], etc_oratab_usage=module.params['etc_oratab_usage'], oracle_dbname=module.params['oracle_dbname'], crsctl_all_resources=module.params['crsctl_all_resources'])
+    cache_file = discovery_cache_file(module.params['cache_dir'], 'oracle_rdbms_discovery_module', cache_key)
+
+    results_of_execute_main = None
+    if module.params['use_cache']:
+        results_of_execute_main = read_discovery_cache(cache_file, cache_key, module.params['cache_max_age'])
+        result['discovery_cache_hit'] = results_of_execute_main is not None
+
+    if results_of_execute_main is None:
+        results_of_execute_main = execute_main(module.params['ora_inventory_location'], module.params['etc_oratab_usage'], module.params['oracle_dbname'], module.params['crsctl_all_resources'])  
+        if results_of_execute_main[0] == '':
+            write_discovery_cache(cache_file, 'oracle_rdbms_discovery_module', cache_key, discovery_cache_paths(None, [results_of_execute_main[1], results_of_execute_main[4]]), results_of_execute_main)
+
     result['oracle_home'] = results_of_execute_main[1]
     result['oracle_dbname'] = results_of_execute_main[2]
     result['oracle_db_unique_name'] = results_of_execute_main[3]
@@ -433,6 +471,8 @@ def run_module():
     result['oracle_database_cardinality'] = results_of_execute_main[8]
     result['oracle_database_instances'] = results_of_execute_main[9]
     result['oracle_database_servers'] = results_of_execute_main[10]
+    result['oracle_cluster_databases'] = results_of_execute_main[11]
+    result['oracle_inventory_homes'] = results_of_execute_main[12]
 
     if results_of_execute_main[0] != '':
         module.fail_json(msg='Module has failed! ('+results_of_execute_main[0]+')', **result)  
@@ -66,6 +66,11 @@ options:
         description:
             - When set to True module will ignore RMAN-XXXX errors 
         required: false 
+    ignore_error_codes:
+        description:
+            - List of error codes which do not fail the module (for example ORA-19511 or RMAN-06054, a bare facility like ORA ignores all its codes). 
+              When an error is ignored, the RMAN error stack banner around it (RMAN-00558, RMAN-00569, RMAN-00571, RMAN-03002, RMAN-03009) is ignored as well.
+        required: false
     output_backupsets
             description:
             - Delivers backupset names list
@@ -82,10 +87,40 @@ options:
         description:
             - Delivers input datafile list of filenames which will be included in backupsets. 
         required: false
+    output_copy_file_names:
+        description:
+            - Delivers list of files written by BACKUP AS COPY (output file name=) and CONVERT (converted datafile=), for example to build TRANSPORT_DATAFILES. 
+        required: false
     debug_trace:
         description:
             - Enables debug trace for RMAN session. You provide the name of debug_trace path+filename. 
         required: false
+    output_tail_lines:
+        description:
+            - Only the last output_tail_lines lines of RMAN output are kept and delivered in rman_output (full output is written to rman_logfile).
+        required: false
+    channel_connects:
+        description:
+            - List of dicts (connect, weight). Every ALLOCATE CHANNEL statement of rman_script gets CONNECT string from this list,
+              channels are spread across connect strings (for example RAC instances) according to their weights.
+        required: false
+    progress_file:
+        description:
+            - While RMAN runs, V$SESSION_LONGOPS, V$RMAN_STATUS and V$RMAN_BACKUP_JOB_DETAILS are sampled through one sqlplus session
+              and percent done, bytes/sec per channel and ETA are written to this JSON file (for example to be read while the task runs with async).
+        required: false
+    progress_interval:
+        description:
+            - Number of seconds between progress samples.
+        required: false
+    progress_stall_samples:
+        description:
+            - Channel is reported as stalled when its progress has not changed for this number of samples.
+        required: false
+    timeout:
+        description:
+            - Number of seconds after which RMAN process is killed and module fails (lack of parameter means no limit).
+        required: false
         
                            
            
@@ -119,202 +154,360 @@ EXAMPLES = '''
     output_omit_heading: True
     output_omit_ending: True    
 
+# Backup RAC database with channels spread across two instances (node1 gets two channels for each one of node2)
+- name: Backup database
+  oracle_rman_module:
+    oracle_sid: '<SID>1'
+    rman_script: 'run { allocate channel c1 device type disk; allocate channel c2 device type disk; allocate channel c3 device type disk; backup database; }'
+    channel_connects:
+      - connect: 'sys/<password>@//node1:1521/<DB_UNIQUE_NAME>/<SID>1'
+        weight: 2
+      - connect: 'sys/<password>@//node2:1521/<DB_UNIQUE_NAME>/<SID>2'
+        weight: 1
+
+# Backup database with RMAN and report progress every minute into JSON file
+- name: Backup database
+  oracle_rman_module:
+    oracle_sid: '<SID>'
+    rman_script: 'backup incremental level 0 database;'
+    rman_logfile: '/tmp/rman_backup_database.log'
+    progress_file: '/tmp/rman_backup_database_progress.json'
+    progress_interval: 60
+  async: 144000
+  poll: 30
+
 '''
 
 RETURN = '''
 rman_output:
     description: result of RMAN execution.
     type: str
+copy_file_names:
+    description: files written by BACKUP AS COPY and CONVERT (output_copy_file_names).
+    type: list
+rman_errors:
+    description: RMAN- and ORA- errors found in the output (facility, code, message, line_no), without the ignored ones.
+    type: list
+rman_channel_distribution:
+    description: channels with CONNECT strings assigned from channel_connects (passwords are masked).
+    type: list
 changed:
     description: will be used for the future all removed.
     type: bool   
 '''
 
 from ansible.module_utils.basic import AnsibleModule
-from subprocess import Popen, PIPE
+from ansible.module_utils.oracle_exec import find_oracle_home, oracle_env, run_oracle_command, classify_oracle_errors
+from ansible.module_utils.oracle_progress_monitor import query_progress_monitor, start_progress_monitor, finish_progress_monitor
+from subprocess import Popen, PIPE, STDOUT
 from tempfile import mkstemp, TemporaryFile
 from datetime import datetime, timedelta
+from collections import deque
 import os, sys, re, mmap
+import time
+
+def new_rman_output_state(output_tail_lines, output_omit_heading):
+
+    return dict(
+        line_count=0,
+        skip_lines=6 if output_omit_heading == True else 0,
+        tail=deque(maxlen=output_tail_lines),
+        ends_with_newline=False,
+        backupsets=[],
+        datafile_file_numbers=[],
+        datafile_file_names=[],
+        sbt_library_dirs=[],
+        sbt_opc_pfiles=[],
+        copy_file_names=[],
+    )
 
-def find_oracle_home(oracle_sid):
+re_rman_output = re.compile(
+    r'piece handle=(?P<BACKUPSET_FILENAME>(/|\w+|\.|\d|\+)+) '
+    r'|input datafile file number=(?P<FILE_NUMBER>(/|\w+|\.|\d)+) name(=(?P<FILE_NAME>(/|\w+|\.|\d|\+)+))?'
+    r'|SBT_LIBRARY=(?P<SBT_LIBRARY>(/|\w+|\.|\d|\+)+)libopc'
+    r'|OPC_PFILE=(?P<OPC_PFILE>(/|\w+|\.|\d|\+)+)\)'
+    r'|(output file name|converted datafile)=(?P<COPY_FILE_NAME>(/|\w+|\.|\d|\+|-)+)')
+
+RMAN_ERROR_STACK_CODES = ('00558', '00569', '00571', '03002', '03009')
+
+def parse_rman_output_line(rman_output_state, line):
+
+    rman_output_state['line_count'] += 1
+    if rman_output_state['line_count'] > rman_output_state['skip_lines']:
+        rman_output_state['tail'].append(line)
+
+    for m in re_rman_output.finditer(line):
+        if m.group('BACKUPSET_FILENAME') is not None:
+            rman_output_state['backupsets'].append(m.group('BACKUPSET_FILENAME'))
+        elif m.group('FILE_NUMBER') is not None:
+            rman_output_state['datafile_file_numbers'].append(m.group('FILE_NUMBER').lstrip("0"))
+            if m.group('FILE_NAME') is not None:
+                rman_output_state['datafile_file_names'].append(m.group('FILE_NAME'))
+        elif m.group('SBT_LIBRARY') is not None:
+            rman_output_state['sbt_library_dirs'].append(m.group('SBT_LIBRARY'))
+        elif m.group('OPC_PFILE') is not None:
+            rman_output_state['sbt_opc_pfiles'].append(m.group('OPC_PFILE'))
+        elif m.group('COPY_FILE_NAME') is not None:
+            rman_output_state['copy_file_names'].append(m.group('COPY_FILE_NAME'))
+
+def query_rman_progress(sqlplus_process):
+
+    lines = query_progress_monitor(sqlplus_process,
+        " select 'BLOCK_SIZE|'||value from v$parameter where name = 'db_block_size';\n"
+        " select 'LONGOPS|'||inst_id||'|'||sid||'|'||serial#||'|'||opname||'|'||sofar||'|'||totalwork||'|'||elapsed_seconds||'|'||time_remaining||'|'||units from gv$session_longops where opname like 'RMAN%' and totalwork > 0 and sofar <> totalwork;\n"
+        " select 'JOB|'||session_recid||'|'||status||'|'||input_bytes||'|'||output_bytes||'|'||input_bytes_per_sec||'|'||output_bytes_per_sec||'|'||elapsed_seconds from v$rman_backup_job_details where status like 'RUNNING%';\n"
+        " select 'STATUS|'||operation||'|'||status||'|'||mbytes_processed||'|'||object_type from v$rman_status where status like 'RUNNING%';\n",
+        'ADMT_RMAN_PROGRESS_')
+    if lines is None:
+        return None
+
+    sample = dict(block_size=8192, longops=[], jobs=[], rman_status=[])
+    for line in lines:
+        fields = line.split('|')
+        try:
+            if fields[0] == 'BLOCK_SIZE':
+                sample['block_size'] = int(fields[1])
+            elif fields[0] == 'LONGOPS':
+                sample['longops'].append(dict(inst_id=int(fields[1]), sid=int(fields[2]), serial=int(fields[3]), opname=fields[4], sofar=int(fields[5]), totalwork=int(fields[6]), elapsed_seconds=int(fields[7]), time_remaining=int(fields[8] or 0), units=fields[9]))
+            elif fields[0] == 'JOB':
+                sample['jobs'].append(dict(session_recid=int(fields[1]), status=fields[2], input_bytes=int(fields[3] or 0), output_bytes=int(fields[4] or 0), input_bytes_per_sec=int(fields[5] or 0), output_bytes_per_sec=int(fields[6] or 0), elapsed_seconds=int(fields[7] or 0)))
+            elif fields[0] == 'STATUS':
+                sample['rman_status'].append(dict(operation=fields[1], status=fields[2], mbytes_processed=int(fields[3] or 0), object_type=fields[4]))
+        except (IndexError, ValueError):
+            continue
+    return sample
+
+def build_rman_progress_status(rman_progress_monitor, sample):
+
+    channels = []
+    percent_done = None
+    eta_seconds = None
+    for longop in sample['longops']:
+        if longop['opname'].startswith('RMAN: aggregate'):
+            percent_done = round(100.0 * longop['sofar'] / longop['totalwork'], 2)
+            eta_seconds = max(eta_seconds or 0, longop['time_remaining'])
+            continue
+
+        channel_key = (longop['inst_id'], longop['sid'], longop['serial'], longop['opname'])
+        previous_sofar, samples_without_progress = rman_progress_monitor['channels'].get(channel_key, (None, 0))
+        if previous_sofar == longop['sofar']:
+            samples_without_progress += 1
+        else:
+            samples_without_progress = 0
+        rman_progress_monitor['channels'][channel_key] = (longop['sofar'], samples_without_progress)
+
+        if longop['units'] == 'Blocks':
+            bytes_done = longop['sofar'] * sample['block_size']
+        else:
+            bytes_done = None
+        if bytes_done is not None and longop['elapsed_seconds'] > 0:
+            bytes_per_sec = bytes_done // longop['elapsed_seconds']
+        else:
+            bytes_per_sec = None
+
+        channels.append(dict(
+            inst_id=longop['inst_id'],
+            sid=longop['sid'],
+            serial=longop['serial'],
+            opname=longop['opname'],
+            sofar=longop['sofar'],
+            totalwork=longop['totalwork'],
+            units=longop['units'],
+            percent_done=round(100.0 * longop['sofar'] / longop['totalwork'], 2),
+            bytes_done=bytes_done,
+            bytes_per_sec=bytes_per_sec,
+            time_remaining=longop['time_remaining'],
+            samples_without_progress=samples_without_progress,
+            stalled=(samples_without_progress >= rman_progress_monitor['stall_samples']),
+        ))
+
+    if eta_seconds is None and channels:
+        eta_seconds = max([channel['time_remaining'] for channel in channels])
+
+    return dict(
+        state='RUNNING',
+        updated=datetime.now().isoformat(),
+        elapsed_seconds=int(time.time() - rman_progress_monitor['started']),
+        samples=rman_progress_monitor['status'].get('samples', 0) + 1,
+        percent_done=percent_done,
+        eta_seconds=eta_seconds,
+        bytes_per_sec=sum([channel['bytes_per_sec'] or 0 for channel in channels]),
+        stalled_channels=len([channel for channel in channels if channel['stalled']]),
+        channels=channels,
+        jobs=sample['jobs'],
+        rman_status=sample['rman_status'],
+    )
 
-    re_db_home = re.compile(r'^('+oracle_sid+'):(?P<HOME>(/|\w+|\.)+):(Y|N)')
+def sample_rman_progress(rman_progress_monitor, sqlplus_process):
 
-    with open('/etc/oratab', 'r') as f:
-        for line in f:
-            line = line.strip()
-            re_db_home_match = re_db_home.search(line)
-            if re_db_home_match:
-                db_home = re_db_home_match.group('HOME')
-                #print(db_home)
+    sample = query_rman_progress(sqlplus_process)
+    if sample is None:
+        return None
+    return build_rman_progress_status(rman_progress_monitor, sample)
 
-                return db_home
+def start_rman_progress_monitor(oracle_home, my_env, progress_file, progress_interval, progress_stall_samples):
 
-def find_output_backupsets(rmanoutput,output_backupsets_only_filenames):
-   
-    output_backupsets = []
-    re_output_backupsets = re.compile(r'piece handle=(?P<BACKUPSET_FILENAME>(/|\w+|\.|\d|\+)+) ')
-    try:
-        for m in re_output_backupsets.finditer(rmanoutput):
-            head, tail = os.path.split(m.group('BACKUPSET_FILENAME'))
-            if output_backupsets_only_filenames is True:
-                output_backupsets.append(tail)
-            else:    
-                output_backupsets.append(head+'/'+tail)
-    except Exception: 
-        output_backupsets = []
-    
-    return output_backupsets               
+    return start_progress_monitor(oracle_home, my_env, progress_file, progress_interval, sample_rman_progress, stall_samples=progress_stall_samples, channels={})
 
-def find_output_datafile_file_numbers(rmanoutput):
-   
-    output_datafile_file_numbers = []
-    re_output_datafile_file_numbers = re.compile(r'input datafile file number=(?P<FILE_NUMBER>(/|\w+|\.|\d)+) name')
-    try:
-        for m in re_output_datafile_file_numbers.finditer(rmanoutput):
-            output_datafile_file_numbers.append(m.group('FILE_NUMBER').lstrip("0"))
-    except Exception: 
-        output_datafile_file_numbers = []
-    
-    return output_datafile_file_numbers    
+def finish_rman_progress_monitor(rman_progress_monitor, state):
 
-def find_output_datafile_file_names(rmanoutput):
-   
-    output_datafile_file_names = []
-    re_output_datafile_file_names = re.compile(r'input datafile file number=(?P<FILE_NUMBER>(/|\w+|\.|\d)+) name=(?P<FILE_NAME>(/|\w+|\.|\d|\+)+)')
-    try:
-        for m in re_output_datafile_file_names.finditer(rmanoutput):
-            output_datafile_file_names.append(m.group('FILE_NAME'))
-    except Exception: 
-        output_datafile_file_names = []
-    
-    return output_datafile_file_names  
+    finish_progress_monitor(rman_progress_monitor, state)
 
-def find_output_config_channel_sbt_tape_parms_sbt_library_dir(rmanoutput,oracle_home):
-   
-    output_config_channel_sbt_tape_parms_sbt_library_dir = []
-    re_output_config_channel_sbt_tape_parms_sbt_library_dir = re.compile(r'SBT_LIBRARY=(?P<SBT_LIBRARY>(/|\w+|\.|\d|\+)+)libopc')
-    try:
-        for m in re_output_config_channel_sbt_tape_parms_sbt_library_dir.finditer(rmanoutput):
-            output_config_channel_sbt_tape_parms_sbt_library_dir.append(m.group('SBT_LIBRARY'))
-        if not output_config_channel_sbt_tape_parms_sbt_library_dir:
-            output_config_channel_sbt_tape_parms_sbt_library_dir.append(oracle_home+'/lib')
-    except Exception: 
-        output_config_channel_sbt_tape_parms_sbt_library_dir = []
-    
-    return output_config_channel_sbt_tape_parms_sbt_library_dir            
+def mask_rman_connect(connect):
 
-def find_output_config_channel_sbt_tape_parms_sbt_opc_pfile(rmanoutput):
-   
-    output_config_channel_sbt_tape_parms_sbt_opc_pfile = []
-    re_output_config_channel_sbt_tape_parms_sbt_opc_pfile = re.compile(r'OPC_PFILE=(?P<OPC_PFILE>(/|\w+|\.|\d|\+)+)\)')
-    try:
-        for m in re_output_config_channel_sbt_tape_parms_sbt_opc_pfile.finditer(rmanoutput):
-            output_config_channel_sbt_tape_parms_sbt_opc_pfile.append(m.group('OPC_PFILE'))
-    except Exception: 
-        output_config_channel_sbt_tape_parms_sbt_opc_pfile = []
-    
-    return output_config_channel_sbt_tape_parms_sbt_opc_pfile         
+    return re.sub(r'^([^/@]*)/[^@]*@', r'\1/********@', connect)
+
+def distribute_rman_channels(rman_script, channel_connects):
+
+    # Smooth weighted round robin, so channels of one node are interleaved with other nodes
+    connects = [channel_connect for channel_connect in channel_connects if int(channel_connect.get('weight', 1)) > 0]
+    weights = [int(channel_connect.get('weight', 1)) for channel_connect in connects]
+    current_weights = [0] * len(connects)
+    rman_channel_distribution = []
+
+    def add_channel_connect(allocate_channel_match):
+        for i in range(len(connects)):
+            current_weights[i] += weights[i]
+        best = current_weights.index(max(current_weights))
+        current_weights[best] -= sum(weights)
+        rman_channel_distribution.append(dict(channel=allocate_channel_match.group('CHANNEL'), connect=mask_rman_connect(connects[best]['connect'])))
+        return allocate_channel_match.group(0)+" CONNECT '"+connects[best]['connect']+"'"
 
+    if not connects:
+        return [rman_script, rman_channel_distribution]
 
-def execute_rman(oracle_home, oracle_sid, oracle_unqname, rman_script, rman_connect_target_string, rman_logfile, output_as_array, output_omit_heading, output_omit_ending, output_omit_all, ignore_RMAN_errors, output_datafile_file_numbers, output_datafile_file_names, output_backupsets, output_backupsets_only_filenames, output_config_channel_sbt_tape_parms_sbt_library_dir, output_config_channel_sbt_tape_parms_sbt_opc_pfile, debug_trace):
+    re_allocate_channel = re.compile(r'allocate\s+(auxiliary\s+)?channel\s+(?P<CHANNEL>\w+)\s+device\s+type\s+\w+', re.IGNORECASE)
+    rman_script = re_allocate_channel.sub(add_channel_connect, rman_script)
+
+    return [rman_script, rman_channel_distribution]
+
+def execute_rman(oracle_home, oracle_sid, oracle_unqname, rman_script, rman_connect_target_string, rman_logfile, output_as_array, output_omit_heading, output_omit_ending, output_omit_all, ignore_RMAN_errors, output_datafile_file_numbers, output_datafile_file_names, output_backupsets, output_backupsets_only_filenames, output_config_channel_sbt_tape_parms_sbt_library_dir, output_config_channel_sbt_tape_parms_sbt_opc_pfile, debug_trace, output_tail_lines, progress_file, progress_interval, progress_stall_samples, channel_connects, ignore_error_codes, output_copy_file_names, timeout):
 
 
     if oracle_home is None:
        oracle_home = find_oracle_home(oracle_sid)
 
+    if channel_connects:
+        rman_script, rman_channel_distribution = distribute_rman_channels(rman_script, channel_connects)
+    else:
+        rman_channel_distribution = []
+
     args = [os.path.join(oracle_home, 'bin', 'rman')]
     if rman_connect_target_string is not None:
        args.append(" target=\"'"+rman_connect_target_string+"'\"")   
     else:    
         args.append(' target=/')
 
-#    if rman_logfile is not None:
-#        args.append(' log = '+rman_logfile+' APPEND')
-    
     if debug_trace is not None:
         args.append(' debug trace='+debug_trace)
 
-    #if rman_logfile is not None:
-    #    args.append(' | tee '+rman_logfile)
-    
-    my_env = os.environ.copy()
-    my_env["PATH"] = my_env["PATH"] + oracle_home+'/bin'
-    my_env["ORACLE_HOME"] = oracle_home
-    my_env["ORACLE_SID"] = oracle_sid
+    if oracle_unqname is None:
+        oracle_unqname = oracle_sid
+
+    my_env = oracle_env(oracle_home, oracle_sid, ORACLE_UNQNAME=oracle_unqname)
+
+    rman_output_state = new_rman_output_state(output_tail_lines, output_as_array == True and output_omit_heading == True)
 
-    if oracle_unqname is not None:
-        my_env["ORACLE_UNQNAME"] = oracle_unqname
-    else:
-        my_env["ORACLE_UNQNAME"] = oracle_sid
-    
-    
     if rman_logfile is not None:
-        outfile=open(rman_logfile,"wb")
-        errfile=open(rman_logfile,"wb")
-        p = Popen(args, stdout=outfile, stderr=errfile, env=my_env, stdin=PIPE)    
-        p.stdin.write(rman_script.encode())
-        rmanResult, stderrResult = p.communicate()
-        outfile=open(rman_logfile,"r")
-        errfile=open(rman_logfile,"r")
-        rmanResult=outfile.read() 
-        stderrResult=errfile.read() 
-    else:            
-        p = Popen(args, stdout=PIPE, stderr=PIPE, env=my_env, stdin=PIPE) 
-        p.stdin.write(rman_script.encode())
-        rmanResult, stderrResult = p.communicate() 
-
-    #p.stdin.write(rman_script.encode())
-
-    #rmanResult, stderrResult = p.communicate()
-
-
-    if rmanResult.count('RMAN-') > 0:
-        if ignore_RMAN_errors == False: 
-            rmanErrors = re.findall('RMAN-(.+?):', rmanResult)
-        if ignore_RMAN_errors == True:
-            rmanErrors = ''        
-        
-    if rmanResult.count('RMAN-') == 0:
+        logfile = open(rman_logfile, "w")
+    else:
+        logfile = None
+
+    def handle_rman_output_line(line):
+        if logfile is not None:
+            logfile.write(line)
+            logfile.flush()
+        rman_output_state['ends_with_newline'] = line.endswith('\n')
+        parse_rman_output_line(rman_output_state, line.rstrip('\n'))
+
+    if progress_file is not None:
+        rman_progress_monitor = start_rman_progress_monitor(oracle_home, my_env, progress_file, progress_interval, progress_stall_samples)
+    else:
+        rman_progress_monitor = None
+
+    try:
+        rman_result = run_oracle_command(args, my_env, rman_script, timeout=timeout, stderr_to_stdout=logfile is not None, line_handler=handle_rman_output_line, capture_stdout=False)
+    except Exception:
+        if rman_progress_monitor is not None:
+            finish_rman_progress_monitor(rman_progress_monitor, 'FAILED')
+        raise
+    finally:
+        if logfile is not None:
+            logfile.close()
+
+    stderrResult = rman_result.stderr
+
+    rman_errors = classify_oracle_errors(rman_result.errors, ('RMAN', 'ORA'), ignore_error_codes)
+    if len(rman_errors) < len(classify_oracle_errors(rman_result.errors, ('RMAN', 'ORA'))):
+        # the banner of an error stack whose errors were all ignored does not fail the module on its own
+        rman_errors = [error for error in rman_errors if error['facility'] != 'RMAN' or error['code'] not in RMAN_ERROR_STACK_CODES]
+
+    rmanErrors = [error['code'] for error in rman_errors if error['facility'] == 'RMAN']
+    if ignore_RMAN_errors == True or not rmanErrors:
         rmanErrors = ''
 
-    
+    rman_execution_error = None
+    if rman_result.timed_out:
+        rman_execution_error = 'RMAN has not finished within '+str(timeout)+' seconds and has been killed.'
+    elif rman_result.line_handler_errors:
+        rman_execution_error = 'RMAN output could not be processed ('+rman_result.line_handler_errors[0]+').'
+
+    if rman_progress_monitor is not None:
+        if rmanErrors != '' or rman_result.returncode != 0 or rman_result.timed_out:
+            finish_rman_progress_monitor(rman_progress_monitor, 'FAILED')
+        else:
+            finish_rman_progress_monitor(rman_progress_monitor, 'COMPLETED')
+
     if output_datafile_file_numbers is True:    
-        datafileNumbers = find_output_datafile_file_numbers(rmanResult)
+        datafileNumbers = rman_output_state['datafile_file_numbers']
     else:
         datafileNumbers = []
 
     if output_datafile_file_names is True:    
-        datafileNames = find_output_datafile_file_names(rmanResult)
+        datafileNames = rman_output_state['datafile_file_names']
     else:
         datafileNames = []          
 
+    backupsets = []
     if output_backupsets is True:    
-        backupsets = find_output_backupsets(rmanResult, output_backupsets_only_filenames)
-    else:
-        backupsets = []       
+        for backupset in rman_output_state['backupsets']:
+            head, tail = os.path.split(backupset)
+            if output_backupsets_only_filenames is True:
+                backupsets.append(tail)
+            else:    
+                backupsets.append(head+'/'+tail)
 
     if output_config_channel_sbt_tape_parms_sbt_library_dir is True:    
-        config_channel_sbt_tape_parms_sbt_library_dir = find_output_config_channel_sbt_tape_parms_sbt_library_dir(rmanResult, oracle_home)
+        config_channel_sbt_tape_parms_sbt_library_dir = rman_output_state['sbt_library_dirs']
+        if not config_channel_sbt_tape_parms_sbt_library_dir:
+            config_channel_sbt_tape_parms_sbt_library_dir = [oracle_home+'/lib']
     else:
         config_channel_sbt_tape_parms_sbt_library_dir = []     
 
     if output_config_channel_sbt_tape_parms_sbt_opc_pfile is True:    
-        config_channel_sbt_tape_parms_sbt_opc_pfile = find_output_config_channel_sbt_tape_parms_sbt_opc_pfile(rmanResult)
+        config_channel_sbt_tape_parms_sbt_opc_pfile = rman_output_state['sbt_opc_pfiles']
     else:
         config_channel_sbt_tape_parms_sbt_opc_pfile = []   
 
+    if output_copy_file_names is True:
+        copyFileNames = rman_output_state['copy_file_names']
+    else:
+        copyFileNames = []
+
+    # same shape as the former stdout.split('\n'): final newline gives an empty last element
+    rmanResult = list(rman_output_state['tail'])
+    if rman_output_state['ends_with_newline'] and rman_output_state['line_count'] >= rman_output_state['skip_lines']:
+        rmanResult.append('')
     if output_as_array == True:
-        rmanResult = rmanResult.split('\n')
-        if output_omit_heading == True:
-            rmanResult = rmanResult[6:]
         if output_omit_ending == True:
             rmanResult = rmanResult[:len(rmanResult)-5]
+    else:
+        rmanResult = '\n'.join(rmanResult)
     
     if output_omit_all == True:
         rmanResult = ''
 
-    return [rmanResult, rmanErrors, stderrResult, backupsets, datafileNumbers, datafileNames, config_channel_sbt_tape_parms_sbt_library_dir, config_channel_sbt_tape_parms_sbt_opc_pfile]
+    return [rmanResult, rmanErrors, stderrResult, backupsets, datafileNumbers, datafileNames, config_channel_sbt_tape_parms_sbt_library_dir, config_channel_sbt_tape_parms_sbt_opc_pfile, rman_channel_distribution, rman_errors, copyFileNames, rman_execution_error]
 
 def run_module():
     
@@ -336,8 +529,15 @@ def run_module():
         output_backupsets_only_filenames=dict(type='bool', required=False, default=True),
         output_config_channel_sbt_tape_parms_sbt_library_dir=dict(type='bool', required=False, default=False),
         output_config_channel_sbt_tape_parms_sbt_opc_pfile=dict(type='bool', required=False, default=False),
-        debug_trace=dict(type='str', required=False)
-        
+        debug_trace=dict(type='str', required=False),
+        output_tail_lines=dict(type='int', required=False, default=1000),
+        progress_file=dict(type='str', required=False),
+        progress_interval=dict(type='int', required=False, default=60),
+        progress_stall_samples=dict(type='int', required=False, default=5),
+        channel_connects=dict(type='list', required=False, no_log=True),
+        ignore_error_codes=dict(type='list', required=False, default=[]),
+        output_copy_file_names=dict(type='bool', required=False, default=False),
+        timeout=dict(type='int', required=False)
     )
 
     result = dict(
@@ -378,7 +578,15 @@ def run_module():
         module.params['output_backupsets_only_filenames'],
         module.params['output_config_channel_sbt_tape_parms_sbt_library_dir'],
         module.params['output_config_channel_sbt_tape_parms_sbt_opc_pfile'],
-        module.params['debug_trace'])
+        module.params['debug_trace'],
+        module.params['output_tail_lines'],
+        module.params['progress_file'],
+        module.params['progress_interval'],
+        module.params['progress_stall_samples'],
+        module.params['channel_connects'],
+        module.params['ignore_error_codes'],
+        module.params['output_copy_file_names'],
+        module.params['timeout'])
     
     result['rman_output'] = results_of_execute_rman[0]
     result['backupsets'] = results_of_execute_rman[3]
@@ -386,7 +594,13 @@ def run_module():
     result['datafile_file_names'] = results_of_execute_rman[5]
     result['config_channel_sbt_tape_parms_sbt_library_dir'] = results_of_execute_rman[6]
     result['config_channel_sbt_tape_parms_sbt_opc_pfile'] = results_of_execute_rman[7]
+    result['rman_channel_distribution'] = results_of_execute_rman[8]
+    result['rman_errors'] = results_of_execute_rman[9]
+    result['copy_file_names'] = results_of_execute_rman[10]
+
 
+    if results_of_execute_rman[11] is not None:
+        module.fail_json(msg='RMAN module has failed! '+results_of_execute_rman[11], **result)
             
     if results_of_execute_rman[1] != '':
         module.fail_json(msg='RMAN module has failed (RMAN-XXXX errors listed)!', **result)
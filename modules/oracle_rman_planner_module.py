@@ -0,0 +1,323 @@
+#!/usr/bin/python
+#
+#Copyright (c) 2020, Oracle and/or its affiliates.
+#The Universal Permissive License (UPL), Version 1.0
+#
+
+ANSIBLE_METADATA = {
+    'metadata_version': '1.0',
+    'status': ['preview'],
+    'supported_by': 'community'
+}
+
+DOCUMENTATION = '''
+---
+module: oracle_rman_planner_module
+
+short_description: This is simple RMAN channel planner module for remote execution
+
+version_added: "1.0"
+
+description:
+    - "This module will read datafile sizes (V$DATAFILE), CPU count and database version and plan RMAN channel count, SECTION SIZE and FILESPERSET"
+    - "Predicted per channel byte balance is returned as report (dry-run, nothing is executed with RMAN)"
+
+options:
+    oracle_home:
+        description:
+            - This is $ORACLE_HOME directory where sqlplus binary resides (lack of parameter means it will be derived from /etc/oratab).
+        required: false
+    oracle_sid:
+        description:
+            - This is $ORACLE_SID which will be used to access proper database (database must be at least in MOUNT state)
+        required: true
+    target_throughput_mb:
+        description:
+            - Expected object store throughput (MB/s) for the whole backup or restore.
+        required: false
+    channel_throughput_mb:
+        description:
+            - Expected throughput (MB/s) of one RMAN channel.
+        required: false
+    min_channels:
+        description:
+            - Minimal number of channels.
+        required: false
+    max_channels:
+        description:
+            - Maximal number of channels (channel count is also limited by CPU_COUNT).
+        required: false
+    sections_per_channel:
+        description:
+            - Number of backup pieces each channel should get when big datafiles are split with SECTION SIZE.
+        required: false
+    min_section_size_mb:
+        description:
+            - SECTION SIZE will not be smaller than min_section_size_mb.
+        required: false
+    max_filesperset:
+        description:
+            - FILESPERSET will not be bigger than max_filesperset.
+        required: false
+    all_instances:
+        description:
+            - Channel count is limited by CPU_COUNT of all instances (GV$PARAMETER), used when channels are spread across RAC instances.
+        required: false
+    plan_report_file:
+        description:
+            - Report with predicted per channel byte balance will be written to this file.
+        required: false
+
+'''
+
+EXAMPLES = '''
+# Plan RMAN channels for the backup of FOGGYDB
+- name: Plan RMAN channels
+  oracle_rman_planner_module:
+    oracle_home: '/u01/app/oracle/product/12.1.0.2/dbhome_1'
+    oracle_sid: 'FOGGYDB'
+    target_throughput_mb: 1000
+    channel_throughput_mb: 200
+    plan_report_file: '/tmp/rman_plan_FOGGYDB.txt'
+
+'''
+
+RETURN = '''
+rman_channels_number:
+    description: planned number of RMAN channels.
+    type: str
+rman_section_size:
+    description: planned SECTION SIZE (for example 32G) or empty string when datafiles should not be split.
+    type: str
+rman_filesperset:
+    description: planned FILESPERSET.
+    type: str
+rman_plan:
+    description: datafile histogram and predicted bytes, pieces and seconds per channel.
+    type: dict
+rman_plan_report:
+    description: predicted per channel byte balance as text lines.
+    type: list
+changed:
+    description: will be used for the future all removed.
+    type: bool
+'''
+
+from ansible.module_utils.basic import AnsibleModule
+from ansible.module_utils.oracle_exec import find_oracle_home, oracle_env, run_oracle_command
+import os, sys, re
+
+MB = 1024 * 1024
+GB = 1024 * MB
+
+
+def query_datafiles(oracle_home, oracle_sid, all_instances):
+
+    if oracle_home is None:
+        oracle_home = find_oracle_home(oracle_sid)
+
+    my_env = oracle_env(oracle_home, oracle_sid)
+
+    args = [os.path.join(oracle_home, 'bin', 'sqlplus'), '-S', '/', 'as sysdba']
+    sql_script = (
+        " SET HEADING OFF\n SET FEEDBACK OFF\n SET PAGES 0\n SET LINESIZE 1000\n SET TAB OFF\n"
+        " select 'DATAFILE|'||file#||'|'||bytes from v$datafile;\n"
+        " select 'CPU_COUNT|'||sum(value) from "+('gv$parameter' if all_instances else 'v$parameter')+" where name = 'cpu_count';\n"
+        " select 'VERSION|'||version from v$instance;\n"
+        " EXIT\n")
+
+    stdoutResult = run_oracle_command(args, my_env, sql_script, stderr_to_stdout=True).stdout
+
+    datafiles = []
+    cpu_count = None
+    version = ''
+    ora_errors = []
+    for line in stdoutResult.split('\n'):
+        line = line.strip()
+        fields = line.split('|')
+        if fields[0] == 'DATAFILE' and len(fields) == 3:
+            datafiles.append((int(fields[1]), int(fields[2])))
+        elif fields[0] == 'CPU_COUNT' and len(fields) == 2:
+            cpu_count = int(fields[1])
+        elif fields[0] == 'VERSION' and len(fields) == 2:
+            version = fields[1]
+        elif line.startswith('ORA-') or line.startswith('SP2-'):
+            ora_errors.append(line)
+
+    return [datafiles, cpu_count, version, ora_errors, ' '.join(args)]
+
+def format_bytes(value):
+
+    if value >= GB:
+        return '%.1fG' % (float(value) / GB)
+    return '%.1fM' % (float(value) / MB)
+
+def balance_pieces(pieces, channels_number):
+
+    # Longest processing time first: the biggest piece goes to the least loaded channel
+    channel_bytes = [0] * channels_number
+    channel_pieces = [0] * channels_number
+    for piece in sorted(pieces, reverse=True):
+        channel = channel_bytes.index(min(channel_bytes))
+        channel_bytes[channel] += piece
+        channel_pieces[channel] += 1
+
+    return [channel_bytes, channel_pieces]
+
+def plan_rman_channels(datafiles, cpu_count, version, target_throughput_mb, channel_throughput_mb, min_channels, max_channels, sections_per_channel, min_section_size_mb, max_filesperset):
+
+    total_bytes = sum([bytes for file_number, bytes in datafiles])
+    largest_bytes = max([bytes for file_number, bytes in datafiles] + [0])
+
+    channels_number = -(-target_throughput_mb // channel_throughput_mb)
+    channels_number = min(channels_number, max_channels)
+    if cpu_count:
+        channels_number = min(channels_number, cpu_count)
+    channels_number = max(channels_number, min_channels, 1)
+
+    # Multisection incremental backups are available from 12c
+    try:
+        multisection = int(version.split('.')[0]) >= 12
+    except ValueError:
+        multisection = False
+
+    section_size_bytes = None
+    section_goal_bytes = total_bytes // (channels_number * sections_per_channel)
+    if multisection and largest_bytes > max(section_goal_bytes, min_section_size_mb * MB):
+        section_size_mb = max(-(-section_goal_bytes // MB), min_section_size_mb)
+        if section_size_mb >= 1024:
+            section_size_mb = -(-section_size_mb // 1024) * 1024
+        section_size_bytes = section_size_mb * MB
+
+    pieces = []
+    for file_number, bytes in datafiles:
+        if section_size_bytes is not None and bytes > section_size_bytes:
+            pieces.extend([section_size_bytes] * (bytes // section_size_bytes))
+            if bytes % section_size_bytes:
+                pieces.append(bytes % section_size_bytes)
+        else:
+            pieces.append(bytes)
+
+    filesperset = -(-len(pieces) // (channels_number * sections_per_channel))
+    filesperset = max(1, min(filesperset, max_filesperset))
+
+    channel_bytes, channel_pieces = balance_pieces(pieces, channels_number)
+    unsplit_channel_bytes = balance_pieces([bytes for file_number, bytes in datafiles], channels_number)[0]
+
+    if section_size_bytes is None:
+        rman_section_size = ''
+    elif section_size_bytes % GB == 0:
+        rman_section_size = str(section_size_bytes // GB)+'G'
+    else:
+        rman_section_size = str(section_size_bytes // MB)+'M'
+
+    histogram = {}
+    for file_number, bytes in datafiles:
+        bucket = 1
+        while bucket * GB < bytes:
+            bucket *= 2
+        histogram[bucket] = histogram.get(bucket, 0) + 1
+
+    average_bytes = float(total_bytes) / channels_number
+
+    return dict(
+        channels_number=channels_number,
+        section_size=rman_section_size,
+        filesperset=filesperset,
+        datafiles_number=len(datafiles),
+        total_bytes=total_bytes,
+        largest_datafile_bytes=largest_bytes,
+        cpu_count=cpu_count,
+        version=version,
+        datafile_histogram=[dict(up_to_gb=bucket, datafiles=histogram[bucket]) for bucket in sorted(histogram)],
+        pieces_number=len(pieces),
+        channels=[dict(channel='c'+str(i + 1), bytes=channel_bytes[i], pieces=channel_pieces[i], seconds=channel_bytes[i] // (channel_throughput_mb * MB)) for i in range(channels_number)],
+        imbalance=round(max(channel_bytes + [0]) / average_bytes, 2) if average_bytes else 1.0,
+        unsplit_imbalance=round(max(unsplit_channel_bytes + [0]) / average_bytes, 2) if average_bytes else 1.0,
+        predicted_seconds=max(channel_bytes + [0]) // (channel_throughput_mb * MB),
+        unsplit_predicted_seconds=max(unsplit_channel_bytes + [0]) // (channel_throughput_mb * MB),
+    )
+
+def format_rman_plan_report(rman_plan):
+
+    report = []
+    report.append('Datafiles: %d, total %s, largest %s, CPU_COUNT %s, version %s' % (rman_plan['datafiles_number'], format_bytes(rman_plan['total_bytes']), format_bytes(rman_plan['largest_datafile_bytes']), rman_plan['cpu_count'], rman_plan['version']))
+    for bucket in rman_plan['datafile_histogram']:
+        report.append('  datafiles up to %5dG: %d' % (bucket['up_to_gb'], bucket['datafiles']))
+    report.append('Channels: %d, SECTION SIZE: %s, FILESPERSET: %d, pieces: %d' % (rman_plan['channels_number'], rman_plan['section_size'] or 'none', rman_plan['filesperset'], rman_plan['pieces_number']))
+    for channel in rman_plan['channels']:
+        report.append('  %-4s %10s in %4d pieces, ~%d s' % (channel['channel'], format_bytes(channel['bytes']), channel['pieces'], channel['seconds']))
+    report.append('Imbalance (max/avg channel bytes): %.2f, without SECTION SIZE: %.2f' % (rman_plan['imbalance'], rman_plan['unsplit_imbalance']))
+    report.append('Predicted duration: ~%d s, without SECTION SIZE: ~%d s' % (rman_plan['predicted_seconds'], rman_plan['unsplit_predicted_seconds']))
+
+    return report
+
+def run_module():
+
+    module_args = dict(
+        oracle_home=dict(type='str', required=False),
+        oracle_sid=dict(type='str', required=True),
+        target_throughput_mb=dict(type='int', required=False, default=1000),
+        channel_throughput_mb=dict(type='int', required=False, default=200),
+        min_channels=dict(type='int', required=False, default=1),
+        max_channels=dict(type='int', required=False, default=16),
+        sections_per_channel=dict(type='int', required=False, default=4),
+        min_section_size_mb=dict(type='int', required=False, default=1024),
+        max_filesperset=dict(type='int', required=False, default=64),
+        all_instances=dict(type='bool', required=False, default=False),
+        plan_report_file=dict(type='str', required=False)
+    )
+
+    result = dict(
+        changed=False,
+        rman_channels_number='',
+        rman_section_size='',
+        rman_filesperset='',
+        rman_plan={},
+        rman_plan_report=[]
+    )
+
+    module = AnsibleModule(
+        argument_spec=module_args,
+        supports_check_mode=True
+    )
+
+    results_of_query_datafiles = query_datafiles(
+        module.params['oracle_home'],
+        module.params['oracle_sid'],
+        module.params['all_instances'])
+
+    result['sqlplus_command'] = results_of_query_datafiles[4]
+
+    if results_of_query_datafiles[3] != [] or results_of_query_datafiles[0] == []:
+        module.fail_json(msg='RMAN planner module has failed to read V$DATAFILE!', ora_errors=results_of_query_datafiles[3], **result)
+
+    rman_plan = plan_rman_channels(
+        results_of_query_datafiles[0],
+        results_of_query_datafiles[1],
+        results_of_query_datafiles[2],
+        module.params['target_throughput_mb'],
+        module.params['channel_throughput_mb'],
+        module.params['min_channels'],
+        module.params['max_channels'],
+        module.params['sections_per_channel'],
+        module.params['min_section_size_mb'],
+        module.params['max_filesperset'])
+
+    result['rman_channels_number'] = str(rman_plan['channels_number'])
+    result['rman_section_size'] = rman_plan['section_size']
+    result['rman_filesperset'] = str(rman_plan['filesperset'])
+    result['rman_plan'] = rman_plan
+    result['rman_plan_report'] = format_rman_plan_report(rman_plan)
+
+    if module.params['plan_report_file'] is not None and not module.check_mode:
+        with open(module.params['plan_report_file'], 'w') as f:
+            f.write('\n'.join(result['rman_plan_report'])+'\n')
+
+    module.exit_json(**result)
+
+def main():
+    run_module()
+
+if __name__ == '__main__':
+    main()
@@ -37,7 +37,12 @@ options:
     sql_statement:
         description:
             - This is SQL statement which will be executed
-        required: true
+        required: false (sql_statement or sql_statements is required)
+    sql_statements:
+        description:
+            - List of SQL statements which will be executed one after another within the same sqlplus session.
+            - Output is split per statement and delivered in sqlplus_results.
+        required: false
     silent_mode:
         description:
             - SQLPLUS will be executed in silent mode.
@@ -62,6 +67,10 @@ options:
         description:
             - When set to True module will ignore ORA-XXXX errors 
         required: false
+    ignore_error_codes:
+        description:
+            - List of error codes which do not fail the module (for example ORA-01109 or PRCD-1120, a bare facility like PRKO ignores all its codes). Errors are still listed in sqlplus_message.
+        required: false
     username:
         description:
             - database username which should be used for login to database 
@@ -94,6 +103,46 @@ options:
         description:
             - This is $TNS_ADMIN which will be used to access proper database
         required: false
+    session_broker:
+        description:
+            - SQL statement will be executed within long-lived sqlplus session owned by local session broker (reused by next module executions on the same host).
+            - Broker is started on demand. When broker cannot serve request new sqlplus process is used as usual.
+            - Every request starts with SPOOL OFF and default SET options, so state left by earlier requests is not inherited.
+            - sql_statement needs to be terminated (; or /) in this mode.
+        required: false
+    session_broker_socket:
+        description:
+            - Unix socket of session broker (if not provided /tmp/.admt_sqlplus_broker_<uid>/broker.sock will be used).
+            - Directory of the socket is created with mode 0700, broker is not used when the directory is accessible by other users.
+        required: false
+    session_idle_timeout:
+        description:
+            - Number of seconds after which idle broker session is closed (broker exits when no session is left).
+        required: false
+    session_max_open:
+        description:
+            - Maximum number of sqlplus sessions kept open by broker (least recently used idle session is closed first).
+        required: false
+    session_timeout:
+        description:
+            - Number of seconds after which broker kills sqlplus session still executing the request (module fails, request is not repeated).
+        required: false
+    timeout:
+        description:
+            - Number of seconds after which sqlplus process is killed and module fails (lack of parameter means no limit, with session_broker session_timeout is used).
+        required: false
+    result_format:
+        description:
+            - text (default) delivers sqlplus output as it is.
+            - rows delivers sqlplus_columns and sqlplus_rows as lists of typed values (NULL as null, numbers as numbers, with sqlplus older than 12.2 all values are strings).
+            - json delivers sqlplus_rows as list of dictionaries (column name -> typed value).
+            - csv delivers sqlplus_rows as CSV lines.
+            - SET MARKUP CSV ON is used (12.2+ sqlplus), for older sqlplus rows are split on COLSEP. Only with sql_statement.
+        required: false
+    max_rows:
+        description:
+            - Maximum number of rows delivered in sqlplus_rows when result_format is not text (sqlplus_rows_truncated is set when more rows were returned or output was cut).
+        required: false
 
 '''
 
@@ -111,39 +160,484 @@ EXAMPLES = '''
     oracle_sid: '<SID>'
     sql_statement: 'select username from dba_users;'
     output_as_array: True
+
+# Execute SQLPlus remotely within sqlplus session reused by next tasks
+- name: Check open mode of database
+  oracle_sqlplus_module:
+    oracle_sid: '<SID>'
+    sql_statement: 'select open_mode from v$database;'
+    session_broker: True
+
+# Execute many SQL statements within one SQLPlus session
+- name: Discover database facts
+  oracle_sqlplus_module:
+    oracle_sid: '<SID>'
+    sql_statements:
+      - 'select dbid from v$database;'
+      - 'select db_unique_name from v$database;'
+  register: sqlplusoutput
+# sqlplusoutput.sqlplus_results[1].rows[0] is DB_UNIQUE_NAME
+
+# Execute SQLPlus remotely (rows delivered as list of dictionaries)
+- name: Check datafiles
+  oracle_sqlplus_module:
+    oracle_sid: '<SID>'
+    sql_statement: 'select file#, status, bytes, name from v$datafile;'
+    result_format: json
+    max_rows: 10000
 '''
 
 RETURN = '''
 sqlplus_message:
     description: result of SQL statement.
     type: str
+sqlplus_results:
+    description: result of every statement from sql_statements (statement, rows, ora_errors, elapsed in seconds).
+    type: list
+sqlplus_errors:
+    description: errors found in the output (facility, code, message, line_no), without the ignored ones.
+    type: list
+sqlplus_columns:
+    description: column names of SQL statement result (result_format different than text).
+    type: list
+sqlplus_rows:
+    description: rows of SQL statement result (result_format different than text).
+    type: list
+sqlplus_rows_truncated:
+    description: True when more rows than max_rows were returned or sqlplus output was cut (timeout, output not processed).
+    type: bool
 changed:
     description: will be used for the future all removed.
     type: bool   
 '''
 
 from ansible.module_utils.basic import AnsibleModule
-from subprocess import Popen, PIPE
+from ansible.module_utils.oracle_exec import find_oracle_home, oracle_env, run_oracle_command, scan_oracle_errors, classify_oracle_errors
+from subprocess import Popen, PIPE, STDOUT
 from tempfile import mkstemp, TemporaryFile
 from datetime import datetime, timedelta
+from collections import deque
 import os, sys, re
+import json, hashlib, socket, threading, time, uuid
+
+try:
+    from socketserver import ThreadingMixIn, UnixStreamServer, StreamRequestHandler
+except ImportError:
+    from SocketServer import ThreadingMixIn, UnixStreamServer, StreamRequestHandler
+
+
+# every broker request starts from sqlplus defaults, whatever earlier callers left set
+SQLPLUS_BROKER_RESET = (
+    ' SPOOL OFF\n'
+    ' SET HEADING ON\n SET FEEDBACK 6\n SET PAGESIZE 14\n SET LINESIZE 80\n SET TAB ON\n'
+    ' SET TIMING OFF\n SET UNDERLINE ON\n SET NEWPAGE 1\n SET TRIMOUT ON\n SET TRIMSPOOL OFF\n'
+    " SET COLSEP ' '\n SET NULL ''\n SET LONG 80\n SET SERVEROUTPUT OFF\n SET ECHO OFF\n SET VERIFY ON\n SET DEFINE ON\n"
+    ' WHENEVER SQLERROR CONTINUE\n WHENEVER OSERROR CONTINUE\n')
+
+class SqlplusSession(object):
+
+    def __init__(self, args, env):
+        self.process = Popen(args, stdout=PIPE, stderr=STDOUT, env=env, stdin=PIPE, universal_newlines=True, bufsize=1)
+        self.lock = threading.Lock()
+        self.last_used = time.time()
+        self.closed = False
+        self.timed_out = False
+
+    def kill(self):
+        self.timed_out = True
+        try:
+            self.process.kill()
+        except OSError:
+            pass
+
+    def execute(self, sqlplus_script, timeout):
+        reset_sentinel = 'ADMT_SQLPLUS_BROKER_RESET_'+uuid.uuid4().hex
+        sentinel = 'ADMT_SQLPLUS_BROKER_'+uuid.uuid4().hex
+        output = []
+        reset_done = False
+        # a wedged session is killed, which ends its output and releases the session lock
+        timer = threading.Timer(timeout, self.kill)
+        timer.daemon = True
+        timer.start()
+        try:
+            try:
+                self.process.stdin.write(SQLPLUS_BROKER_RESET+' PROMPT '+reset_sentinel+'\n'+sqlplus_script.rstrip('\n')+'\n PROMPT '+sentinel+'\n')
+                self.process.stdin.flush()
+            except (IOError, OSError):
+                return ['', False]
+            while True:
+                line = self.process.stdout.readline()
+                if line == '':
+                    return [''.join(output), False]
+                if not reset_done:
+                    # output of the reset (e.g. "not spooling currently") is not returned
+                    reset_done = line.rstrip().endswith(reset_sentinel)
+                    continue
+                if line.rstrip().endswith(sentinel):
+                    break
+                output.append(line)
+        finally:
+            timer.cancel()
+        self.last_used = time.time()
+        return [''.join(output), True]
+
+    def close(self):
+        self.closed = True
+        try:
+            self.process.stdin.write(' EXIT\n')
+            self.process.stdin.flush()
+        except (IOError, OSError):
+            pass
+        for attempt in range(50):
+            if self.process.poll() is not None:
+                return
+            time.sleep(0.1)
+        self.process.kill()
+        self.process.wait()
+
+class SqlplusBrokerServer(ThreadingMixIn, UnixStreamServer):
+
+    daemon_threads = True
+
+class SqlplusBrokerHandler(StreamRequestHandler):
+
+    def handle(self):
+        request = json.loads(self.rfile.readline().decode('utf-8'))
+        response = execute_sqlplus_broker_request(self.server, request)
+        self.wfile.write((json.dumps(response)+'\n').encode('utf-8'))
+
+def open_sqlplus_broker_session(server, request):
+
+    with server.sessions_lock:
+        server.last_activity = time.time()
+        session = server.sessions.get(request['key'])
+        if session is None:
+            if len(server.sessions) >= server.max_sessions:
+                for last_used, k in sorted([(s.last_used, k) for k, s in server.sessions.items()]):
+                    if server.sessions[k].lock.acquire(False):
+                        evicted_session = server.sessions.pop(k)
+                        evicted_session.close()
+                        evicted_session.lock.release()
+                        break
+                else:
+                    return 'Too many open sqlplus sessions ('+str(server.max_sessions)+').'
+            try:
+                session = SqlplusSession(request['args'], request['env'])
+            except OSError as e:
+                return 'Cannot start sqlplus ('+str(e)+').'
+            server.sessions[request['key']] = session
+        session.last_used = time.time()
+        return session
+
+def execute_sqlplus_broker_request(server, request):
+
+    for attempt in range(3):
+        session = open_sqlplus_broker_session(server, request)
+        if not isinstance(session, SqlplusSession):
+            return dict(output='', error=session)
+
+        with session.lock:
+            if session.closed:
+                continue
+            sqlplus_output, session_alive = session.execute(request['script'], request['timeout'])
+            if not session_alive:
+                with server.sessions_lock:
+                    if server.sessions.get(request['key']) is session:
+                        del server.sessions[request['key']]
+                session.close()
+
+        if session.timed_out:
+            return dict(output=sqlplus_output, error='sqlplus session has not finished within '+str(request['timeout'])+' seconds and has been killed by broker.', timed_out=True)
+        return dict(output=sqlplus_output, error='')
+
+    return dict(output='', error='sqlplus session has been closed by broker.')
+
+def close_idle_sqlplus_sessions(server, idle_timeout):
+
+    with server.sessions_lock:
+        for k, session in list(server.sessions.items()):
+            if time.time() - session.last_used > idle_timeout and session.lock.acquire(False):
+                server.sessions.pop(k).close()
+                session.lock.release()
+        return len(server.sessions) == 0 and time.time() - server.last_activity > idle_timeout
+
+def run_sqlplus_broker(session_broker_socket, session_idle_timeout, session_max_open):
+
+    if os.path.exists(session_broker_socket):
+        os.remove(session_broker_socket)
+
+    server = SqlplusBrokerServer(session_broker_socket, SqlplusBrokerHandler)
+    os.chmod(session_broker_socket, 0o600)
+    server.timeout = 5
+    server.sessions = {}
+    server.sessions_lock = threading.Lock()
+    server.max_sessions = session_max_open
+    server.last_activity = time.time()
+
+    try:
+        while not close_idle_sqlplus_sessions(server, session_idle_timeout):
+            server.handle_request()
+    finally:
+        server.server_close()
+        if os.path.exists(session_broker_socket):
+            os.remove(session_broker_socket)
+
+def start_sqlplus_broker(session_broker_socket, session_idle_timeout, session_max_open):
+
+    pid = os.fork()
+    if pid != 0:
+        os.waitpid(pid, 0)
+        return
+
+    os.setsid()
+    if os.fork() != 0:
+        os._exit(0)
+
+    os.chdir('/')
+    os.umask(0o077)
+    devnull = os.open(os.devnull, os.O_RDWR)
+    for fd in [0, 1, 2]:
+        os.dup2(devnull, fd)
+
+    try:
+        run_sqlplus_broker(session_broker_socket, session_idle_timeout, session_max_open)
+    finally:
+        os._exit(0)
+
+def sqlplus_broker_socket_dir_private(session_broker_socket):
+
+    # env and connect strings pass through the socket, so only its owner may reach it
+    socket_dir = os.path.dirname(os.path.abspath(session_broker_socket))
+    if not os.path.isdir(socket_dir):
+        try:
+            os.makedirs(socket_dir, 0o700)
+        except OSError:
+            pass
+    try:
+        socket_dir_stat = os.lstat(socket_dir)
+    except OSError:
+        return False
+    return os.path.isdir(socket_dir) and not os.path.islink(socket_dir) and socket_dir_stat.st_uid == os.getuid() and socket_dir_stat.st_mode & 0o077 == 0
+
+def request_sqlplus_broker(session_broker_socket, session_idle_timeout, session_max_open, request):
+
+    if not sqlplus_broker_socket_dir_private(session_broker_socket):
+        return dict(output='', error='Directory of sqlplus session broker socket '+session_broker_socket+' is not private (owner only, mode 0700).')
+
+    for attempt in range(50):
+        broker = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            broker.connect(session_broker_socket)
+        except socket.error:
+            broker.close()
+            if attempt == 0:
+                start_sqlplus_broker(session_broker_socket, session_idle_timeout, session_max_open)
+            time.sleep(0.1)
+            continue
+
+        # broker kills the session after request timeout, the margin covers its answer
+        broker.settimeout(request['timeout'] + 30)
+        try:
+            broker.sendall((json.dumps(request)+'\n').encode('utf-8'))
+            response = broker.makefile('rb').readline()
+        except socket.timeout:
+            return dict(output='', error='No response from sqlplus session broker within '+str(request['timeout'] + 30)+' seconds.', timed_out=True)
+        finally:
+            broker.close()
+
+        try:
+            return json.loads(response.decode('utf-8'))
+        except ValueError:
+            return dict(output='', error='No response from sqlplus session broker.')
+
+    return dict(output='', error='sqlplus session broker is not reachable on '+session_broker_socket+'.')
+
+def split_sqlplus_statement_results(queryResult, sql_statements, statement_marker, ignore_ORA_errors, ignore_error_codes):
+
+    re_elapsed = re.compile(r'^Elapsed: (?P<HOURS>\d+):(?P<MINUTES>\d+):(?P<SECONDS>\d+(\.\d+)?)$')
+
+    # end anchored like the broker sentinel: without silent_mode the marker follows the "SQL> " prompt
+    re_statement_marker = re.compile(re.escape(statement_marker)+r'(?P<INDEX>\d+|END)$')
+
+    statement_results = []
+    statement_result = None
+    for line in queryResult.split('\n'):
+        re_statement_marker_match = re_statement_marker.search(line.rstrip())
+        if re_statement_marker_match:
+            statement_index = re_statement_marker_match.group('INDEX')
+            if statement_index == 'END':
+                statement_result = None
+            else:
+                statement_result = dict(statement=sql_statements[int(statement_index)], rows=[], ora_errors=[], elapsed=0.0)
+                statement_results.append(statement_result)
+            continue
+        if statement_result is None or line.strip() in ('', 'SQL>'):
+            continue
+        re_elapsed_match = re_elapsed.search(line.strip())
+        if re_elapsed_match:
+            statement_result['elapsed'] += int(re_elapsed_match.group('HOURS'))*3600 + int(re_elapsed_match.group('MINUTES'))*60 + float(re_elapsed_match.group('SECONDS'))
+            continue
+        statement_result['rows'].append(line)
+
+    for statement_result in statement_results:
+        if ignore_ORA_errors == False:
+            statement_result['ora_errors'] = [error['code'] for error in classify_oracle_errors(scan_oracle_errors(statement_result['rows']), ('ORA',), ignore_error_codes)]
+
+    return statement_results
+
+def split_sqlplus_csv_markup_line(line):
+
+    fields = []
+    value = ''
+    quoted = False
+    in_quotes = False
+    position = 0
+    while position < len(line):
+        character = line[position]
+        if in_quotes:
+            if character == '"' and line[position+1:position+2] == '"':
+                value += '"'
+                position += 1
+            elif character == '"':
+                in_quotes = False
+            else:
+                value += character
+        elif character == '"':
+            in_quotes = True
+            quoted = True
+        elif character == ',':
+            fields.append((value, quoted))
+            value = ''
+            quoted = False
+        else:
+            value += character
+        position += 1
+
+    if in_quotes:
+        return None
+    fields.append((value, quoted))
+    return fields
+
+def convert_sqlplus_value(value, quoted):
+
+    re_number = re.compile(r'^-?(\d+\.?\d*|\.\d+)(E[+-]?\d+)?$')
+
+    if quoted:
+        return value
+    value = value.strip()
+    if value == '':
+        return None
+    # without CSV markup (11g) numbers and strings cannot be told apart, '0012' stays a string
+    if quoted is None:
+        return value
+    if re_number.search(value):
+        if re.search(r'^-?\d+$', value):
+            return int(value)
+        return float(value)
+    return value
+
+def format_sqlplus_csv_value(value):
+
+    if value is None:
+        return ''
+    value = str(value)
+    if ',' in value or '"' in value or '\n' in value:
+        return '"'+value.replace('"', '""')+'"'
+    return value
+
+re_sqlplus_error_at_line = re.compile(r'^ERROR( at line \d+)?:$')
+re_sqlplus_error_marker = re.compile(r'^\s*\*\s*$')
+re_sqlplus_unknown_set_option = re.compile(r'^SP2-(0735|0158):')
+re_sqlplus_message = re.compile(r'^(ORA|SP2|TNS)-\d+')
+
+def new_sqlplus_markup_state(column_separator, max_rows):
+
+    return dict(
+        column_separator=column_separator,
+        max_rows=max_rows,
+        markup_csv=True,
+        columns=None,
+        rows=[],
+        messages=[],
+        truncated=False,
+        pending='',
+        window=deque(),
+    )
 
+def parse_sqlplus_markup_line(markup_state, line):
 
-def find_oracle_home(oracle_sid):
-
-    re_db_home = re.compile(r'^('+oracle_sid+'):(?P<HOME>(/|\w+|\.)+):(Y|N)')
-
-    with open('/etc/oratab', 'r') as f:
-        for line in f:
-            line = line.strip()
-            re_db_home_match = re_db_home.search(line)
-            if re_db_home_match:
-                db_home = re_db_home_match.group('HOME')
-                #print(db_home)
-
-                return db_home
-
-def execute_sqlplus(oracle_home, oracle_sid, oracle_unqname, sql_statement, silent_mode, spool_file, output_as_array, output_set_heading_off, output_set_feedback_off, ignore_ORA_errors, username, password, as_sysdba, pdb_service, no_execution, set_container, restricted_session, hidden_oracle_script, tns_admin):
+    # lines are parsed with a delay of two, because sqlplus echoes the failing statement line
+    # and a * marker before "ERROR at line N:" and these three lines are not data
+    line = line.rstrip('\r\n')
+    window = markup_state['window']
+    if re_sqlplus_error_at_line.search(line.strip()):
+        if len(window) >= 2 and re_sqlplus_error_marker.search(window[-1][0]):
+            window[-2][1] = window[-1][1] = True
+        window.append([line, True])
+    else:
+        window.append([line, False])
+    while len(window) > 2:
+        parse_sqlplus_markup_window_line(markup_state, window.popleft())
+
+def parse_sqlplus_markup_window_line(markup_state, window_line):
+
+    line, error_echo = window_line
+    if not error_echo:
+        parse_sqlplus_markup_data_line(markup_state, line)
+
+def finish_sqlplus_markup_state(markup_state):
+
+    while markup_state['window']:
+        parse_sqlplus_markup_window_line(markup_state, markup_state['window'].popleft())
+
+    return dict(columns=markup_state['columns'] or [], rows=markup_state['rows'], messages=markup_state['messages'], truncated=markup_state['truncated'])
+
+def parse_sqlplus_markup_data_line(markup_state, line):
+
+    line = markup_state['pending'] + line
+    markup_state['pending'] = ''
+    if line.strip() == '':
+        return
+    if re_sqlplus_unknown_set_option.search(line):
+        if markup_state['columns'] is None:
+            markup_state['markup_csv'] = False
+        return
+    if re_sqlplus_message.search(line):
+        markup_state['messages'].append(line)
+        return
+    if markup_state['markup_csv']:
+        fields = split_sqlplus_csv_markup_line(line)
+        if fields is None:
+            markup_state['pending'] = line + '\n'
+            return
+    else:
+        fields = [(value, None) for value in line.split(markup_state['column_separator'])]
+    if markup_state['columns'] is None:
+        markup_state['columns'] = [value.strip() for value, quoted in fields]
+        return
+    if [value.strip() for value, quoted in fields] == markup_state['columns']:
+        return
+    if markup_state['max_rows'] is not None and len(markup_state['rows']) >= markup_state['max_rows']:
+        markup_state['truncated'] = True
+        return
+    markup_state['rows'].append([convert_sqlplus_value(value, quoted) for value, quoted in fields])
+
+def parse_sqlplus_markup_lines(lines, column_separator, max_rows):
+
+    markup_state = new_sqlplus_markup_state(column_separator, max_rows)
+    for line in lines:
+        parse_sqlplus_markup_line(markup_state, line)
+    return finish_sqlplus_markup_state(markup_state)
+
+def format_sqlplus_markup_rows(markup_result, result_format):
+
+    if result_format == 'json':
+        return [dict(zip(markup_result['columns'], row)) for row in markup_result['rows']]
+    if result_format == 'csv':
+        return [','.join([format_sqlplus_csv_value(value) for value in row]) for row in markup_result['rows']]
+    return markup_result['rows']
+
+def execute_sqlplus(oracle_home, oracle_sid, oracle_unqname, sql_statement, sql_statements, silent_mode, spool_file, output_as_array, output_set_heading_off, output_set_feedback_off, ignore_ORA_errors, username, password, as_sysdba, pdb_service, no_execution, set_container, restricted_session, hidden_oracle_script, tns_admin, session_broker, session_broker_socket, session_idle_timeout, session_max_open, session_timeout, timeout, result_format, max_rows, ignore_error_codes):
 
     if oracle_home is None:
        oracle_home = find_oracle_home(oracle_sid)
@@ -164,18 +658,10 @@ def execute_sqlplus(oracle_home, oracle_sid, oracle_unqname, sql_statement, sile
     if as_sysdba is True:    
         args.append(' as sysdba')
     
-    my_env = os.environ.copy()
-    my_env["PATH"] = my_env["PATH"] + oracle_home+'/bin'
-    my_env["ORACLE_HOME"] = oracle_home
-    my_env["ORACLE_SID"] = oracle_sid
-
-    if tns_admin is not None:
-        my_env["TNS_ADMIN"] = tns_admin
+    if oracle_unqname is None:
+        oracle_unqname = oracle_sid
 
-    if oracle_unqname is not None:
-        my_env["ORACLE_UNQNAME"] = oracle_unqname
-    else:    
-        my_env["ORACLE_UNQNAME"] = oracle_sid
+    my_env = oracle_env(oracle_home, oracle_sid, ORACLE_UNQNAME=oracle_unqname, TNS_ADMIN=tns_admin)
 
     #if oracle_unqname in not None:
     #    my_env["ORACLE_UNQNAME"] = oracle_unqname
@@ -183,54 +669,115 @@ def execute_sqlplus(oracle_home, oracle_sid, oracle_unqname, sql_statement, sile
     #    my_env["my_env["ORACLE_UNQNAME"] =     
 
     if no_execution is True:
-        return ['','','',' '.join(args)]
+        return ['','','',' '.join(args),[],None,[],None]
     else:    
-        p = Popen(args, stdout=PIPE, stderr=PIPE, env=my_env, stdin=PIPE)   
+        sqlplus_script = ''
 
         if set_container == True:
-            p.stdin.write(b' ALTER SESSION SET CONTAINER = '+pdb_service+';\n')
+            sqlplus_script += ' ALTER SESSION SET CONTAINER = '+pdb_service+';\n'
 
         if hidden_oracle_script == True:
-            p.stdin.write(b' alter session set "_oracle_script"=TRUE;\n')    
+            sqlplus_script += ' alter session set "_oracle_script"=TRUE;\n'
  
         if restricted_session == True:
-            p.stdin.write(b' ALTER SYSTEM ENABLE RESTRICTED SESSION;\n')
+            sqlplus_script += ' ALTER SYSTEM ENABLE RESTRICTED SESSION;\n'
 
         if output_set_heading_off == True:
-            p.stdin.write(b' SET HEADING OFF\n')
+            sqlplus_script += ' SET HEADING OFF\n'
 
         if output_set_feedback_off == True:
-            p.stdin.write(b' SET FEEDBACK OFF;\n')
-
-        p.stdin.write(b' SET PAGES 999;\n')  
-        p.stdin.write(b' SET LINESIZE 1000;\n')  
-        p.stdin.write(b' SET TAB OFF;\n')  
+            sqlplus_script += ' SET FEEDBACK OFF;\n'
+
+        sqlplus_script += ' SET PAGES 999;\n'
+        sqlplus_script += ' SET LINESIZE 1000;\n'
+        sqlplus_script += ' SET TAB OFF;\n'
+
+        if sql_statements is not None:
+            sqlplus_script += ' SET TIMING ON\n'
+
+        column_separator = '|~ADMT~|'
+        if result_format != 'text':
+            sqlplus_script += ' SET HEADING ON\n'
+            sqlplus_script += ' SET FEEDBACK OFF\n'
+            sqlplus_script += ' SET UNDERLINE OFF\n'
+            sqlplus_script += ' SET PAGESIZE 50000\n'
+            sqlplus_script += ' SET NEWPAGE NONE\n'
+            sqlplus_script += ' SET TRIMOUT ON\n'
+            sqlplus_script += " SET COLSEP '"+column_separator+"'\n"
+            sqlplus_script += ' SET MARKUP CSV ON QUOTE ON\n'
     
         if spool_file is not None:
-            p.stdin.write(b' SPOOL '+spool_file+'\n')
+            sqlplus_script += ' SPOOL '+spool_file+'\n'
+
+        if sql_statements is not None:
+            statement_marker = 'ADMT_SQLPLUS_STATEMENT_'+uuid.uuid4().hex+'_'
+            for statement_index, statement in enumerate(sql_statements):
+                sqlplus_script += ' PROMPT '+statement_marker+str(statement_index)+'\n'
+                sqlplus_script += statement.rstrip('\n')+'\n'
+            sqlplus_script += ' PROMPT '+statement_marker+'END\n'
+        else:
+            sqlplus_script += sql_statement
 
-        p.stdin.write(sql_statement.encode())
+        if result_format != 'text' and session_broker == True:
+            sqlplus_script += '\n SET MARKUP CSV OFF\n'
 
         if spool_file is not None:
-            p.stdin.write(b' SPOOL OFF\n')
-    
-        queryResult, stderrResult = p.communicate()
+            sqlplus_script += '\n SPOOL OFF\n'
+
+        broker_response = None
+        if session_broker == True:
+            if session_broker_socket is None:
+                session_broker_socket = '/tmp/.admt_sqlplus_broker_'+str(os.getuid())+'/broker.sock'
+            session_key = hashlib.sha256(json.dumps([args, oracle_home, oracle_sid, my_env.get('ORACLE_UNQNAME'), my_env.get('TNS_ADMIN'), pdb_service, set_container, hidden_oracle_script]).encode('utf-8')).hexdigest()
+            broker_response = request_sqlplus_broker(session_broker_socket, session_idle_timeout, session_max_open, dict(key=session_key, args=args, env=my_env, script=sqlplus_script, timeout=session_timeout))
+
+        execution_error = None
+        markup_result = None
+        sqlplus_result = None
+        if broker_response is not None and broker_response.get('timed_out'):
+            # the script may have run partly, it is not repeated in a new sqlplus process
+            queryResult = broker_response['output']
+            stderrResult = broker_response['error']
+            execution_error = broker_response['error']
+        elif broker_response is not None and broker_response['error'] == '':
+            queryResult = broker_response['output']
+            stderrResult = ''
+            if result_format != 'text':
+                markup_result = parse_sqlplus_markup_lines(queryResult.split('\n'), column_separator, max_rows)
+        elif result_format != 'text':
+            # rows are parsed while sqlplus writes them, stdout is not kept (nor cut by max_output)
+            markup_state = new_sqlplus_markup_state(column_separator, max_rows)
+            sqlplus_result = run_oracle_command(args, my_env, sqlplus_script, timeout=timeout, line_handler=lambda line: parse_sqlplus_markup_line(markup_state, line), capture_stdout=False)
+            stderrResult = sqlplus_result.stderr
+            markup_result = finish_sqlplus_markup_state(markup_state)
+            if sqlplus_result.truncated or sqlplus_result.timed_out or sqlplus_result.line_handler_errors:
+                markup_result['truncated'] = True
+        else:
+            sqlplus_result = run_oracle_command(args, my_env, sqlplus_script, timeout=timeout)
+            queryResult, stderrResult = sqlplus_result.stdout, sqlplus_result.stderr
 
-        if queryResult.count('ORA-') > 0:
-        
-            if ignore_ORA_errors == False:            
-                oraErrors = re.findall('ORA-(.+?):', queryResult) 
-            if ignore_ORA_errors == True:            
-                oraErrors = ''          
-        
-        if queryResult.count('ORA-') == 0:
+        if sqlplus_result is not None and sqlplus_result.timed_out:
+            execution_error = 'sqlplus has not finished within '+str(timeout)+' seconds and has been killed.'
+
+        if markup_result is not None:
+            queryResult = '\n'.join(markup_result['messages'])
+            markup_result['rows'] = format_sqlplus_markup_rows(markup_result, result_format)
+
+        statement_results = []
+        if sql_statements is not None:
+            statement_results = split_sqlplus_statement_results(queryResult, sql_statements, statement_marker, ignore_ORA_errors, ignore_error_codes)
+            queryResult = '\n'.join(['\n'.join(statement_result['rows']) for statement_result in statement_results])
+
+        sqlplusErrors = classify_oracle_errors(scan_oracle_errors(queryResult.split('\n')), ('ORA',), ignore_error_codes)
+        oraErrors = [error['code'] for error in sqlplusErrors]
+        if ignore_ORA_errors == True or not oraErrors:
             oraErrors = ''
     
         if output_as_array == True:
             queryResult = queryResult.split('\n')
             queryResult[:] = [item for item in queryResult if item != '']
 
-        return [queryResult,oraErrors,stderrResult,' '.join(args)]
+        return [queryResult,oraErrors,stderrResult,' '.join(args),statement_results,markup_result,sqlplusErrors,execution_error]
 
 def run_module():
     
@@ -238,7 +785,8 @@ def run_module():
         oracle_home=dict(type='str', required=False),
         oracle_sid=dict(type='str', required=True),
         oracle_unqname=dict(type='str', required=False),
-        sql_statement=dict(type='str', required=True),
+        sql_statement=dict(type='str', required=False),
+        sql_statements=dict(type='list', elements='str', required=False),
         silent_mode=dict(type='bool', required=False, default=True),
         spool_file=dict(type='str', required=False),
         output_as_array=dict(type='bool', required=False, default=True),
@@ -253,28 +801,48 @@ def run_module():
         set_container=dict(type='bool', required=False, default=False),
         restricted_session=dict(type='bool', required=False, default=False),
         hidden_oracle_script=dict(type='bool', required=False, default=False),
-        tns_admin=dict(type='str', required=False, default=False) 
+        tns_admin=dict(type='str', required=False, default=False),
+        session_broker=dict(type='bool', required=False, default=False),
+        session_broker_socket=dict(type='str', required=False),
+        session_idle_timeout=dict(type='int', required=False, default=600),
+        session_max_open=dict(type='int', required=False, default=4),
+        session_timeout=dict(type='int', required=False, default=3600),
+        timeout=dict(type='int', required=False),
+        result_format=dict(type='str', required=False, default='text', choices=['text', 'rows', 'json', 'csv']),
+        max_rows=dict(type='int', required=False),
+        ignore_error_codes=dict(type='list', required=False, default=[])
     )
 
     result = dict(
         changed=False,
         sqlplus_message='',
-        sqlplus_command=''
+        sqlplus_command='',
+        sqlplus_results='',
+        sqlplus_errors='',
+        sqlplus_columns='',
+        sqlplus_rows='',
+        sqlplus_rows_truncated=False
     )
 
     module = AnsibleModule(
         argument_spec=module_args,
+        required_one_of=[['sql_statement', 'sql_statements']],
+        mutually_exclusive=[['sql_statement', 'sql_statements']],
         supports_check_mode=True
     )
 
     if module.check_mode:
         return result
 
+    if module.params['sql_statements'] is not None and module.params['result_format'] != 'text':
+        module.fail_json(msg='result_format different than text is supported only with sql_statement!', **result)
+
     results_of_execute_sqlplus = execute_sqlplus(
         module.params['oracle_home'],
         module.params['oracle_sid'],
         module.params['oracle_unqname'],
         module.params['sql_statement'],
+        module.params['sql_statements'],
         module.params['silent_mode'],
         module.params['spool_file'],
         module.params['output_as_array'],
@@ -289,14 +857,33 @@ def run_module():
         module.params['set_container'],
         module.params['restricted_session'],
         module.params['hidden_oracle_script'],
-        module.params['tns_admin'])
+        module.params['tns_admin'],
+        module.params['session_broker'],
+        module.params['session_broker_socket'],
+        module.params['session_idle_timeout'],
+        module.params['session_max_open'],
+        module.params['session_timeout'],
+        module.params['timeout'],
+        module.params['result_format'],
+        module.params['max_rows'],
+        module.params['ignore_error_codes'])
 
     
-    result['sqlplus_message'] = results_of_execute_sqlplus
+    result['sqlplus_message'] = results_of_execute_sqlplus[:4]
     result['sqlplus_command'] = results_of_execute_sqlplus[3]
+    result['sqlplus_results'] = results_of_execute_sqlplus[4]
+    result['sqlplus_errors'] = results_of_execute_sqlplus[6]
+
+    if results_of_execute_sqlplus[5] is not None:
+        result['sqlplus_columns'] = results_of_execute_sqlplus[5]['columns']
+        result['sqlplus_rows'] = results_of_execute_sqlplus[5]['rows']
+        result['sqlplus_rows_truncated'] = results_of_execute_sqlplus[5]['truncated']
  
     #module.log(msg=str(result['sqlplus_message']))
 
+    if results_of_execute_sqlplus[7] is not None:
+        module.fail_json(msg='SQLPLUS module has failed! '+results_of_execute_sqlplus[7], **result)
+
     if results_of_execute_sqlplus[1] != '':
         module.fail_json(msg='SQLPLUS module has failed (ORA-XXXX errors listed)!', **result)    
 
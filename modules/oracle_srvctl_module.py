@@ -66,6 +66,10 @@ options:
         description:
             - When set to True module will ignore ORA-XXXX errors 
         required: false
+    ignore_error_codes:
+        description:
+            - List of error codes which do not fail the module (for example ORA-01109 or PRCD-1120, a bare facility like PRKO ignores all its codes). Errors are still listed in srvctl_output.
+        required: false
     os_env:
         description:
             - setenv options is used
@@ -74,6 +78,10 @@ options:
         description:
             - Oracle 11g syntax
         required: false   
+    timeout:
+        description:
+            - Number of seconds after which srvctl process is killed and module fails (lack of parameter means no limit).
+        required: false
                 
 '''
 
@@ -92,18 +100,21 @@ RETURN = '''
 srvctl_message:
     description: result of SRVCTL execution.
     type: str
+srvctl_errors:
+    description: errors found in the output (facility, code, message, line_no), without the ignored ones.
+    type: list
 changed:
     description: will be used for the future all removed.
     type: bool   
 '''
 
 from ansible.module_utils.basic import AnsibleModule
-from subprocess import Popen, PIPE
+from ansible.module_utils.oracle_exec import oracle_env, run_oracle_command, classify_oracle_errors
 from tempfile import mkstemp, TemporaryFile
 from datetime import datetime, timedelta
 import os, sys, re
 
-def execute_srvctl(oracle_home, add_oh_to_command, oracle_unqname, oracle_database, oracle_instance, oracle_node, srvctl_command, no_execution, no_prompt, force, ignore_errors, os_env, syntax_11g, detail):
+def execute_srvctl(oracle_home, add_oh_to_command, oracle_unqname, oracle_database, oracle_instance, oracle_node, srvctl_command, no_execution, no_prompt, force, ignore_errors, os_env, syntax_11g, detail, ignore_error_codes, timeout):
 
     args = [os.path.join(oracle_home, 'bin', 'srvctl')]
     
@@ -173,15 +184,7 @@ def execute_srvctl(oracle_home, add_oh_to_command, oracle_unqname, oracle_databa
     if detail:
         args.append('-detail')        
             
-    my_env = os.environ.copy()
-    my_env["PATH"] = my_env["PATH"] + ':'+oracle_home+'/bin'
-    my_env["ORACLE_HOME"] = oracle_home
-    if oracle_database is not None:
-        my_env["ORACLE_SID"] = oracle_database
-    my_env["LD_LIBRARY_PATH="] = oracle_home+'/lib'
-    
-    if oracle_node is not None:
-        my_env["HOSTNAME"] = oracle_node
+    my_env = oracle_env(oracle_home, oracle_database, LD_LIBRARY_PATH=oracle_home+'/lib', HOSTNAME=oracle_node)
 
     #if oracle_unqname is not None:
     #    my_env["ORACLE_UNQNAME"] = oracle_unqname
@@ -189,40 +192,24 @@ def execute_srvctl(oracle_home, add_oh_to_command, oracle_unqname, oracle_databa
     #    my_env["ORACLE_UNQNAME"] = oracle_database
  
     if no_execution is True:
-        return ['','','',' '.join(args),'']
+        return ['','','',' '.join(args),'',[],None]
     else:    
-        p = Popen(args, stdout=PIPE, stderr=PIPE, env=my_env, stdin=PIPE)    
-        
-        srvctlResult, stderrResult = p.communicate()
+        srvctl_result = run_oracle_command(args, my_env, timeout=timeout)
+        srvctlResult, stderrResult = srvctl_result.stdout, srvctl_result.stderr
 
-        if srvctlResult.count('PRKO-') > 0:
-            if ignore_errors == False: 
-                oraErrors = re.findall('PRKO-(.+?):', srvctlResult) 
-            else:
-                oraErrors = '' 
-        else:
-            oraErrors = ''         
-
-        if srvctlResult.count('PRCD-') > 0:
-            if ignore_errors == False: 
-                oraErrors = re.findall('PRCD-(.+?):', srvctlResult) 
-            else:
-                oraErrors = ''
-        else:
-            oraErrors = ''            
-
-        if srvctlResult.count('PRCT-') > 0:
-            if ignore_errors == False: 
-                oraErrors = re.findall('PRCT-(.+?):', srvctlResult) 
-            else:
-                oraErrors = ''
-        else:
-            oraErrors = ''              
+        srvctlErrors = classify_oracle_errors(srvctl_result.errors, ('PRKO', 'PRCD', 'PRCT'), ignore_error_codes)
+        oraErrors = [error['facility']+'-'+error['code'] for error in srvctlErrors]
+        if ignore_errors == True or not oraErrors:
+            oraErrors = ''
 
         srvctlResult = srvctlResult.split('\n')
         srvctlResult[:] = [item for item in srvctlResult if item != '']
 
-        return [srvctlResult,oraErrors,stderrResult,' '.join(args), my_env]
+        srvctlTimeout = None
+        if srvctl_result.timed_out:
+            srvctlTimeout = 'srvctl has not finished within '+str(timeout)+' seconds and has been killed.'
+
+        return [srvctlResult,oraErrors,stderrResult,' '.join(args), my_env, srvctlErrors, srvctlTimeout]
 
 def run_module():
     
@@ -241,6 +228,8 @@ def run_module():
         os_env=dict(type='str', required=False),
         syntax_11g=dict(type='bool', required=False,default=False),
         detail=dict(type='bool', required=False,default=False),
+        ignore_error_codes=dict(type='list', required=False, default=[]),
+        timeout=dict(type='int', required=False)
     )
 
     result = dict(
@@ -273,14 +262,20 @@ def run_module():
         module.params['ignore_errors'],
         module.params['os_env'],
         module.params['syntax_11g'],
-        module.params['detail']
+        module.params['detail'],
+        module.params['ignore_error_codes'],
+        module.params['timeout']
         )
     
     result['srvctl_message'] = results_of_execute_srvctl[1]
     result['srvctl_output'] = results_of_execute_srvctl[0]
     result['srvctl_command'] = results_of_execute_srvctl[3]
     result['srvctl_os_env'] = results_of_execute_srvctl[4]
+    result['srvctl_errors'] = results_of_execute_srvctl[5]
+
 
+    if results_of_execute_srvctl[6] is not None:
+        module.fail_json(msg='SRVCTL module has failed! '+results_of_execute_srvctl[6], **result)
 
     if results_of_execute_srvctl[1] != '':
         module.fail_json(msg='SRVCTL module has failed (PRKO/PRCD/PRCT-XXXX errors listed)!', **result)    
@@ -0,0 +1,408 @@
+#!/usr/bin/python
+#
+#Copyright (c) 2020, Oracle and/or its affiliates.
+#The Universal Permissive License (UPL), Version 1.0
+#
+
+ANSIBLE_METADATA = {
+    'metadata_version': '1.0',
+    'status': ['preview'],
+    'supported_by': 'community'
+}
+
+DOCUMENTATION = '''
+---
+module: oracle_validation_snapshot_module
+
+short_description: This is simple validation snapshot module for remote execution
+
+version_added: "1.0"
+
+description:
+    - "This module will read instance, database, PDBs, tempfiles, logfiles, datafiles, TDE wallet (also of every PDB) and diag trace location in one sqlplus session"
+    - "Alert log is checked for alert_log_patterns in one memory-mapped pass and the validation report is written on the managed host with one write"
+
+options:
+    oracle_home:
+        description:
+            - This is $ORACLE_HOME directory where sqlplus binary resides (lack of parameter means it will be derived from /etc/oratab).
+        required: false
+    oracle_sid:
+        description:
+            - This is $ORACLE_SID which will be used to access proper database
+        required: true
+    oracle_unqname:
+        description:
+            - This is $ORACLE_UNQNAME which will be used to find TDE wallet (if not provided oracle_sid will be used)
+        required: false
+    tns_admin:
+        description:
+            - This is $TNS_ADMIN which will be used to find TDE wallet location in sqlnet.ora
+        required: false
+    alert_log_patterns:
+        description:
+            - Lines of alert_<oracle_sid>.log containing these patterns (case insensitive) are reported.
+        required: false
+    report_file:
+        description:
+            - Validation report will be written to this file.
+        required: false
+    report_header:
+        description:
+            - Lines written at the beginning of the report (banner, database unique name, hostname, ...).
+        required: false
+    srvctl_command:
+        description:
+            - SRVCTL command which has been used to check status of the database (TEST_1 of the report).
+        required: false
+    srvctl_output:
+        description:
+            - Output of srvctl_command (TEST_1 of the report).
+        required: false
+    timeout:
+        description:
+            - Number of seconds after which the sqlplus session is killed and module fails (for example when the instance hangs).
+        required: false
+
+'''
+
+EXAMPLES = '''
+# Validate FOGGYDB after the migration and write the report
+- name: Validation snapshot
+  oracle_validation_snapshot_module:
+    oracle_home: '/u01/app/oracle/product/12.1.0.2/dbhome_1'
+    oracle_sid: 'FOGGYDB'
+    oracle_unqname: 'FOGGYDB_fra1bc'
+    report_file: '/tmp/report_after_setup_source_db_FOGGYDB.log'
+    report_header:
+      - 'Database Unique Name: FOGGYDB_fra1bc'
+    srvctl_command: "{{ srvctloutput.srvctl_command }}"
+    srvctl_output: "{{ srvctloutput.srvctl_output }}"
+
+'''
+
+RETURN = '''
+validation_snapshot:
+    description: instance, database, pdbs, tempfiles, logfiles, datafiles, tde, pdb_tde, diag_trace and alert_log (matches per pattern) as records.
+    type: dict
+cdb_database:
+    description: YES for multitenant database, otherwise NO.
+    type: str
+report_file:
+    description: written validation report.
+    type: str
+changed:
+    description: will be used for the future all removed.
+    type: bool
+'''
+
+from ansible.module_utils.basic import AnsibleModule
+from ansible.module_utils.oracle_exec import find_oracle_home, oracle_env, scan_oracle_errors
+from ansible.module_utils.oracle_alert_log import scan_alert_log_file
+from subprocess import Popen, PIPE, STDOUT
+import os, sys, re, signal, threading, uuid
+
+def query_validation_section(sqlplus_process, sql):
+
+    sentinel = 'ADMT_VALIDATION_'+uuid.uuid4().hex
+    sqlplus_process.stdin.write(sql+" PROMPT "+sentinel+"\n")
+    sqlplus_process.stdin.flush()
+
+    lines = []
+    while True:
+        line = sqlplus_process.stdout.readline()
+        if line == '':
+            raise IOError('sqlplus session used for validation snapshot has ended.')
+        line = line.rstrip('\n')
+        if line.strip() == sentinel:
+            return lines
+        lines.append(line)
+
+def validation_rows(lines, tag, fields_number):
+
+    rows = []
+    for line in lines:
+        if line.startswith(tag+'|'):
+            # the last field is a file name or path, so it keeps any '|' it contains
+            fields = line[len(tag) + 1:].split('|', fields_number - 1)
+            if len(fields) == fields_number:
+                rows.append(fields)
+    return rows
+
+def validation_errors(lines):
+
+    return ['%s-%s: %s' % (facility, code, message) for facility, code, message, line_no in scan_oracle_errors(lines, ('ORA',))]
+
+def scan_alert_log(alert_log_file, alert_log_patterns):
+
+    matches = dict((pattern, []) for pattern in alert_log_patterns)
+    for incident in scan_alert_log_file(alert_log_file, alert_log_patterns)[0]:
+        for pattern in incident['patterns']:
+            matches[pattern].append(incident['message'])
+    return matches
+
+def take_validation_snapshot(oracle_home, oracle_sid, oracle_unqname, tns_admin, alert_log_patterns, timeout):
+
+    if oracle_home is None:
+        oracle_home = find_oracle_home(oracle_sid)
+
+    if oracle_unqname is None:
+        oracle_unqname = oracle_sid
+
+    my_env = oracle_env(oracle_home, oracle_sid, ORACLE_UNQNAME=oracle_unqname, TNS_ADMIN=tns_admin)
+
+    args = [os.path.join(oracle_home, 'bin', 'sqlplus'), '-S', '/', 'as sysdba']
+
+    snapshot = dict(instance={}, database={}, pdbs=[], tempfiles=[], logfiles=[], datafiles=[], tde=[], pdb_tde=[], diag_trace='', alert_log={}, errors=[])
+
+    sqlplus_process = Popen(args, stdout=PIPE, stderr=STDOUT, env=my_env, stdin=PIPE, universal_newlines=True, bufsize=1, preexec_fn=os.setsid)
+
+    # readline waits for the sentinel without a deadline, so a hung session is killed by the watchdog
+    timed_out = threading.Event()
+    def kill_sqlplus():
+        timed_out.set()
+        try:
+            os.killpg(sqlplus_process.pid, signal.SIGKILL)
+        except OSError:
+            pass
+    watchdog = threading.Timer(timeout, kill_sqlplus)
+    watchdog.daemon = True
+    watchdog.start()
+
+    try:
+        sqlplus_process.stdin.write(' SET HEADING OFF\n SET FEEDBACK OFF\n SET PAGES 0\n SET LINESIZE 32767\n SET TRIMOUT ON\n SET TAB OFF\n')
+
+        lines = query_validation_section(sqlplus_process,
+            " select 'INSTANCE|'||instance_name||'|'||host_name||'|'||version||'|'||status from v$instance;\n"
+            " select 'DATABASE|'||name||'|'||db_unique_name||'|'||open_mode||'|'||database_role||'|'||log_mode from v$database;\n"
+            " select 'DIAG_TRACE|'||value from v$diag_info where name = 'Diag Trace';\n")
+        snapshot['errors'].extend(validation_errors(lines))
+        for instance_name, host_name, version, status in validation_rows(lines, 'INSTANCE', 4):
+            snapshot['instance'] = dict(instance_name=instance_name, host_name=host_name, version=version, status=status)
+        for name, db_unique_name, open_mode, database_role, log_mode in validation_rows(lines, 'DATABASE', 5):
+            snapshot['database'] = dict(name=name, db_unique_name=db_unique_name, open_mode=open_mode, database_role=database_role, log_mode=log_mode, cdb='NO')
+        for diag_trace, in validation_rows(lines, 'DIAG_TRACE', 1):
+            snapshot['diag_trace'] = diag_trace
+
+        if not snapshot['instance'] or not snapshot['database']:
+            return [snapshot, ' '.join(args)]
+
+        # CDB column, CON_ID columns and V$PDBS exist from 12c
+        try:
+            multitenant_version = int(snapshot['instance']['version'].split('.')[0]) >= 12
+        except ValueError:
+            multitenant_version = False
+
+        if multitenant_version:
+            lines = query_validation_section(sqlplus_process,
+                " select 'CDB|'||cdb from v$database;\n"
+                " select 'PDB|'||con_id||'|'||open_mode||'|'||restricted||'|'||name from v$pdbs order by con_id;\n")
+            snapshot['errors'].extend(validation_errors(lines))
+            for cdb, in validation_rows(lines, 'CDB', 1):
+                snapshot['database']['cdb'] = cdb
+            for con_id, open_mode, restricted, name in validation_rows(lines, 'PDB', 4):
+                snapshot['pdbs'].append(dict(con_id=int(con_id), name=name, open_mode=open_mode, restricted=restricted))
+
+        cdb = snapshot['database']['cdb'] == 'YES'
+        con_id = "con_id" if cdb else "0"
+
+        lines = query_validation_section(sqlplus_process,
+            " select 'TEMPFILE|'||"+con_id+"||'|'||status||'|'||enabled||'|'||rtrim(name) from v$tempfile order by "+con_id+", file#;\n"
+            " select 'LOGFILE|'||a.group#||'|'||a.thread#||'|'||b.status||'|'||rtrim(b.member) from v$log a, v$logfile b where a.group# = b.group# order by a.group#;\n"
+            " select 'DATAFILE|'||"+con_id+"||'|'||status||'|'||enabled||'|'||bytes||'|'||rtrim(name) from v$datafile order by "+con_id+", file#;\n"
+            " select 'TDE|'||wrl_type||'|'||status||'|'||rtrim(wrl_parameter) from v$encryption_wallet;\n")
+        snapshot['errors'].extend(validation_errors(lines))
+        for tempfile_con_id, status, enabled, name in validation_rows(lines, 'TEMPFILE', 4):
+            snapshot['tempfiles'].append(dict(con_id=int(tempfile_con_id) if cdb else None, status=status, enabled=enabled, name=name))
+        for group, thread, status, member in validation_rows(lines, 'LOGFILE', 4):
+            snapshot['logfiles'].append(dict(group=int(group), thread=int(thread), status=status, member=member))
+        for datafile_con_id, status, enabled, bytes, name in validation_rows(lines, 'DATAFILE', 5):
+            snapshot['datafiles'].append(dict(con_id=int(datafile_con_id) if cdb else None, status=status, enabled=enabled, bytes=int(bytes), name=name))
+        for wrl_type, status, wrl_parameter in validation_rows(lines, 'TDE', 3):
+            snapshot['tde'].append(dict(wrl_type=wrl_type, status=status, wrl_parameter=wrl_parameter))
+
+        # TDE wallet of every PDB is read in its container, in the same session
+        for pdb in snapshot['pdbs']:
+            if re.match(r'^PDB.SEED$', pdb['name']):
+                continue
+            # the wallet is not read when the session could not switch, otherwise root rows would be reported
+            pdb_errors = validation_errors(query_validation_section(sqlplus_process, " ALTER SESSION SET CONTAINER = \""+pdb['name']+"\";\n"))
+            pdb_tde = []
+            if not pdb_errors:
+                lines = query_validation_section(sqlplus_process,
+                    " select 'PDB_TDE|'||wrl_type||'|'||status||'|'||rtrim(wrl_parameter) from v$encryption_wallet;\n"
+                    " ALTER SESSION SET CONTAINER = CDB$ROOT;\n")
+                pdb_errors = validation_errors(lines)
+                pdb_tde = validation_rows(lines, 'PDB_TDE', 3)
+            if not pdb_tde:
+                snapshot['pdb_tde'].append(dict(pdb=pdb['name'], wrl_type='', status='', wrl_parameter='', errors=pdb_errors))
+            for wrl_type, status, wrl_parameter in pdb_tde:
+                snapshot['pdb_tde'].append(dict(pdb=pdb['name'], wrl_type=wrl_type, status=status, wrl_parameter=wrl_parameter, errors=pdb_errors))
+    except (IOError, OSError):
+        if timed_out.is_set():
+            raise IOError('sqlplus session used for validation snapshot has not finished within '+str(timeout)+' seconds and has been killed.')
+        raise
+    finally:
+        watchdog.cancel()
+        try:
+            sqlplus_process.stdin.write(' EXIT\n')
+            sqlplus_process.stdin.close()
+        except (IOError, OSError):
+            pass
+        sqlplus_process.wait()
+
+    alert_log_file = os.path.join(snapshot['diag_trace'], 'alert_'+oracle_sid+'.log')
+    snapshot['alert_log'] = dict(file=alert_log_file, matches={}, error=None)
+    try:
+        snapshot['alert_log']['matches'] = scan_alert_log(alert_log_file, alert_log_patterns)
+    except (IOError, OSError) as e:
+        snapshot['alert_log']['error'] = str(e)
+
+    return [snapshot, ' '.join(args)]
+
+def format_validation_title(report, title):
+
+    report.append('')
+    report.append(title)
+    report.append('########################################################')
+    report.append('')
+
+def format_validation_report(snapshot, report_header, srvctl_command, srvctl_output, alert_log_patterns):
+
+    cdb = snapshot['database'].get('cdb') == 'YES'
+
+    report = list(report_header)
+    report.append('Database Multitenant: '+snapshot['database'].get('cdb', 'NO'))
+    report.append('')
+
+    format_validation_title(report, 'TEST_1: Checking status of databases on all nodes')
+    report.append('Executed command:')
+    report.append(srvctl_command or '')
+    report.append('')
+    report.append('Command output:')
+    report.extend(srvctl_output)
+
+    format_validation_title(report, 'TEST_2: Checking PDBs status')
+    if cdb:
+        report.append('%-10s %-30s %-10s %-10s' % ('CON_ID', 'CON_NAME', 'OPEN MODE', 'RESTRICTED'))
+        report.append('%-10s %-30s %-10s %-10s' % ('-' * 10, '-' * 30, '-' * 10, '-' * 10))
+        for pdb in snapshot['pdbs']:
+            report.append('%10d %-30s %-10s %-10s' % (pdb['con_id'], pdb['name'], pdb['open_mode'], pdb['restricted']))
+    else:
+        report.append('No PDBs (it is not multitenant database = 11.2.0.4 or non-CDB 12c+)')
+
+    format_validation_title(report, 'TEST_3: Checking TEMPFILES status'+(' (including PDBs)' if cdb else ''))
+    report.append(('%-10s ' % 'CON_ID' if cdb else '')+'%-7s %-10s %s' % ('STATUS', 'ENABLED', 'TEMPFILE NAME'))
+    report.append(('%-10s ' % ('-' * 10) if cdb else '')+'%-7s %-10s %s' % ('-' * 7, '-' * 10, '-' * 80))
+    for tempfile in snapshot['tempfiles']:
+        report.append(('%10d ' % tempfile['con_id'] if cdb else '')+'%-7s %-10s %s' % (tempfile['status'], tempfile['enabled'], tempfile['name']))
+
+    format_validation_title(report, 'TEST_4: Checking REDO LOGFILES status')
+    report.append('%-10s %-10s %-7s %s' % ('GROUP#', 'THREAD#', 'STATUS', 'LOG FILE NAME'))
+    report.append('%-10s %-10s %-7s %s' % ('-' * 10, '-' * 10, '-' * 7, '-' * 80))
+    for logfile in snapshot['logfiles']:
+        report.append('%10d %10d %-7s %s' % (logfile['group'], logfile['thread'], logfile['status'], logfile['member']))
+
+    format_validation_title(report, 'TEST_5: Checking DATAFILES status'+(' (including PDBs)' if cdb else ''))
+    report.append(('%-10s ' % 'CON_ID' if cdb else '')+'%-7s %-10s %-14s %s' % ('STATUS', 'ENABLED', 'BYTES', 'DATAFILE NAME'))
+    report.append(('%-10s ' % ('-' * 10) if cdb else '')+'%-7s %-10s %-14s %s' % ('-' * 7, '-' * 10, '-' * 14, '-' * 74))
+    for datafile in snapshot['datafiles']:
+        report.append(('%10d ' % datafile['con_id'] if cdb else '')+'%-7s %-10s %14d %s' % (datafile['status'], datafile['enabled'], datafile['bytes'], datafile['name']))
+
+    format_validation_title(report, 'TEST_6: Checking TDE status (v$encryption_wallet)')
+    report.append('%-20s %-18s %s' % ('WRL_TYPE', 'STATUS', 'WRL_PARAMETER'))
+    report.append('%-20s %-18s %s' % ('-' * 20, '-' * 18, '-' * 74))
+    for tde in snapshot['tde']:
+        report.append('%-20s %-18s %s' % (tde['wrl_type'], tde['status'], tde['wrl_parameter']))
+    if cdb:
+        report.append('')
+        report.append('%-30s %-20s %-18s %s' % ('PDB', 'WRL_TYPE', 'STATUS', 'WRL_PARAMETER'))
+        report.append('%-30s %-20s %-18s %s' % ('-' * 30, '-' * 20, '-' * 18, '-' * 74))
+        for pdb_tde in snapshot['pdb_tde']:
+            report.append('%-30s %-20s %-18s %s' % (pdb_tde['pdb'], pdb_tde['wrl_type'], pdb_tde['status'], pdb_tde['wrl_parameter'] or ' '.join(pdb_tde['errors'])))
+
+    for test_number, pattern in enumerate(alert_log_patterns, 7):
+        format_validation_title(report, 'TEST_%d: Checking alertlog for %s' % (test_number, pattern.rstrip(':')))
+        report.append('Checked alertlog file: '+snapshot['alert_log']['file'])
+        report.append('')
+        report.append('Results of check:')
+        report.append('')
+        if snapshot['alert_log']['error'] is not None:
+            report.append('Alertlog could not be read: '+snapshot['alert_log']['error'])
+        elif snapshot['alert_log']['matches'].get(pattern):
+            report.append('(...)')
+            report.extend(snapshot['alert_log']['matches'][pattern])
+        else:
+            report.append('No %s Errors.' % pattern.rstrip(':'))
+
+    return report
+
+def write_validation_report(report_file, report):
+
+    with open(report_file+'.tmp', 'w') as f:
+        f.write('\n'.join(report)+'\n')
+    os.rename(report_file+'.tmp', report_file)
+
+def run_module():
+
+    module_args = dict(
+        oracle_home=dict(type='str', required=False),
+        oracle_sid=dict(type='str', required=True),
+        oracle_unqname=dict(type='str', required=False),
+        tns_admin=dict(type='str', required=False),
+        alert_log_patterns=dict(type='list', required=False, default=['ORA-00600:', 'ORA-07445:']),
+        report_file=dict(type='str', required=False),
+        report_header=dict(type='list', required=False, default=[]),
+        srvctl_command=dict(type='str', required=False),
+        srvctl_output=dict(type='list', required=False, default=[]),
+        timeout=dict(type='int', required=False, default=600)
+    )
+
+    result = dict(
+        changed=False,
+        validation_snapshot={},
+        cdb_database='',
+        report_file=''
+    )
+
+    module = AnsibleModule(
+        argument_spec=module_args,
+        supports_check_mode=True
+    )
+
+    try:
+        results_of_take_validation_snapshot = take_validation_snapshot(
+            module.params['oracle_home'],
+            module.params['oracle_sid'],
+            module.params['oracle_unqname'],
+            module.params['tns_admin'],
+            module.params['alert_log_patterns'],
+            module.params['timeout'])
+    except (IOError, OSError) as e:
+        module.fail_json(msg='Validation snapshot module has failed! '+str(e), **result)
+
+    snapshot = results_of_take_validation_snapshot[0]
+    result['validation_snapshot'] = snapshot
+    result['sqlplus_command'] = results_of_take_validation_snapshot[1]
+
+    if not snapshot['instance'] or not snapshot['database']:
+        module.fail_json(msg='Validation snapshot module has failed to read V$INSTANCE and V$DATABASE!', ora_errors=snapshot['errors'], **result)
+
+    result['cdb_database'] = snapshot['database']['cdb']
+
+    if module.params['report_file'] is not None and not module.check_mode:
+        write_validation_report(module.params['report_file'], format_validation_report(
+            snapshot,
+            module.params['report_header'],
+            module.params['srvctl_command'],
+            module.params['srvctl_output'],
+            module.params['alert_log_patterns']))
+        result['report_file'] = module.params['report_file']
+
+    module.exit_json(**result)
+
+def main():
+    run_module()
+
+if __name__ == '__main__':
+    main()
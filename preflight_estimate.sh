@@ -0,0 +1,8 @@
+#!/bin/bash
+#
+#Copyright (c) 2020, Oracle and/or its affiliates.
+#The Universal Permissive License (UPL), Version 1.0
+#
+# Estimate backup, restore and recover durations and check target capacity before STEP0
+#
+ansible-playbook preflight_estimate.yml --module-path modules/ -i inventory --extra-vars @setup.json
@@ -0,0 +1,25 @@
+#!/bin/bash
+#
+#Copyright (c) 2020, Oracle and/or its affiliates.
+#The Universal Permissive License (UPL), Version 1.0
+#
+# Repeat incremental level 1 rounds (backup on the source and recover on the target)
+# until the round is small enough for the final cutover (see incremental_rounds_* in defaults/main.yml).
+#
+incremental_rounds_file=`grep '^incremental_rounds_file:' defaults/main.yml | cut -d'"' -f2`
+incremental_rounds_max=`grep '^incremental_rounds_max:' defaults/main.yml | cut -d'"' -f2`
+
+rm -f ${incremental_rounds_file} ${incremental_rounds_file}.converged
+
+for incremental_round in `seq 1 ${incremental_rounds_max}`
+do
+  ansible-playbook setup_STEP0b_incremental_rounds.yml --module-path modules/ -i inventory --extra-vars @setup.json \
+    --extra-vars "incremental_round=${incremental_round} prepare_rman_on_source=False backup_level0=False backup_level1=True tde_upload_to_oss=False clear_source_on_target=False prepare_rman_on_target=False tde_download_from_oss=False restore_level0=False restore_level1=True open_resetlogs=False" || exit 1
+  if [ -f ${incremental_rounds_file}.converged ]; then
+    echo "Incremental round ${incremental_round} is small enough for the final cutover (see ${incremental_rounds_file})."
+    exit 0
+  fi
+done
+
+echo "Incremental rounds have not converged after ${incremental_rounds_max} rounds (see ${incremental_rounds_file})."
+exit 1